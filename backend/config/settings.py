@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     "dj_rest_auth.registration",
     "rest_framework_simplejwt.token_blacklist",
     # Local
+    "core",
     "users",
     "routes",
     "weather",
@@ -43,6 +44,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.prometheus.metrics_middleware",
+    "core.timing.server_timing_middleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -120,6 +124,12 @@ else:
         "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
     }
 
+# ── Cache ────────────────────────────────────────────────────────────────────
+# Локальна пам'ять за замовчуванням; для кількох воркерів — спільний кеш,
+# напр. CACHE_URL=redis://localhost:6379/1, щоб інвалідація бачилась усюди
+CACHES = {"default": env.cache_url("CACHE_URL", default="locmemcache://")}
+ROUTE_RESPONSE_CACHE_TIMEOUT = env.int("ROUTE_RESPONSE_CACHE_TIMEOUT", default=300)
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
@@ -128,6 +138,11 @@ SITE_ID = 1
 
 # ── DRF ──────────────────────────────────────────────────────────────────────
 REST_FRAMEWORK = {
+    # orjson з тим самим виводом, що й JSONRenderer (core.renderers)
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
@@ -139,7 +154,8 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    # ?page=N як і раніше; ?cursor= — keyset-пагінація без COUNT/OFFSET
+    "DEFAULT_PAGINATION_CLASS": "routes.pagination.CursorOrPageNumberPagination",
     "PAGE_SIZE": 20,
 }
 
@@ -175,6 +191,9 @@ SOCIALACCOUNT_PROVIDERS = {
         "AUTH_PARAMS": {"access_type": "online"},
     }
 }
+# Публічні ключі Google для локальної перевірки ID-токенів (users.google_auth)
+GOOGLE_JWKS_URL = env("GOOGLE_JWKS_URL", default="https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_TOKEN_LEEWAY = env.int("GOOGLE_TOKEN_LEEWAY", default=30)
 
 # ── CORS ──────────────────────────────────────────────────────────────────────
 CORS_ALLOWED_ORIGINS = env.list(
@@ -188,5 +207,68 @@ CORS_ALLOWED_ORIGINS = env.list(
 )
 CORS_ALLOW_CREDENTIALS = True
 
+# ── Outbound HTTP (core.http) ────────────────────────────────────────────────
+# Пул keep-alive з'єднань на хост; повтори з backoff лише для ідемпотентних запитів
+OUTBOUND_HTTP_CONNECT_TIMEOUT = env.float("OUTBOUND_HTTP_CONNECT_TIMEOUT", default=3.05)
+OUTBOUND_HTTP_READ_TIMEOUT = env.float("OUTBOUND_HTTP_READ_TIMEOUT", default=5)
+OUTBOUND_HTTP_RETRIES = env.int("OUTBOUND_HTTP_RETRIES", default=2)
+OUTBOUND_HTTP_BACKOFF = env.float("OUTBOUND_HTTP_BACKOFF", default=0.2)
+OUTBOUND_HTTP_POOL_SIZE = env.int("OUTBOUND_HTTP_POOL_SIZE", default=20)
+
+# ── Response compression (core.middleware) ──────────────────────────────────
+# brotli / gzip для текстових відповідей від COMPRESSION_MIN_SIZE байт
+COMPRESSION_MIN_SIZE = env.int("COMPRESSION_MIN_SIZE", default=1024)
+COMPRESSION_BROTLI_QUALITY = env.int("COMPRESSION_BROTLI_QUALITY", default=4)
+
+# ── Server-Timing (core.timing) ─────────────────────────────────────────────
+# Частка запитів із заголовком Server-Timing і JSON-рядком у лозі core.timing;
+# 0 — вимкнено (за замовчуванням), у продакшні достатньо 0.01–0.05
+SERVER_TIMING_SAMPLE_RATE = env.float("SERVER_TIMING_SAMPLE_RATE", default=0.0)
+
+# ── Метрики Prometheus (core.prometheus) ────────────────────────────────────
+# Bearer-токен для GET /metrics; без нього ендпоінт доступний лише при DEBUG.
+# Для кількох воркерів задайте PROMETHEUS_MULTIPROC_DIR у середовищі процесу
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core.timing": {
+            "handlers": ["console"],
+            "level": env("SERVER_TIMING_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# ── Image derivatives (routes.images) ────────────────────────────────────────
+IMAGE_DERIVATIVE_QUALITY = env.int("IMAGE_DERIVATIVE_QUALITY", default=80)
+
+# ── User photo uploads (routes.uploads) ─────────────────────────────────────
+# Запит лише кладе файл у локальний спул; обробку і вивантаження в storage
+# виконують фонові потоки з обмеженою чергою та повторами
+PHOTO_SPOOL_DIR = env("PHOTO_SPOOL_DIR", default=str(BASE_DIR / "spool"))
+PHOTO_WORKERS = env.int("PHOTO_WORKERS", default=2)
+PHOTO_QUEUE_SIZE = env.int("PHOTO_QUEUE_SIZE", default=100)
+PHOTO_RETRIES = env.int("PHOTO_RETRIES", default=3)
+PHOTO_RETRY_BACKOFF = env.float("PHOTO_RETRY_BACKOFF", default=1.0)
+PHOTO_MAX_DIMENSION = env.int("PHOTO_MAX_DIMENSION", default=2560)
+
+# ── Route catalogue export (routes.export) ──────────────────────────────────
+# Маршрутів на пачку курсора: стільки маршрутів з точками одночасно в пам'яті
+ROUTE_EXPORT_CHUNK_SIZE = env.int("ROUTE_EXPORT_CHUNK_SIZE", default=500)
+
 # ── Weather API ───────────────────────────────────────────────────────────────
 OPENWEATHER_API_KEY = env("OPENWEATHER_API_KEY", default="")
+OPENWEATHER_URL = env("OPENWEATHER_URL", default="https://api.openweathermap.org/data/2.5/weather")
+# Кеш погоди по місту: свіжий WEATHER_CACHE_TTL секунд, потім ще
+# WEATHER_CACHE_STALE секунд віддається старе значення з фоновим оновленням
+WEATHER_CACHE_TTL = env.int("WEATHER_CACHE_TTL", default=600)
+WEATHER_CACHE_STALE = env.int("WEATHER_CACHE_STALE", default=1800)
+WEATHER_NOT_FOUND_TTL = env.int("WEATHER_NOT_FOUND_TTL", default=60)
+# Пакетний запит ?city=A&city=B: межа міст, спільний пул потоків і загальний дедлайн (с)
+WEATHER_BATCH_MAX_CITIES = env.int("WEATHER_BATCH_MAX_CITIES", default=20)
+WEATHER_BATCH_WORKERS = env.int("WEATHER_BATCH_WORKERS", default=8)
+WEATHER_BATCH_TIMEOUT = env.float("WEATHER_BATCH_TIMEOUT", default=4)
@@ -3,8 +3,10 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
-from routes.urls import routes_urlpatterns, user_routes_urlpatterns
+from core.prometheus import metrics_view
+from routes.urls import async_routes_urlpatterns, routes_urlpatterns, user_routes_urlpatterns
 from users.google_auth import GoogleLoginView
+from weather.views import AsyncWeatherView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -28,6 +30,13 @@ urlpatterns = [
 
     # Weather
     path("api/weather/", include("weather.urls")),
+
+    # Async read endpoints (ASGI: config/asgi.py)
+    path("api/async/routes/", include(async_routes_urlpatterns)),
+    path("api/async/weather/", AsyncWeatherView.as_view(), name="async-weather"),
+
+    # Prometheus
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 # Serve media files in development (незалежно від DEBUG)
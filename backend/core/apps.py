@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = "core"
+
+    def ready(self):
+        # Обгортка SQL для Server-Timing має ставитись і на з'єднання, відкриті до першого запиту
+        from . import timing  # noqa: F401
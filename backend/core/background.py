@@ -0,0 +1,89 @@
+"""
+Фонова обробка в межах процесу: обмежена черга і кілька daemon-потоків.
+
+Для коротких задач, які не варто виконувати в потоці запиту (обробка й
+вивантаження фото), але для яких не потрібен окремий брокер. Черга
+обмежена: ``submit()`` повертає False замість того, щоб рости без меж, і
+викликач сам вирішує, що відповісти клієнту. Невдалий виклик повторюється
+з експоненційним backoff; після останньої спроби — ``on_failure``.
+Черга живе в пам'яті процесу, тож задачі мають бути відновлювані з БД.
+"""
+import logging
+import queue
+import threading
+import time
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    """Bounded in-process queue served by daemon threads, with retries."""
+
+    def __init__(self, handler, *, name, workers, max_size, retries=0, backoff=1.0, on_failure=None):
+        self.handler = handler
+        self.name = name
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.on_failure = on_failure
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, item):
+        """Queue ``item``; False when the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            logger.warning("%s queue is full, %r not queued", self.name, item)
+            return False
+        return True
+
+    def full(self):
+        return self._queue.full()
+
+    def join(self):
+        """Block until every queued item has been handled."""
+        self._queue.join()
+
+    def _ensure_started(self):
+        # Потоки — ліниво: після fork (gunicorn --preload) у кожному воркері свої
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._handle(item)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def _handle(self, item):
+        for attempt in range(self.retries + 1):
+            try:
+                self.handler(item)
+                return
+            except Exception as exc:
+                if attempt == self.retries:
+                    logger.exception("%s gave up on %r after %d attempts", self.name, item, attempt + 1)
+                    self._failed(item, exc)
+                    return
+                logger.warning("%s failed on %r (attempt %d): %s", self.name, item, attempt + 1, exc)
+                time.sleep(self.backoff * 2**attempt)
+
+    def _failed(self, item, exc):
+        if self.on_failure is None:
+            return
+        try:
+            self.on_failure(item, exc)
+        except Exception:
+            logger.exception("%s on_failure raised for %r", self.name, item)
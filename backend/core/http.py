@@ -0,0 +1,136 @@
+"""
+Спільний клієнт для вихідних HTTP-запитів (OpenWeatherMap, Google).
+
+Один requests.Session на процес: urllib3 тримає пул keep-alive з'єднань
+на кожен хост, тож повторні запити не відкривають TCP і TLS заново.
+Таймаути та повтори з backoff (лише GET/HEAD) — з налаштувань
+OUTBOUND_HTTP_*; тривалість і результат кожного запиту пишуться в
+``metrics`` під іменем upstream і в метрики Prometheus (core.prometheus).
+"""
+import logging
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import prometheus, timing
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class UpstreamMetrics:
+    """Per-upstream request counters and latency, in process memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, upstream, seconds, status=None):
+        """``status`` is the HTTP status, or None when no response arrived."""
+        timing.record("http", seconds)  # Server-Timing поточного запиту (core.timing)
+        error = status is None or status >= 500
+        prometheus.observe_upstream(upstream, seconds, error)
+        with self._lock:
+            stats = self._stats.setdefault(
+                upstream,
+                {"requests": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0, "statuses": {}},
+            )
+            stats["requests"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if error:
+                stats["errors"] += 1
+            if status is not None:
+                stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                upstream: {**stats, "statuses": dict(stats["statuses"])}
+                for upstream, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+metrics = UpstreamMetrics()
+
+
+class HttpClient:
+    """Lazily built pooled session; safe to share between threads for plain requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+
+    def _build_session(self):
+        retry = Retry(
+            total=settings.OUTBOUND_HTTP_RETRIES,
+            backoff_factor=settings.OUTBOUND_HTTP_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=settings.OUTBOUND_HTTP_POOL_SIZE,
+            pool_maxsize=settings.OUTBOUND_HTTP_POOL_SIZE,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        # Спільна сесія не повинна переносити cookies між користувачами
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def request(self, method, url, *, upstream, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = (settings.OUTBOUND_HTTP_CONNECT_TIMEOUT, settings.OUTBOUND_HTTP_READ_TIMEOUT)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException as exc:
+            metrics.record(upstream, time.perf_counter() - started)
+            # Без query і тексту винятку: обидва містять параметри запиту (appid=<ключ API>)
+            path = urlsplit(url)._replace(query="").geturl()
+            logger.warning("%s %s (%s) failed: %s", method, path, upstream, type(exc).__name__)
+            raise
+        metrics.record(upstream, time.perf_counter() - started, response.status_code)
+        return response
+
+    def get(self, url, *, upstream, **kwargs):
+        return self.request("GET", url, upstream=upstream, **kwargs)
+
+    def close(self):
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+
+http_client = HttpClient()
+
+
+@receiver(setting_changed)
+def _reset_session(setting, **kwargs):
+    if setting.startswith("OUTBOUND_HTTP_"):
+        http_client.close()
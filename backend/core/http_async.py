@@ -0,0 +1,61 @@
+"""
+Асинхронний двійник core.http для async-представлень (httpx).
+
+httpx.AsyncClient прив'язаний до event loop, тож клієнт — один на loop
+(під ASGI-сервером це один клієнт на воркер). Таймаути, повтори з
+backoff і метрики — ті самі, що й у синхронного клієнта.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+
+from .http import RETRY_STATUSES, metrics
+
+logger = logging.getLogger(__name__)
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def _client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.OUTBOUND_HTTP_READ_TIMEOUT, connect=settings.OUTBOUND_HTTP_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=None, max_keepalive_connections=settings.OUTBOUND_HTTP_POOL_SIZE
+            ),
+        )
+    return client
+
+
+async def aget(url, *, upstream, params=None, timeout=None):
+    """GET with the retry policy of core.http; raises httpx.HTTPError when no response arrives."""
+    client = _client()
+    kwargs = {"params": params}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    retries = settings.OUTBOUND_HTTP_RETRIES
+    started = time.perf_counter()
+    for attempt in range(retries + 1):
+        if attempt > 1:  # як у urllib3: перший повтор — одразу
+            await asyncio.sleep(settings.OUTBOUND_HTTP_BACKOFF * 2 ** (attempt - 1))
+        try:
+            response = await client.get(url, **kwargs)
+        except httpx.TransportError as exc:
+            if attempt == retries:
+                metrics.record(upstream, time.perf_counter() - started)
+                path = urlsplit(url)._replace(query="").geturl()
+                logger.warning("GET %s (%s) failed: %s", path, upstream, type(exc).__name__)
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                metrics.record(upstream, time.perf_counter() - started, response.status_code)
+                return response
@@ -0,0 +1,142 @@
+"""
+Стиснення відповідей за Accept-Encoding: brotli (якщо встановлено пакет
+brotli) або gzip.
+
+Стискаються лише текстові типи (JSON, text/*, ...) від COMPRESSION_MIN_SIZE
+байт: менші відповіді вміщаються в кілька TCP-пакетів, і стиснення лише
+витрачає CPU. Сильний ETag стає слабким, як у django GZipMiddleware, — умовні
+запити й далі отримують 304 (If-None-Match порівнюється слабко).
+
+Від BREACH gzip захищає випадкове доповнення (як у GZipMiddleware); для
+brotli такого немає, тож відповіді, що залежать від облікових даних
+(Authorization у запиті, Vary: Authorization / Cookie), стискаються лише gzip.
+"""
+from django.conf import settings
+from django.utils.cache import has_vary_header, patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli опційний
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+COMPRESSIBLE_SUFFIXES = ("+json", "+xml", "ndjson")
+
+# У порядку переваги, якщо клієнт приймає кілька з однаковим q
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def accepted_encodings(header):
+    """``{coding: q}`` from an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header, available=ENCODINGS):
+    """The first of ``available`` with the highest q in ``header``, or None."""
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_personalized(request, response):
+    """Whether ``response`` may mix secrets of the caller into its body."""
+    if "HTTP_AUTHORIZATION" in request.META:
+        return True
+    return any(has_vary_header(response, header) for header in ("Authorization", "Cookie"))
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith(COMPRESSIBLE_SUFFIXES)
+
+
+def _brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _abrotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _agzip_sequence(sequence, max_random_bytes):
+    async for chunk in sequence:
+        yield compress_string(chunk, max_random_bytes=max_random_bytes)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """GZipMiddleware with brotli, a size threshold and a content-type allowlist."""
+
+    max_random_bytes = 100  # як у GZipMiddleware: пом'якшення BREACH для gzip
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or response.status_code == 206:
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if not is_compressible(response.get("Content-Type", "")):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        available = ("gzip",) if is_personalized(request, response) else ENCODINGS
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), available)
+        if encoding is None:
+            return response
+
+        quality = settings.COMPRESSION_BROTLI_QUALITY
+        if response.streaming:
+            content = response.streaming_content
+            if encoding == "br":
+                wrap = _abrotli_sequence if response.is_async else _brotli_sequence
+                response.streaming_content = wrap(content, quality)
+            elif response.is_async:
+                response.streaming_content = _agzip_sequence(content, self.max_random_bytes)
+            else:
+                response.streaming_content = compress_sequence(content, max_random_bytes=self.max_random_bytes)
+            del response.headers["Content-Length"]
+        else:
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=quality)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,166 @@
+"""
+Метрики Prometheus: ``GET /metrics`` у текстовому форматі.
+
+- ``search4u_http_request_duration_seconds{view, method, status}`` — час
+  відповіді за іменем URL (``route-list``, ``user-stats``, ``weather`` ...);
+- ``search4u_http_request_db_queries{view}`` — кількість SQL-запитів на запит;
+- ``search4u_upstream_request_duration_seconds{upstream}`` і
+  ``search4u_upstream_requests_total{upstream, outcome}`` — вихідні запити
+  core.http (OpenWeatherMap, Google), ``outcome`` — ok / error;
+- ``search4u_cache_requests_total{cache, result}`` — hit / stale / miss
+  кешу відповідей маршрутів і кешу погоди.
+
+Кілька воркерів (gunicorn, uvicorn --workers): якщо в середовищі процесу є
+``PROMETHEUS_MULTIPROC_DIR``, prometheus_client пише значення у файли цієї
+теки, а ``/metrics`` будь-якого воркера сумує їх по всіх процесах. Теку треба
+очищати перед стартом сервера (gunicorn.conf.py робить це сам).
+"""
+import os
+import secrets
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from django.utils.decorators import sync_and_async_middleware
+from django.views.decorators.http import require_GET
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+NAMESPACE = "search4u"
+# Запити, що не дійшли до жодного URL-шаблону: шлях у мітці дав би необмежену кардинальність
+UNMATCHED = "unmatched"
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by URL name.",
+    ["view", "method", "status"],
+    namespace=NAMESPACE,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL queries per request by URL name.",
+    ["view"],
+    namespace=NAMESPACE,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Outbound HTTP request latency by upstream.",
+    ["upstream"],
+    namespace=NAMESPACE,
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests",
+    "Outbound HTTP requests by upstream; error = no response or 5xx.",
+    ["upstream", "outcome"],
+    namespace=NAMESPACE,
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Cache lookups by cache and result (hit / stale / miss).",
+    ["cache", "result"],
+    namespace=NAMESPACE,
+)
+
+_queries = ContextVar("request_queries", default=None)
+
+
+class _QueryCount:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+def _count_queries(execute, sql, params, many, context):
+    count = _queries.get()
+    if count is not None:
+        count.value += 1
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def _install_query_counter(sender, connection, **kwargs):
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+def observe_upstream(upstream, seconds, error):
+    UPSTREAM_LATENCY.labels(upstream).observe(seconds)
+    UPSTREAM_REQUESTS.labels(upstream, "error" if error else "ok").inc()
+
+
+def observe_cache(cache, result):
+    CACHE_REQUESTS.labels(cache, result).inc()
+
+
+def _observe_request(request, response, seconds, queries):
+    match = request.resolver_match
+    view = (match.view_name or UNMATCHED) if match is not None else UNMATCHED
+    REQUEST_LATENCY.labels(view, request.method, str(response.status_code)).observe(seconds)
+    REQUEST_QUERIES.labels(view).observe(queries)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    # Функція, а не MiddlewareMixin — з тієї ж причини, що й core.timing
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            count = _QueryCount()
+            token = _queries.set(count)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _queries.reset(token)
+            _observe_request(request, response, time.perf_counter() - started, count.value)
+            return response
+
+    else:
+
+        def middleware(request):
+            count = _QueryCount()
+            token = _queries.set(count)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _queries.reset(token)
+            _observe_request(request, response, time.perf_counter() - started, count.value)
+            return response
+
+    return middleware
+
+
+def _registry():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus text format; ``Authorization: Bearer <METRICS_TOKEN>``, open only in DEBUG."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseNotFound()
+    elif not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,43 @@
+"""
+JSON-рендерер на orjson.
+
+Вивід той самий, що й у DRF JSONRenderer з налаштуваннями за замовчуванням
+(компактно, UTF-8): Decimal, datetime, date, time та ліниві рядки кодуються
+тим самим rest_framework.utils.encoders.JSONEncoder, решта — всередині orjson.
+Без пакета orjson, з відступами (browsable API) або з ensure_ascii / не
+компактним JSON у REST_FRAMEWORK рендерер поводиться як JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from .timing import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опційний
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+_default = encoders.JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        ret = orjson.dumps(data, default=_default, option=OPTIONS)
+        # Як у JSONRenderer: U+2028 / U+2029 екрануються для вставки в <script>
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
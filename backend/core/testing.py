@@ -0,0 +1,48 @@
+"""Локальний HTTP-сервер для тестів, що підміняє зовнішні сервіси."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHTTPServer:
+    """
+    Serves ``respond(handler)`` -> (status, body, headers) on 127.0.0.1 with
+    HTTP/1.1 keep-alive. ``requests`` keeps the request paths, ``connections``
+    the client ports, i.e. the TCP connections that were opened.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                stub.connections.add(self.client_address[1])
+                status, body, headers = stub.respond(self)
+                raw = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                headers = {"Content-Type": "application/json", **(headers or {})}
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path="/"):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
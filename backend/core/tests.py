@@ -0,0 +1,333 @@
+import datetime
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+import requests
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from prometheus_client import REGISTRY
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from .background import BackgroundQueue
+from .http import http_client, metrics
+from .middleware import CompressionMiddleware, brotli, choose_encoding
+from .prometheus import NAMESPACE
+from .renderers import FastJSONRenderer, orjson
+from .timing import TimedSerializerMixin, record, server_timing_middleware
+from .testing import StubHTTPServer
+
+
+@override_settings(OUTBOUND_HTTP_RETRIES=2, OUTBOUND_HTTP_BACKOFF=0)
+class HttpClientTests(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.statuses = []
+        self.stub = StubHTTPServer(self._respond)
+        self.addCleanup(self.stub.close)
+
+    def _respond(self, handler):
+        status = self.statuses.pop(0) if self.statuses else 200
+        return status, {"ok": status == 200}, None
+
+    def test_reuses_connections_and_records_metrics(self):
+        for _ in range(5):
+            self.assertEqual(http_client.get(self.stub.url("/ping"), upstream="stub").json(), {"ok": True})
+        self.assertEqual(len(self.stub.requests), 5)
+        self.assertEqual(len(self.stub.connections), 1)  # keep-alive
+        stats = metrics.snapshot()["stub"]
+        self.assertEqual((stats["requests"], stats["errors"], stats["statuses"]), (5, 0, {200: 5}))
+        self.assertGreater(stats["max_seconds"], 0)
+
+    def test_retries_idempotent_requests_on_server_errors(self):
+        self.statuses = [503, 502]
+        response = http_client.get(self.stub.url("/flaky"), upstream="stub")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.stub.requests), 3)
+
+        self.statuses = [500, 500, 500]
+        self.assertEqual(http_client.get(self.stub.url("/down"), upstream="stub").status_code, 500)
+        self.assertEqual(metrics.snapshot()["stub"]["errors"], 1)
+
+    def test_connection_errors_are_counted(self):
+        self.stub.close()
+        with self.assertRaises(requests.exceptions.ConnectionError), self.assertLogs("core.http", "WARNING") as logs:
+            http_client.get(self.stub.url("/"), upstream="gone", params={"appid": "SUPERSECRETKEY"}, timeout=1)
+        self.assertEqual(metrics.snapshot()["gone"]["errors"], 1)
+        self.assertNotIn("SUPERSECRETKEY", "\n".join(logs.output))
+        self.assertIn("ConnectionError", logs.output[0])
+
+
+@unittest.skipIf(orjson is None, "orjson is not installed")
+class FastJSONRendererTests(SimpleTestCase):
+    def test_same_bytes_as_json_renderer(self):
+        kyiv = datetime.timezone(datetime.timedelta(hours=3))
+        data = ReturnDict(
+            {
+                "decimal": Decimal("12.50"),
+                "aware": datetime.datetime(2026, 10, 18, 12, 30, 5, 123456, tzinfo=datetime.timezone.utc),
+                "offset": datetime.datetime(2026, 10, 18, 12, 30, tzinfo=kyiv),
+                "naive": datetime.datetime(2026, 10, 18, 12, 30, 5, 999),
+                "date": datetime.date(2026, 10, 18),
+                "time": datetime.time(7, 5, 1, 250000),
+                "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                "lazy": gettext_lazy("Route"),
+                "text": "Львів \u2028 </script>",
+                "nested": [{1: None, "float": 0.1, "big": 2**40}, (True, False)],
+            },
+            serializer=None,
+        )
+        for context in ({}, {"indent": 4}):
+            with self.subTest(context=context):
+                self.assertEqual(
+                    FastJSONRenderer().render(data, "application/json", context),
+                    JSONRenderer().render(data, "application/json", context),
+                )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024, COMPRESSION_BROTLI_QUALITY=4)
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"name": "Route", "points": [' + b'{"latitude": "49.841952"},' * 200 + b"{}]}"
+
+    def process(self, response, accept_encoding="gzip, deflate, br", **headers):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding, **headers)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def json_response(self, body=None):
+        response = HttpResponse(self.body if body is None else body, content_type="application/json")
+        response["ETag"] = '"abc"'
+        return response
+
+    def test_negotiates_encoding(self):
+        available = ("br", "gzip")
+        self.assertEqual(choose_encoding("gzip, deflate, br", available), "br")
+        self.assertEqual(choose_encoding("br;q=0.5, gzip", available), "gzip")
+        self.assertEqual(choose_encoding("br;q=0, *", available), "gzip")
+        self.assertIsNone(choose_encoding("identity", available))
+        self.assertIsNone(choose_encoding("gzip;q=0", ("gzip",)))
+
+    def test_gzip_weakens_etag(self):
+        response = self.process(self.json_response(), "gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_preferred(self):
+        response = self.process(self.json_response())
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), self.body)
+
+        chunks = [b'{"id": 1}\n' * 50] * 20
+        streaming = self.process(StreamingHttpResponse(iter(chunks), content_type="application/x-ndjson"))
+        self.assertEqual(brotli.decompress(b"".join(streaming.streaming_content)), b"".join(chunks))
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_personalized_responses_use_padded_gzip(self):
+        def cookie_response():
+            response = self.json_response()
+            response["Vary"] = "Cookie"
+            return response
+
+        cases = {
+            "authorization": (self.json_response, {"HTTP_AUTHORIZATION": "Bearer token"}),
+            "vary cookie": (cookie_response, {}),
+        }
+        for name, (make_response, headers) in cases.items():
+            with self.subTest(name):
+                response = self.process(make_response(), "br", **headers)
+                self.assertFalse(response.has_header("Content-Encoding"))
+
+                response = self.process(make_response(), **headers)
+                self.assertEqual(response["Content-Encoding"], "gzip")
+                self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_skips_small_binary_and_unaccepted(self):
+        cases = {
+            "below threshold": (self.json_response(b'{"id": 1}'), "gzip"),
+            "binary": (HttpResponse(self.body, content_type="image/png"), "gzip"),
+            "not accepted": (self.json_response(), "identity"),
+        }
+        for name, (response, accept_encoding) in cases.items():
+            with self.subTest(name):
+                response = self.process(response, accept_encoding)
+                self.assertFalse(response.has_header("Content-Encoding"))
+                self.assertEqual(response.content, self.body if name != "below threshold" else b'{"id": 1}')
+
+
+class BackgroundQueueTests(SimpleTestCase):
+    def test_retries_then_reports_failure(self):
+        calls, failures = [], []
+
+        def handler(item):
+            calls.append(item)
+            if item == "broken" or len(calls) < 3:
+                raise OSError("storage is down")
+
+        tasks = BackgroundQueue(
+            handler,
+            name="test",
+            workers=1,
+            max_size=10,
+            retries=2,
+            backoff=0,
+            on_failure=lambda item, exc: failures.append((item, str(exc))),
+        )
+        with self.assertLogs("core.background", "WARNING"):
+            self.assertTrue(tasks.submit("photo"))
+            tasks.join()
+            self.assertEqual((calls, failures), (["photo"] * 3, []))
+            tasks.submit("broken")
+            tasks.join()
+        self.assertEqual(calls[3:], ["broken"] * 3)
+        self.assertEqual(failures, [("broken", "storage is down")])
+
+    def test_bounded_queue(self):
+        release = threading.Event()
+        tasks = BackgroundQueue(lambda item: release.wait(5), name="test", workers=1, max_size=1)
+        self.addCleanup(release.set)
+        self.assertTrue(tasks.submit(1))
+        while not tasks._queue.empty():  # перший елемент забирає потік
+            time.sleep(0.01)
+        self.assertTrue(tasks.submit(2))
+        self.assertTrue(tasks.full())
+        with self.assertLogs("core.background", "WARNING"):
+            self.assertFalse(tasks.submit(3))
+        release.set()
+        tasks.join()
+
+
+class _PointSerializer(TimedSerializerMixin, serializers.Serializer):
+    name = serializers.CharField()
+
+
+class _RouteSerializer(TimedSerializerMixin, serializers.Serializer):
+    points = _PointSerializer(many=True)
+
+
+def _select_one():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingTests(TestCase):
+    def test_sync_request(self):
+        def view(request):
+            _select_one()
+            _select_one()
+            record("http", 0.25)
+            data = _RouteSerializer({"points": [{"name": "A"}, {"name": "B"}]}).data
+            return HttpResponse(FastJSONRenderer().render(data))
+
+        with self.assertLogs("core.timing", "INFO") as logs:
+            response = server_timing_middleware(view)(RequestFactory().get("/api/routes/"))
+        header = response["Server-Timing"]
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="2 queries", serialize;dur=[\d.]+, ')
+        self.assertRegex(header, r"http;dur=250\.0, render;dur=[\d.]+, total;dur=[\d.]+$")
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(
+            {key: entry[key] for key in ("method", "path", "status", "db_queries", "http_ms")},
+            {"method": "GET", "path": "/api/routes/", "status": 200, "db_queries": 2, "http_ms": 250.0},
+        )
+
+    async def test_async_request_counts_queries_in_threads(self):
+        async def view(request):
+            await sync_to_async(_select_one)()
+            return HttpResponse()
+
+        with self.assertLogs("core.timing", "INFO"):
+            response = await server_timing_middleware(view)(RequestFactory().get("/"))
+        self.assertTrue(response["Server-Timing"].startswith('db;dur='))
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        def view(request):
+            _select_one()
+            return HttpResponse()
+
+        response = server_timing_middleware(view)(RequestFactory().get("/"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(f"{NAMESPACE}_{name}", labels) or 0
+
+
+@override_settings(METRICS_TOKEN="secret")
+class PrometheusTests(TestCase):
+    def _metrics(self, **headers):
+        return Client().get(reverse("metrics"), headers=headers)
+
+    def test_requires_token(self):
+        self.assertEqual(self._metrics().status_code, 403)
+        self.assertEqual(self._metrics(Authorization="Bearer wrong").status_code, 403)
+        with override_settings(METRICS_TOKEN="", DEBUG=False):
+            self.assertEqual(self._metrics().status_code, 404)
+
+    def test_requests_queries_and_cache(self):
+        labels = {"view": "route-list", "method": "GET", "status": "200"}
+        requests_before = _sample("http_request_duration_seconds_count", **labels)
+        queries_before = _sample("http_request_db_queries_sum", view="route-list")
+        hits_before = _sample("cache_requests_total", cache="routes", result="hit")
+        misses_before = _sample("cache_requests_total", cache="routes", result="miss")
+
+        self.client.get(reverse("route-list"))
+        self.client.get(reverse("route-list"))
+
+        self.assertEqual(_sample("http_request_duration_seconds_count", **labels) - requests_before, 2)
+        self.assertGreater(_sample("http_request_db_queries_sum", view="route-list") - queries_before, 0)
+        self.assertEqual(_sample("cache_requests_total", cache="routes", result="miss") - misses_before, 1)
+        self.assertEqual(_sample("cache_requests_total", cache="routes", result="hit") - hits_before, 1)
+
+        response = self._metrics(Authorization="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            b'search4u_http_request_duration_seconds_count{method="GET",status="200",view="route-list"}',
+            response.content,
+        )
+
+    def test_upstream_outcomes(self):
+        stub = StubHTTPServer(lambda handler: (503 if handler.path == "/down" else 200, {}, None))
+        self.addCleanup(stub.close)
+        ok_before = _sample("upstream_requests_total", upstream="stub", outcome="ok")
+        error_before = _sample("upstream_requests_total", upstream="stub", outcome="error")
+        with override_settings(OUTBOUND_HTTP_RETRIES=0):
+            http_client.get(stub.url("/ping"), upstream="stub")
+            http_client.get(stub.url("/down"), upstream="stub")
+        self.assertEqual(_sample("upstream_requests_total", upstream="stub", outcome="ok") - ok_before, 1)
+        self.assertEqual(_sample("upstream_requests_total", upstream="stub", outcome="error") - error_before, 1)
+        self.assertGreaterEqual(_sample("upstream_request_duration_seconds_count", upstream="stub"), 2)
+
+    def test_sums_worker_processes(self):
+        script = (
+            "from prometheus_client import Counter\n"
+            f"Counter('{NAMESPACE}_cache_requests', '', ['cache', 'result']).labels('weather', 'hit').inc(3)\n"
+        )
+        with tempfile.TemporaryDirectory() as path:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": path}
+            for _ in range(2):
+                subprocess.run([sys.executable, "-c", script], env=env, check=True)
+            with mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": path}):
+                response = self._metrics(Authorization="Bearer secret")
+        self.assertIn(b'search4u_cache_requests_total{cache="weather",result="hit"} 6.0', response.content)
@@ -0,0 +1,166 @@
+"""
+Server-Timing: куди пішов час запиту — SQL, серіалізація, вихідний HTTP,
+рендеринг.
+
+server_timing_middleware для частки запитів SERVER_TIMING_SAMPLE_RATE кладе в
+ContextVar лічильники RequestTimings; решта коду лише додає до них час через
+``record()`` / ``timed()``, а без вибірки це один ContextVar.get(). SQL
+рахує обгортка, яку отримує кожне нове з'єднання з БД (у т. ч. в потоках
+sync_to_async — вони копіюють контекст), вихідний HTTP — core.http.metrics,
+серіалізацію — TimedSerializerMixin і швидкий шлях карток, рендеринг —
+core.renderers. Результат — заголовок ``Server-Timing`` і один JSON-рядок
+у лог ``core.timing`` на запит.
+
+Час паралельних HTTP-запитів сумується, тож ``http`` може перевищити ``total``.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+# Порядок метрик у заголовку і в лозі
+METRICS = ("db", "serialize", "http", "render")
+
+_current = ContextVar("request_timings", default=None)
+_serializing = ContextVar("serializing", default=False)
+
+
+class RequestTimings:
+    """Seconds and call counts per metric for one sampled request."""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(METRICS, 0.0)
+        self.counts = dict.fromkeys(METRICS, 0)
+
+    def add(self, name, seconds):
+        self.seconds[name] += seconds
+        self.counts[name] += 1
+
+
+def record(name, seconds):
+    """Add ``seconds`` to metric ``name`` of the current request, if it is sampled."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def timed(name):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add("db", time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def _install_sql_wrapper(sender, connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+class TimedSerializerMixin:
+    """Counts ``to_representation()`` of the outermost serializer as ``serialize``."""
+
+    def to_representation(self, instance):
+        if _current.get() is None or _serializing.get():
+            return super().to_representation(instance)
+        token = _serializing.set(True)
+        try:
+            with timed("serialize"):
+                return super().to_representation(instance)
+        finally:
+            _serializing.reset(token)
+
+
+def server_timing_header(timings, total):
+    parts = []
+    for name in METRICS:
+        if timings.counts[name]:
+            part = f"{name};dur={timings.seconds[name] * 1000:.1f}"
+            if name == "db":
+                part += f';desc="{timings.counts[name]} queries"'
+            parts.append(part)
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _finish(request, response, timings, total):
+    response.headers["Server-Timing"] = server_timing_header(timings, total)
+    entry = {
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "total_ms": round(total * 1000, 1),
+        **{f"{name}_ms": round(timings.seconds[name] * 1000, 1) for name in METRICS},
+        "db_queries": timings.counts["db"],
+        "http_requests": timings.counts["http"],
+    }
+    logger.info(json.dumps(entry, ensure_ascii=False))
+
+
+def _sampled():
+    rate = settings.SERVER_TIMING_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    # Функція, а не MiddlewareMixin: у async-режимі process_request виконується
+    # в іншому потоці, і ContextVar не дожив би до представлення
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            if not _sampled():
+                return await get_response(request)
+            timings = RequestTimings()
+            token = _current.set(timings)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            _finish(request, response, timings, time.perf_counter() - started)
+            return response
+
+    else:
+
+        def middleware(request):
+            if not _sampled():
+                return get_response(request)
+            timings = RequestTimings()
+            token = _current.set(timings)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            _finish(request, response, timings, time.perf_counter() - started)
+            return response
+
+    return middleware
@@ -0,0 +1,19 @@
+# gunicorn читає цей файл сам, якщо запускати з backend/ (див. Procfile)
+import os
+import shutil
+
+
+def on_starting(server):
+    # Метрики Prometheus кількох воркерів (core.prometheus): файли попереднього запуску
+    # не повинні потрапити в суми нового
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import Route, RouteImage, RoutePoint, UserRoute, Rating
+from .ordering import optimize_route
 
 
 class RouteImageInline(admin.TabularInline):
@@ -16,9 +17,23 @@ class RoutePointInline(admin.TabularInline):
 class RouteAdmin(admin.ModelAdmin):
     list_display = ("name", "city", "mood", "category", "budget_min", "budget_max", "estimated_duration", "avg_rating")
     list_filter = ("mood", "city", "category")
-    search_fields = ("name", "city", "description")
-    readonly_fields = ("avg_rating", "created_at", "updated_at")
+    search_fields = ("name", "city", "description", "external_id")
+    readonly_fields = ("avg_rating", "rating_count", "path_length_m", "created_at", "updated_at")
     inlines = [RouteImageInline, RoutePointInline]
+    actions = ("optimize_stop_order",)
+
+    @admin.action(description="Optimize stop order (keep the first stop)")
+    def optimize_stop_order(self, request, queryset):
+        for route in queryset.only("pk", "name"):
+            result = optimize_route(route.pk, start="first", save=True)
+            if result["saved"]:
+                self.message_user(
+                    request,
+                    f"{route.name}: {result['current_total_m'] / 1000:.2f} km → {result['total_m'] / 1000:.2f} km",
+                    messages.SUCCESS,
+                )
+            else:
+                self.message_user(request, f"{route.name}: no shorter order found", messages.INFO)
 
 
 @admin.register(UserRoute)
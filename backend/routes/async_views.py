@@ -0,0 +1,91 @@
+"""
+Async-версії RouteListView і RouteDetailView для ASGI (/api/async/routes/).
+
+Автентифікацію, фільтри, серіалізацію та рендеринг беруть у відповідних
+DRF-представлень, тож відповіді байт-у-байт ті самі. Запити до БД — через
+async ORM (acount / async for / afirst / aaggregate), кеш — через aget/aset,
+тож воркер не тримає потік на час очікування БД.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.views import View
+from rest_framework.response import Response
+
+from .cache import aresponse_cache_key, amerge_user_state
+from .conditional import aroute_list_validators, aroute_validators, evaluate_conditions, set_validator_headers
+from .models import Route
+from .views import RouteDetailView, RouteListView
+
+NOT_FOUND = f"No {Route._meta.object_name} matches the given query."  # як у get_object_or_404
+
+
+class AsyncDRFView(View):
+    """Runs ``respond()`` of a subclass with a configured instance of ``drf_view_class``."""
+    drf_view_class = None
+
+    async def get(self, request, *args, **kwargs):
+        view = self.drf_view_class(format_kwarg=None)
+        view.args, view.kwargs = args, kwargs
+        view.headers = view.default_response_headers
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+        try:
+            # Автентифікація (JWT → користувач з БД), права, content negotiation
+            await sync_to_async(view.initial)(drf_request, *args, **kwargs)
+            response = await self.respond(view, drf_request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return view.finalize_response(drf_request, response, *args, **kwargs)
+
+    async def respond(self, view, request):
+        raise NotImplementedError
+
+
+class AsyncRouteListView(AsyncDRFView):
+    """GET /api/async/routes/ — те саме, що /api/routes/."""
+    drf_view_class = RouteListView
+
+    async def respond(self, view, request):
+        etag, timestamp, response = evaluate_conditions(request, await aroute_list_validators(request.user))
+        if response is not None:
+            return response
+
+        async def build():
+            row_serializer = view.get_row_serializer()
+            # Фільтри синхронні: ?search= при першому виклику обирає бекенд запитом до БД
+            rows = await sync_to_async(view.get_rows)(row_serializer)
+            page = await view.paginator.apaginate_queryset(rows, request, view=view)
+            return view.paginator.get_paginated_response(row_serializer.to_representation(page)).data
+
+        data = await view.aget_cached_data(await aresponse_cache_key(request), build)
+        await amerge_user_state(data["results"], request.user)
+        response = Response(data)
+        set_validator_headers(response, etag, timestamp)
+        return response
+
+
+class AsyncRouteDetailView(AsyncDRFView):
+    """GET /api/async/routes/<id>/ — те саме, що /api/routes/<id>/."""
+    drf_view_class = RouteDetailView
+
+    async def respond(self, view, request):
+        pk = view.kwargs["pk"]
+        validators = await aroute_validators(pk, request.user)
+        if validators is None:
+            raise Http404(NOT_FOUND)
+        etag, timestamp, response = evaluate_conditions(request, validators)
+        if response is not None:
+            return response
+
+        async def build():
+            # afirst() виконує й prefetch_related; серіалізатор читає лише кеш prefetch
+            route = await view.get_queryset().filter(pk=pk).afirst()
+            if route is None:
+                raise Http404(NOT_FOUND)
+            return view.get_serializer(route).data
+
+        data = await view.aget_cached_data(await aresponse_cache_key(request, route_id=pk), build)
+        await amerge_user_state([data], request.user)
+        response = Response(data)
+        set_validator_headers(response, etag, timestamp)
+        return response
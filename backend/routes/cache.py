@@ -0,0 +1,164 @@
+"""
+Кеш відповідей для списку й деталей маршрутів.
+
+Ключ — нормалізований URL (хост, шлях, відсортовані query-параметри) плюс
+версія контенту: глобальна для списків, окрема для кожного маршруту. Сигнали
+збільшують версію після коміту, тож старі записи просто перестають читатися
+і витісняються за TTL.
+
+У кеші лежить анонімна відповідь; is_saved / is_favorite поточного
+користувача дописуються після читання одним запитом до UserRoute.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.prometheus import observe_cache
+
+from .models import UserRoute
+
+GLOBAL_VERSION_KEY = "routes:version"
+
+
+def _route_version_key(route_id):
+    return f"routes:version:{route_id}"
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Початкове значення з часу: після витіснення лічильника версія
+        # не повернеться до вже використаної
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns() // 1000, timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns() // 1000, timeout=None)
+
+
+def bump_list_version():
+    """Invalidate cached list pages only (e.g. after routes were bulk-created)."""
+    _bump(GLOBAL_VERSION_KEY)
+
+
+def bump_route_version(route_id):
+    """Invalidate cached list pages and the detail of ``route_id``."""
+    bump_list_version()
+    _bump(_route_version_key(route_id))
+
+
+def schedule_version_bump(route_id):
+    transaction.on_commit(lambda: bump_route_version(route_id))
+
+
+def _normalized_url(request):
+    query = sorted((k, v) for k in request.query_params for v in request.query_params.getlist(k))
+    return f"{request.scheme}://{request.get_host()}{request.path}?{urlencode(query)}"
+
+
+def _version_key(route_id):
+    return GLOBAL_VERSION_KEY if route_id is None else _route_version_key(route_id)
+
+
+def _response_cache_key(request, route_id, version):
+    kind = "list" if route_id is None else "detail"
+    digest = hashlib.md5(_normalized_url(request).encode()).hexdigest()
+    return f"routes:{kind}:{version}:{digest}"
+
+
+def response_cache_key(request, route_id=None):
+    return _response_cache_key(request, route_id, _get_version(_version_key(route_id)))
+
+
+async def aresponse_cache_key(request, route_id=None):
+    return _response_cache_key(request, route_id, await _aget_version(_version_key(route_id)))
+
+
+def _stateful_ids(items):
+    """Ids of items that have is_saved / is_favorite (?fields= may leave them out)."""
+    return [item["id"] for item in items if "is_saved" in item or "is_favorite" in item]
+
+
+def _user_routes(ids, user):
+    return UserRoute.objects.filter(user=user, route_id__in=ids).values_list("route_id", "is_favorite")
+
+
+def merge_user_state(items, user):
+    """Fill is_saved / is_favorite of serialized routes for ``user`` in place."""
+    ids = _stateful_ids(items)
+    if not user.is_authenticated or not ids:
+        return items
+    return _apply_user_state(items, dict(_user_routes(ids, user)))
+
+
+async def amerge_user_state(items, user):
+    ids = _stateful_ids(items)
+    if not user.is_authenticated or not ids:
+        return items
+    return _apply_user_state(items, {pk: fav async for pk, fav in _user_routes(ids, user)})
+
+
+def _apply_user_state(items, favorites):
+    for item in items:
+        if "is_saved" in item:
+            item["is_saved"] = item["id"] in favorites
+        if "is_favorite" in item:
+            item["is_favorite"] = favorites.get(item["id"], False)
+    return items
+
+
+class CachedResponseMixin:
+    """
+    Для представлень з картками маршрутів. Поки ``include_user_state`` False,
+    queryset і серіалізатор не рахують полів поточного користувача —
+    так будується анонімна відповідь, яку можна віддавати будь-кому.
+    """
+    include_user_state = True
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["include_user_state"] = self.include_user_state
+        return context
+
+    def get_cached_data(self, key, build):
+        """Cached anonymous ``build().data`` for ``key``; errors propagate uncached."""
+        data = cache.get(key)
+        observe_cache("routes", "miss" if data is None else "hit")
+        if data is None:
+            self.include_user_state = False
+            try:
+                data = build().data
+            finally:
+                self.include_user_state = True
+            cache.set(key, data, getattr(settings, "ROUTE_RESPONSE_CACHE_TIMEOUT", 300))
+        return data
+
+    async def aget_cached_data(self, key, build):
+        """get_cached_data() for async views; ``build`` is a coroutine function returning data."""
+        data = await cache.aget(key)
+        observe_cache("routes", "miss" if data is None else "hit")
+        if data is None:
+            self.include_user_state = False
+            try:
+                data = await build()
+            finally:
+                self.include_user_state = True
+            await cache.aset(key, data, getattr(settings, "ROUTE_RESPONSE_CACHE_TIMEOUT", 300))
+        return data
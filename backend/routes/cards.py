@@ -0,0 +1,111 @@
+"""
+Підтримка денормалізованих карток маршрутів (RouteCard).
+
+Сигнали лише ставлять id маршруту в чергу; сама перебудова виконується
+один раз після коміту транзакції, тож збереження маршруту з інлайнами
+в адмінці оновлює картку одним запитом. Якщо змінились точки, перед
+карткою перераховується геометрія маршруту (routes.geometry).
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .geometry import refresh_route_geometry
+from .models import GEOMETRY_FIELDS, Route, RouteCard, RouteImage, RoutePoint
+
+COPIED_FIELDS = (
+    "name",
+    "description",
+    "city",
+    "mood",
+    "category",
+    "budget_min",
+    "budget_max",
+    "estimated_duration",
+    "avg_rating",
+    "rating_count",
+    "created_at",
+    *GEOMETRY_FIELDS,
+)
+DERIVED_FIELDS = (
+    "cover_image",
+    "cover_derivatives",
+    "first_point_latitude",
+    "first_point_longitude",
+)
+
+_pending = threading.local()
+
+
+def card_source_queryset():
+    """Route queryset annotated with everything a card needs, in one query."""
+    first_point = RoutePoint.objects.filter(route=OuterRef("pk")).order_by("order", "pk")
+    cover = RouteImage.objects.filter(route=OuterRef("pk")).order_by("-is_cover", "order", "pk")
+    return Route.objects.annotate(
+        cover_image=Subquery(cover.values("image")[:1]),
+        cover_derivatives=Subquery(cover.values("derivatives")[:1]),
+        first_point_latitude=Subquery(first_point.values("latitude")[:1]),
+        first_point_longitude=Subquery(first_point.values("longitude")[:1]),
+    )
+
+
+def refresh_route_cards(route_ids):
+    """Upsert the cards of ``route_ids``; cards of deleted routes go by cascade."""
+    rows = card_source_queryset().filter(pk__in=route_ids).values(
+        "pk", *COPIED_FIELDS, *DERIVED_FIELDS
+    )
+    cards = [
+        RouteCard(
+            route_id=row.pop("pk"),
+            **{
+                **row,
+                "cover_image": row["cover_image"] or "",
+                "cover_derivatives": row["cover_derivatives"] or {},
+            },
+        )
+        for row in rows
+    ]
+    RouteCard.objects.bulk_create(
+        cards,
+        update_conflicts=True,
+        unique_fields=["route"],
+        update_fields=[*COPIED_FIELDS, *DERIVED_FIELDS, "updated_at"],
+    )
+    return len(cards)
+
+
+def rebuild_route_cards(batch_size=1000):
+    """Rebuild every card (and route geometry) from scratch; returns the number of cards written."""
+    ids = list(Route.objects.order_by("pk").values_list("pk", flat=True))
+    written = 0
+    with transaction.atomic():
+        RouteCard.objects.exclude(route_id__in=Route.objects.values("pk")).delete()
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            refresh_route_geometry(batch, batch_size=batch_size)
+            written += refresh_route_cards(batch)
+    return written
+
+
+def schedule_card_refresh(route_id, geometry=False):
+    """
+    Refresh the card of ``route_id`` once the current transaction commits;
+    ``geometry=True`` — its points changed, recompute the route geometry first.
+    """
+    if not hasattr(_pending, "ids"):
+        _pending.ids = set()
+        _pending.geometry = set()
+    _pending.ids.add(route_id)
+    if geometry:
+        _pending.geometry.add(route_id)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    ids, _pending.ids = getattr(_pending, "ids", set()), set()
+    geometry, _pending.geometry = getattr(_pending, "geometry", set()), set()
+    if geometry:
+        refresh_route_geometry(geometry)
+    if ids:
+        refresh_route_cards(ids)
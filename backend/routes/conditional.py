@@ -0,0 +1,145 @@
+"""
+Умовні GET (ETag / Last-Modified) для маршрутів.
+
+Валідатори рахуються одним агрегатним запитом по часових мітках — без
+серіалізації й без prefetch точок і фото. Видалення дочірніх об'єктів
+торкаються Route.updated_at (signals), тож максимум мітки не «відкочується».
+
+Last-Modified віддається лише анонімним відповідям: стан is_saved після
+видалення UserRoute не лишає мітки, тож для користувача — тільки ETag.
+"""
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Rating, Route, RouteCard, RouteImage, RoutePoint, RoutePointPhoto, UserRoute
+
+
+def _max_per_route(model, field, route_lookup="route"):
+    return Subquery(
+        model.objects.filter(**{route_lookup: OuterRef("pk")})
+        .order_by()
+        .values(route_lookup)
+        .annotate(latest=Max(field))
+        .values("latest")
+    )
+
+
+def _etag(*parts):
+    return '"%s"' % hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()
+
+
+def _latest(*timestamps):
+    return max((ts for ts in timestamps if ts is not None), default=None)
+
+
+def _route_validator_rows(route_id, user):
+    qs = Route.objects.filter(pk=route_id).annotate(
+        images_at=_max_per_route(RouteImage, "updated_at"),
+        points_at=_max_per_route(RoutePoint, "updated_at"),
+        ratings_at=_max_per_route(Rating, "updated_at"),
+        photos_at=_max_per_route(RoutePointPhoto, "updated_at", "point__route"),
+    )
+    fields = ["updated_at", "images_at", "points_at", "ratings_at", "photos_at"]
+    if user is not None and user.is_authenticated:
+        qs = qs.annotate(
+            user_is_favorite=Subquery(
+                UserRoute.objects.filter(route=OuterRef("pk"), user=user).values("is_favorite")[:1]
+            )
+        )
+        fields.append("user_is_favorite")
+    return qs.values_list(*fields)
+
+
+def _route_validators(route_id, row):
+    if row is None:
+        return None
+    return _etag("route", route_id, *row), _latest(*row[:5])
+
+
+def route_validators(route_id, user=None):
+    """(etag, last_modified) of a route and its children, or None if it does not exist."""
+    return _route_validators(route_id, _route_validator_rows(route_id, user).first())
+
+
+async def aroute_validators(route_id, user=None):
+    return _route_validators(route_id, await _route_validator_rows(route_id, user).afirst())
+
+
+def _saved_routes(user):
+    return UserRoute.objects.filter(user=user)
+
+
+def _list_validators(user, cards, saved):
+    parts = ["list", cards["latest"], cards["total"]]
+    if saved is not None:
+        parts += [user.pk, saved["latest"], saved["total"]]
+    return _etag(*parts), cards["latest"]
+
+
+_LATEST_AND_TOTAL = {"latest": Max("updated_at"), "total": Count("pk")}
+
+
+def route_list_validators(user=None):
+    """(etag, last_modified) of the card table, plus the saved routes of ``user``."""
+    cards = RouteCard.objects.aggregate(**_LATEST_AND_TOTAL)
+    saved = None
+    if user is not None and user.is_authenticated:
+        saved = _saved_routes(user).aggregate(**_LATEST_AND_TOTAL)
+    return _list_validators(user, cards, saved)
+
+
+async def aroute_list_validators(user=None):
+    cards = await RouteCard.objects.aaggregate(**_LATEST_AND_TOTAL)
+    saved = None
+    if user is not None and user.is_authenticated:
+        saved = await _saved_routes(user).aaggregate(**_LATEST_AND_TOTAL)
+    return _list_validators(user, cards, saved)
+
+
+def evaluate_conditions(request, validators):
+    """
+    (etag, timestamp, response) for a DRF request: response is a 304 (or 412)
+    when the client's copy is current, otherwise None.
+    """
+    etag, last_modified = validators
+    # Різні рендерери (JSON / browsable API) — різні представлення
+    etag = _etag(etag, request.accepted_renderer.format)
+    if request.user.is_authenticated:
+        last_modified = None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validator_headers(response, etag, timestamp)
+    return etag, timestamp, response
+
+
+def set_validator_headers(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        patch_vary_headers(response, ("Authorization",))
+
+
+class ConditionalGetMixin:
+    """
+    Відповідає 304 на If-None-Match / If-Modified-Since ще до побудови
+    відповіді (і до кешу). Підкласи повертають (etag, last_modified) або
+    None, якщо ресурсу немає, з ``get_validators()``.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        etag, timestamp, response = evaluate_conditions(request, validators)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            set_validator_headers(response, etag, timestamp)
+        return response
@@ -0,0 +1,146 @@
+"""
+Потоковий експорт каталогу маршрутів з точками й фото — NDJSON або GeoJSON
+FeatureCollection (``GET /api/routes/export/``, ``manage.py export_routes``).
+
+Маршрути читаються курсором ``.iterator(chunk_size=...)`` у порядку id;
+точки й фото кожної пачки — двома запитами по id маршрутів. У пам'яті
+одночасно лише одна пачка, тож розмір каталогу на пам'ять не впливає.
+
+Записи у форматі routes.importer, тож вивід можна знову імпортувати
+(``import_routes``). Маршрути без ``external_id`` отримують
+``search4u:<id>`` — унікальний, але не той самий, що в базі-джерелі.
+Додатково є ``id``, ``avg_rating``, ``rating_count``, ``created_at`` і
+``updated_at`` — імпорт їх ігнорує.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.renderers import BaseRenderer
+
+from core.renderers import FastJSONRenderer
+
+from .importer import POINT_FIELDS, ROUTE_FIELDS
+from .models import RouteImage, RoutePoint
+
+EXTERNAL_ID_PREFIX = "search4u:"
+EXTRA_FIELDS = ("avg_rating", "rating_count", "created_at", "updated_at")
+
+_json = FastJSONRenderer()
+
+
+def _plain(values):
+    # Decimal — рядком, як у API: JSONEncoder DRF перетворив би його на float
+    return {key: str(value) if isinstance(value, Decimal) else value for key, value in values.items()}
+
+
+def parse_updated_since(value):
+    """Aware datetime for an ISO date or datetime; raises ValueError."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError("Expected an ISO 8601 date or datetime.")
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def changed_since(queryset, moment):
+    """Routes changed at or after ``moment``, including changes to their points and images only."""
+    return queryset.filter(
+        Q(updated_at__gte=moment)
+        | Exists(RoutePoint.objects.filter(route=OuterRef("pk"), updated_at__gte=moment))
+        | Exists(RouteImage.objects.filter(route=OuterRef("pk"), updated_at__gte=moment))
+    )
+
+
+def iter_route_records(queryset, chunk_size=500):
+    """Export records for ``queryset`` (Route), one batch of ``chunk_size`` routes in memory at a time."""
+    rows = (
+        queryset.order_by("pk")
+        .values("pk", "external_id", *ROUTE_FIELDS, *EXTRA_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    while batch := list(islice(rows, chunk_size)):
+        ids = [row["pk"] for row in batch]
+        points = defaultdict(list)
+        for route_id, *values, image in (
+            RoutePoint.objects.filter(route_id__in=ids)
+            .order_by("route_id", "order", "pk")
+            .values_list("route_id", *POINT_FIELDS, "image")
+        ):
+            points[route_id].append({**_plain(dict(zip(POINT_FIELDS, values))), "image": image or None})
+        images = defaultdict(list)
+        for route_id, image, is_cover in (
+            RouteImage.objects.filter(route_id__in=ids)
+            .order_by("route_id", "order", "pk")
+            .values_list("route_id", "image", "is_cover")
+        ):
+            images[route_id].append({"image": image, "is_cover": is_cover})
+        for row in batch:
+            pk = row.pop("pk")
+            yield {
+                "id": pk,
+                **_plain(row),
+                "external_id": row["external_id"] or f"{EXTERNAL_ID_PREFIX}{pk}",
+                "points": points[pk],
+                "images": images[pk],
+            }
+
+
+def _batches(records, chunk_size):
+    while batch := list(islice(records, chunk_size)):
+        yield batch
+
+
+def _feature(record):
+    points = record.pop("points")
+    coordinates = [[float(point.pop("longitude")), float(point.pop("latitude"))] for point in points]
+    if len(coordinates) > 1:
+        geometry = {"type": "LineString", "coordinates": coordinates}
+    elif coordinates:
+        geometry = {"type": "Point", "coordinates": coordinates[0]}
+    else:
+        geometry = None
+    return {"type": "Feature", "id": record["id"], "geometry": geometry, "properties": {**record, "points": points}}
+
+
+def stream_ndjson(queryset, chunk_size=500):
+    # Один шматок на пачку: стиснення (core.middleware) не скидає буфер на кожен рядок
+    records = iter_route_records(queryset, chunk_size)
+    for batch in _batches(records, chunk_size):
+        yield b"".join(_json.render(record) + b"\n" for record in batch)
+
+
+def stream_geojson(queryset, chunk_size=500):
+    yield b'{"type":"FeatureCollection","features":['
+    separator = b"\n"
+    for batch in _batches(iter_route_records(queryset, chunk_size), chunk_size):
+        yield separator + b",\n".join(_json.render(_feature(record)) for record in batch)
+        separator = b",\n"
+    yield b"\n]}\n"
+
+
+STREAMS = {"ndjson": stream_ndjson, "geojson": stream_geojson}
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Lets ``?format=ndjson`` / ``Accept`` select the export; error bodies become one JSON line."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return _json.render(data) + b"\n"
+
+
+class GeoJSONRenderer(NDJSONRenderer):
+    media_type = "application/geo+json"
+    format = "geojson"
@@ -0,0 +1,188 @@
+"""
+Швидкий шлях серіалізації списку карток маршрутів.
+
+Замість екземплярів RouteCard і полів DRF — рядки ``.values()`` і
+конвертери, скомпільовані один раз на запит з полів RouteCardSerializer
+(з урахуванням ?fields= / ?omit=). Результат байт-у-байт той самий, що й у
+серіалізатора; поле, для якого немає швидкого конвертера, рендериться його
+власним ``to_representation()``.
+"""
+import decimal
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import fields as drf_fields
+from rest_framework.settings import api_settings
+
+from core.timing import timed
+
+from .images import derivative_urls
+from .models import RouteImage
+from .serializers import _bbox, _coordinates, _cover_image_url
+
+USER_STATE = "user_route_is_favorite"
+
+
+# Шляхи, які urljoin() у FileSystemStorage.url() змінив би: сегменти "." / ".." і "//"
+_UNJOINABLE = re.compile(r"(^|/)\.{1,2}(/|$)|//")
+
+
+def _media_url(request):
+    """``_cover_image_url`` for one request."""
+    storage = RouteImage.image.field.storage
+    if not isinstance(storage, FileSystemStorage):
+        return lambda name: _cover_image_url(name, request)
+    # Префікс (абсолютна) MEDIA_URL рахується раз на запит, а не urljoin на кожен рядок
+    prefix = storage.url("")
+    prefix = request.build_absolute_uri(prefix) if request else prefix
+
+    def url(name):
+        if not name:
+            return None
+        path = filepath_to_uri(name).lstrip("/")
+        if _UNJOINABLE.search(path):
+            return _cover_image_url(name, request)
+        return prefix + path
+
+    return url
+
+
+def _cover_image(request):
+    url = _media_url(request)
+    return ("cover_image",), lambda row: url(row["cover_image"])
+
+
+def _cover_derivatives(request):
+    url = _media_url(request)
+    return (
+        ("cover_image", "cover_derivatives"),
+        lambda row: derivative_urls(row["cover_derivatives"], row["cover_image"], url),
+    )
+
+
+def _first_point_field(request):
+    return (
+        ("first_point_latitude", "first_point_longitude"),
+        lambda row: _coordinates(row["first_point_latitude"], row["first_point_longitude"]),
+    )
+
+
+def _bbox_field(request):
+    columns = ("min_latitude", "min_longitude", "max_latitude", "max_longitude")
+    return columns, lambda row: _bbox(*(row[column] for column in columns))
+
+
+def _centroid_field(request):
+    return (
+        ("centroid_latitude", "centroid_longitude"),
+        lambda row: _coordinates(row["centroid_latitude"], row["centroid_longitude"]),
+    )
+
+
+def _is_saved(request):
+    return (), lambda row: row.get(USER_STATE) is not None
+
+
+def _is_favorite(request):
+    return (), lambda row: bool(row.get(USER_STATE, False))
+
+
+# SerializerMethodField RouteCardSerializer -> (колонки, конвертер рядка); ті самі
+# допоміжні функції, що й у get_*() серіалізатора
+METHOD_FIELDS = {
+    "cover_image": _cover_image,
+    "cover_derivatives": _cover_derivatives,
+    "first_point": _first_point_field,
+    "bbox": _bbox_field,
+    "centroid": _centroid_field,
+    "is_saved": _is_saved,
+    "is_favorite": _is_favorite,
+}
+
+# Поля, чий to_representation() для значень з БД нічого не змінює
+PASSTHROUGH_FIELDS = (
+    drf_fields.IntegerField,
+    drf_fields.CharField,
+    drf_fields.ChoiceField,
+    drf_fields.BooleanField,
+)
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+    quantum = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return "{:f}".format(value.quantize(quantum, rounding=rounding, context=context))
+
+    return convert
+
+
+def _value_converter(field):
+    """Converter for non-None values of a model field, None when values pass through."""
+    if isinstance(field, drf_fields.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    return field.to_representation
+
+
+class CardRowSerializer:
+    """
+    ``RouteCardSerializer(many=True).data`` from ``.values(*columns)`` rows.
+    ``serializer`` is a configured RouteCardSerializer instance (context, fieldset).
+    """
+
+    def __init__(self, serializer):
+        request = serializer.context.get("request")
+        model = serializer.Meta.model
+        self.columns = []
+        self._converters = []
+        for field in serializer._readable_fields:
+            if isinstance(field, drf_fields.SerializerMethodField):
+                try:
+                    columns, convert = METHOD_FIELDS[field.field_name](request)
+                except KeyError:
+                    raise ImproperlyConfigured(f"No fast path for method field {field.field_name!r}.")
+            else:
+                column = model._meta.get_field(field.source).attname
+                columns, convert = (column,), self._column(column, _value_converter(field))
+            self.columns += [c for c in columns if c not in self.columns]
+            self._converters.append((field.field_name, convert))
+
+    @staticmethod
+    def _column(column, convert):
+        if convert is None:
+            return lambda row: row[column]
+
+        def get(row):
+            value = row[column]
+            return None if value is None else convert(value)
+
+        return get
+
+    def values(self, queryset, extra=()):
+        """``queryset.values()`` with the columns this serializer reads (plus ``extra``)."""
+        columns = [*self.columns, *(c for c in extra if c not in self.columns)]
+        if USER_STATE in queryset.query.annotations:
+            columns.append(USER_STATE)
+        # search_rank (RouteSearchFilter) — для ORDER BY
+        columns += [name for name in queryset.query.extra if name not in columns]
+        return queryset.values(*columns)
+
+    def to_representation(self, rows):
+        converters = self._converters
+        # rows — ще не виконаний QuerySet: SQL іде в db, а не в serialize
+        rows = list(rows)
+        with timed("serialize"):
+            return [{name: convert(row) for name, convert in converters} for row in rows]
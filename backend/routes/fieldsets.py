@@ -0,0 +1,118 @@
+"""
+Розріджені набори полів: ``?fields=id,name`` / ``?omit=points.user_photos``.
+
+Вкладені поля адресуються через крапку (``points.name``); ``id`` лишається
+завжди — за ним додається стан is_saved / is_favorite. Серіалізатори з
+SparseFieldsMixin відкидають невибрані поля, а представлення за тим самим
+FieldSet пропускають prefetch/annotate для полів, яких у відповіді не буде.
+"""
+from rest_framework.exceptions import ParseError
+
+
+def _parse(value):
+    """'id,points.name' -> {"id": {}, "points": {"name": {}}}"""
+    tree = {}
+    for path in value.split(","):
+        names = [name.strip() for name in path.split(".")]
+        if not all(names):
+            continue
+        node = tree
+        for name in names:
+            node = node.setdefault(name, {})
+    return tree
+
+
+class FieldSet:
+    """
+    Selection of serializer fields: ``fields`` keeps only the listed fields
+    (None — all of them), ``omit`` drops fields. A nested entry narrows the
+    field instead of keeping or dropping it whole.
+    """
+
+    def __init__(self, fields=None, omit=None):
+        self.fields = fields
+        self.omit = omit or {}
+
+    @classmethod
+    def from_query_params(cls, params, fields_param="fields", omit_param="omit"):
+        fields = params.get(fields_param)
+        return cls(_parse(fields) if fields else None, _parse(params.get(omit_param, "")))
+
+    def __bool__(self):
+        return self.fields is not None or bool(self.omit)
+
+    def includes(self, name, *nested):
+        """Whether ``name`` (or ``name.nested...``) ends up in the response."""
+        if self.fields is not None and name not in self.fields:
+            return False
+        if self.omit.get(name) == {}:
+            return False
+        return not nested or self.nested(name).includes(*nested)
+
+    def nested(self, name):
+        """FieldSet for the serializer of field ``name``."""
+        fields = self.fields.get(name) if self.fields is not None else None
+        return FieldSet(fields or None, self.omit.get(name))
+
+    def names(self):
+        return set(self.fields or ()) | set(self.omit)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer that takes ``fieldset=FieldSet(...)`` and keeps only the
+    selected fields (plus ``always_included``); nested SparseFieldsMixin
+    serializers get their part.
+    """
+    always_included = ("id",)
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        self.fieldset = fieldset or FieldSet()
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.fieldset:
+            return fields
+        for name in list(fields):
+            if name not in self.always_included and not self.fieldset.includes(name):
+                del fields[name]
+                continue
+            field = getattr(fields[name], "child", fields[name])
+            if isinstance(field, SparseFieldsMixin):
+                field.fieldset = self.fieldset.nested(name)
+        return fields
+
+    @classmethod
+    def unknown_fields(cls, fieldset, prefix=""):
+        """Dotted names in ``fieldset`` that this serializer does not have."""
+        unknown = []
+        for name in sorted(fieldset.names()):
+            nested = fieldset.nested(name)
+            if name not in cls.Meta.fields:
+                unknown.append(prefix + name)
+            elif nested:
+                field = cls._declared_fields.get(name)
+                field = getattr(field, "child", field)
+                if isinstance(field, SparseFieldsMixin):
+                    unknown += type(field).unknown_fields(nested, f"{prefix}{name}.")
+                else:
+                    unknown += [f"{prefix}{name}.{sub}" for sub in sorted(nested.names())]
+        return unknown
+
+
+class SparseFieldsViewMixin:
+    """Reads ?fields= / ?omit= once per request and passes them to the serializer."""
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            fieldset = FieldSet.from_query_params(self.request.query_params)
+            unknown = self.get_serializer_class().unknown_fields(fieldset)
+            if unknown:
+                raise ParseError(f"Unknown fields in ?fields= / ?omit=: {', '.join(unknown)}.")
+            self._fieldset = fieldset
+        return self._fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fieldset", self.get_fieldset())
+        return super().get_serializer(*args, **kwargs)
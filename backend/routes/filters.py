@@ -1,5 +1,41 @@
 import django_filters
-from .models import Route
+from django import forms
+from django.core.validators import EMPTY_VALUES
+from rest_framework import filters
+from .models import Route, RouteCard
+from .search import get_search_backend
+
+
+class BBoxField(forms.CharField):
+    """``min_lon,min_lat,max_lon,max_lat`` (GeoJSON order) -> tuple of four floats."""
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value in EMPTY_VALUES:
+            return None
+        try:
+            west, south, east, north = (float(part) for part in value.split(","))
+        except ValueError:
+            raise forms.ValidationError("Expected min_lon,min_lat,max_lon,max_lat.")
+        if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+            raise forms.ValidationError("Coordinates out of range or min greater than max.")
+        return west, south, east, north
+
+
+class BBoxFilter(django_filters.Filter):
+    """Routes whose bounding box (routes.geometry) intersects the given one; no points — no match."""
+    field_class = BBoxField
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        west, south, east, north = value
+        return qs.filter(
+            min_latitude__lte=north,
+            max_latitude__gte=south,
+            min_longitude__lte=east,
+            max_longitude__gte=west,
+        )
 
 
 class RouteFilter(django_filters.FilterSet):
@@ -10,7 +46,38 @@ class RouteFilter(django_filters.FilterSet):
     budget_min__gte = django_filters.NumberFilter(field_name="budget_min",          lookup_expr="gte")
     budget_max__gte = django_filters.NumberFilter(field_name="budget_max",          lookup_expr="gte")
     duration__lte   = django_filters.NumberFilter(field_name="estimated_duration",  lookup_expr="lte")
+    in_bbox         = BBoxFilter()
 
     class Meta:
         model = Route
         fields = ["city", "mood", "category"]
+
+
+class RouteCardFilter(RouteFilter):
+    """Ті самі параметри, що й RouteFilter, але над таблицею RouteCard."""
+
+    class Meta(RouteFilter.Meta):
+        model = RouteCard
+
+
+class RouteSearchFilter(filters.SearchFilter):
+    """
+    ?search= через індексований бекенд з routes.search замість LIKE '%x%'.
+    Додає колонку ``search_rank``, за якою RouteOrderingFilter сортує
+    результати, якщо клієнт не передав ?ordering=.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_search_backend(queryset.db).search(queryset, terms)
+
+
+class RouteOrderingFilter(filters.OrderingFilter):
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        ranked = "search_rank" in queryset.query.extra
+        if ranked and not request.query_params.get(self.ordering_param):
+            return ("search_rank", *(ordering or ()))
+        return ordering
@@ -0,0 +1,108 @@
+"""Геометрія на сфері: відстані haversine, geohash для просторового індексу точок, encoded polyline."""
+import math
+
+EARTH_RADIUS_M = 6_371_000
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # клітинка ~4.8 × 4.8 м
+# Символ, більший за будь-який символ алфавіту: [prefix, prefix + "{") — усі хеші з префіксом
+GEOHASH_UPPER = "{"
+POLYLINE_PRECISION = 5  # ~1 м; так само, як у Google Maps / Leaflet / Mapbox
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # біти чергуються: довгота, широта, довгота...
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value *= 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value *= 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounding_box(latitude, longitude, radius_m):
+    """(min_lat, min_lon, max_lat, max_lon) of a circle, clamped to valid coordinates."""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = math.cos(math.radians(latitude))
+    dlon = 180.0 if cos_lat < 1e-9 else min(180.0, dlat / cos_lat)
+    return (
+        max(-90.0, latitude - dlat),
+        max(-180.0, longitude - dlon),
+        min(90.0, latitude + dlat),
+        min(180.0, longitude + dlon),
+    )
+
+
+def geohash_cover(latitude, longitude, radius_m, max_cells=48):
+    """
+    Geohash prefixes whose cells together cover the circle: the finest
+    precision that needs at most ``max_cells`` cells.
+    """
+    min_lat, min_lon, max_lat, max_lon = bounding_box(latitude, longitude, radius_m)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        rows = math.ceil((max_lat - min_lat) / height) + 1
+        cols = math.ceil((max_lon - min_lon) / width) + 1
+        if rows * cols <= max_cells:
+            break
+    # Крок не більший за клітинку — кожна клітинка, що перетинає bbox, отримає точку
+    lats = [min(min_lat + i * height, max_lat) for i in range(rows)] + [max_lat]
+    lons = [min(min_lon + j * width, max_lon) for j in range(cols)] + [max_lon]
+    return sorted({geohash_encode(lat, lon, precision) for lat in lats for lon in lons})
+
+
+def polyline_encode(coordinates, precision=POLYLINE_PRECISION):
+    """Encoded polyline (Google's algorithm) for ``(latitude, longitude)`` pairs."""
+    factor = 10**precision
+    chars = []
+    previous = (0, 0)
+    for latitude, longitude in coordinates:
+        # Округлення до більшого на .5, як Math.round у JS-декодерах
+        current = (math.floor(float(latitude) * factor + 0.5), math.floor(float(longitude) * factor + 0.5))
+        for value, last in zip(current, previous):
+            delta = value - last
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                chars.append(chr((0x20 | (delta & 0x1F)) + 63))
+                delta >>= 5
+            chars.append(chr(delta + 63))
+        previous = current
+    return "".join(chars)
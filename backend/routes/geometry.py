@@ -0,0 +1,53 @@
+"""
+Геометрія шляху через точки маршруту: довжина, bbox, центроїд і encoded polyline.
+
+Зберігається на Route (і копіюється в RouteCard), щоб карта й ``?in_bbox=``
+не читали точки. Перераховується після коміту разом із карткою —
+``schedule_card_refresh(route_id, geometry=True)`` із сигналів RoutePoint, —
+а bulk-шляхи (імпорт, синтетичні дані, порядок точок) викликають
+``refresh_route_geometry`` явно.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from .geo import haversine_m, polyline_encode
+from .models import GEOMETRY_FIELDS, Route, RoutePoint
+
+COORDINATE_QUANTUM = Decimal(1).scaleb(-RoutePoint._meta.get_field("latitude").decimal_places)
+
+
+def route_geometry(coordinates):
+    """Values of ``GEOMETRY_FIELDS`` for ``(latitude, longitude)`` pairs in visiting order."""
+    if not coordinates:
+        return {**dict.fromkeys(GEOMETRY_FIELDS), "path_length_m": 0, "polyline": ""}
+    latitudes = [Decimal(latitude) for latitude, _ in coordinates]
+    longitudes = [Decimal(longitude) for _, longitude in coordinates]
+    length = sum(
+        haversine_m(float(a[0]), float(a[1]), float(b[0]), float(b[1]))
+        for a, b in zip(coordinates, coordinates[1:])
+    )
+    return {
+        "path_length_m": round(length),
+        "min_latitude": min(latitudes),
+        "min_longitude": min(longitudes),
+        "max_latitude": max(latitudes),
+        "max_longitude": max(longitudes),
+        # Середнє точок: маршрути — в межах міста, сферична поправка не потрібна
+        "centroid_latitude": (sum(latitudes) / len(latitudes)).quantize(COORDINATE_QUANTUM),
+        "centroid_longitude": (sum(longitudes) / len(longitudes)).quantize(COORDINATE_QUANTUM),
+        "polyline": polyline_encode(coordinates),
+    }
+
+
+def refresh_route_geometry(route_ids, batch_size=1000):
+    """Recompute the geometry of ``route_ids`` from their points; one SELECT and one bulk UPDATE."""
+    coordinates = defaultdict(list)
+    for route_id, latitude, longitude in (
+        RoutePoint.objects.filter(route_id__in=route_ids)
+        .order_by("route_id", "order", "pk")
+        .values_list("route_id", "latitude", "longitude")
+    ):
+        coordinates[route_id].append((latitude, longitude))
+    routes = [Route(pk=route_id, **route_geometry(coordinates[route_id])) for route_id in route_ids]
+    Route.objects.bulk_update(routes, GEOMETRY_FIELDS, batch_size=batch_size)
+    return len(routes)
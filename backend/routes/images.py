@@ -0,0 +1,129 @@
+"""
+Похідні зображення (derivatives) для фото маршрутів, точок і користувачів.
+
+З оригіналу робляться фіксовані розміри SIZES у WebP (якщо Pillow зібраний з
+libwebp) і JPEG та зберігаються тим самим storage поруч з оригіналом:
+``routes/a.jpg`` -> ``routes/a.thumb.webp``, ``routes/a.thumb.jpg``, ... Тож
+працює і з FileSystemStorage, і з Cloudinary. Імена та розміри пишуться в
+JSON-поле ``derivatives`` моделі разом з ім'ям оригіналу (``source``):
+якщо зображення замінили, старі похідні не віддаються.
+
+Генерація — після коміту завантаження (routes.signals); для наявних
+файлів — ``manage.py generate_image_derivatives``.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Розмір -> рамка (ширина, висота), в яку вписується зображення без збільшення
+SIZES = {
+    "full": (1920, 1920),
+    "card": (800, 600),
+    "thumb": (320, 320),
+}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+# Помилки Pillow / storage, з якими похідні просто не створюються
+GENERATION_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+
+def formats():
+    return ("webp", "jpeg") if features.check("webp") else ("jpeg",)
+
+
+def derivative_name(name, size, fmt):
+    root, _ = posixpath.splitext(name)
+    return f"{root}.{size}.{EXTENSIONS[fmt]}"
+
+
+def _open(field_file):
+    with field_file.storage.open(field_file.name, "rb") as f:
+        image = Image.open(f)
+        # JPEG декодується одразу в зменшеному масштабі, не менше за найбільшу рамку
+        image.draft("RGB", max(SIZES.values()))
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    quality = settings.IMAGE_DERIVATIVE_QUALITY
+    if fmt == "webp":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        if image.mode == "RGBA":
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _store(storage, name, content):
+    # Стабільні імена: повторна генерація перезаписує, а не додає суфікс
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def generate_derivatives(field_file):
+    """
+    Write every size and format of ``field_file`` next to it; returns the
+    ``derivatives`` field value. Raises one of GENERATION_ERRORS when the
+    original is missing or not an image.
+    """
+    storage, name = field_file.storage, field_file.name
+    image = _open(field_file)
+    sizes = {}
+    # Від більшого до меншого: кожен розмір зменшується з попереднього
+    for size, box in SIZES.items():
+        image = image.copy()
+        image.thumbnail(box, Image.LANCZOS)
+        variant = {"width": image.width, "height": image.height}
+        for fmt in formats():
+            variant[fmt] = _store(storage, derivative_name(name, size, fmt), _encode(image, fmt))
+        sizes[size] = variant
+    return {"source": name, "sizes": sizes}
+
+
+def refresh_derivatives(instance):
+    """Generate and save the derivatives of ``instance.image``; False on failure."""
+    try:
+        instance.derivatives = generate_derivatives(instance.image)
+    except GENERATION_ERRORS as exc:
+        logger.warning(
+            "No derivatives for %s %s (%s): %s", type(instance).__name__, instance.pk, instance.image.name, exc
+        )
+        return False
+    # save(), а не update(): сигнали оновлять картку, кеш і updated_at (ETag)
+    instance.save(update_fields=["derivatives", "updated_at"])
+    return True
+
+
+def refresh_uploaded(model, pk, name):
+    """on_commit callback for an upload; skips rows deleted or re-uploaded since."""
+    instance = model.objects.filter(pk=pk).first()
+    if instance is not None and instance.image.name == name:
+        refresh_derivatives(instance)
+
+
+def derivative_urls(derivatives, name, url):
+    """
+    ``{size: {"width", "height", format: url}}`` for the API, or None when
+    there are no derivatives of the image ``name``. ``url`` maps a storage
+    name to its URL.
+    """
+    if not name or not derivatives or derivatives.get("source") != name:
+        return None
+    return {
+        size: {key: url(value) if key in EXTENSIONS else value for key, value in variant.items()}
+        for size, variant in derivatives["sizes"].items()
+    }
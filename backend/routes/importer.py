@@ -0,0 +1,477 @@
+"""
+Масовий імпорт маршрутів з точками й фото (``manage.py import_routes``).
+
+Файл читається потоково — JSON Lines, CSV або GeoJSON FeatureCollection, —
+записи перевіряються полями моделей і пишуться пачками bulk_create /
+bulk_update, кожна пачка у своїй транзакції. Маршрут визначає
+``external_id``: повторний імпорт оновлює лише змінені маршрути, точки
+зіставляє за порядком (id точок і фото користувачів до них зберігаються),
+а фото маршруту замінює, якщо їх список змінився.
+
+bulk-операції не викликають сигналів, тож geohash точок, геометрія маршрутів,
+картки, пошуковий індекс і версії кешу оновлюються тут явно. Зменшені копії
+фото — окремо, командою generate_image_derivatives.
+
+Формат запису (JSON Lines — один на рядок)::
+
+    {"external_id": "lviv-001", "name": ..., "description": ..., "city": ...,
+     "mood": ..., "category": ..., "budget_min": ..., "budget_max": ...,
+     "estimated_duration": ...,
+     "points": [{"name": ..., "description": ..., "address": ..., "latitude": ...,
+                 "longitude": ..., "duration_at_stop": ..., "image": ...}],
+     "images": [{"image": "routes/a.jpg", "is_cover": true}]}
+
+CSV — рядок на точку, рядки маршруту підряд: колонки маршруту, ``images``
+(імена через ``;``, перше — обкладинка) і ``point_*``. GeoJSON — Feature на
+маршрут: координати LineString / MultiPoint / Point — точки, ``properties`` —
+поля маршруту, ``properties.points`` — решта полів точок у тому ж порядку.
+"""
+import csv
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_list_version, bump_route_version
+from .cards import refresh_route_cards
+from .geo import geohash_encode
+from .geometry import refresh_route_geometry
+from .models import Route, RouteImage, RoutePoint
+from .search import get_search_backend
+
+ROUTE_FIELDS = (
+    "name",
+    "description",
+    "city",
+    "mood",
+    "category",
+    "budget_min",
+    "budget_max",
+    "estimated_duration",
+)
+POINT_FIELDS = ("name", "description", "address", "latitude", "longitude", "duration_at_stop")
+COORDINATE = Decimal("0.000001")
+IMAGE_NAME_LENGTH = RouteImage._meta.get_field("image").max_length
+
+CSV_IMAGE_SEPARATOR = ";"
+CSV_POINT_PREFIX = "point_"
+
+FORMATS = ("jsonl", "csv", "geojson")
+EXTENSIONS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".geojson": "geojson", ".json": "geojson"}
+
+
+class ImportFileError(ValueError):
+    """The file itself cannot be read further (broken CSV header, GeoJSON syntax)."""
+
+
+class RowError(ValueError):
+    """One record is invalid; the import skips it and goes on."""
+
+
+def detect_format(path):
+    name = str(path).lower().removesuffix(".gz")
+    for extension, fmt in EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    return None
+
+
+# ── Читання ─────────────────────────────────────────────────────────────────
+# Кожен reader — генератор пар (місце у файлі, dict запису або RowError)
+
+
+def read_jsonl(file):
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield f"line {number}", json.loads(line)
+        except ValueError as exc:
+            yield f"line {number}", RowError(f"invalid JSON: {exc}")
+
+
+def read_csv(file):
+    reader = csv.DictReader(file)
+    if not reader.fieldnames or "external_id" not in reader.fieldnames:
+        raise ImportFileError("CSV header must include external_id.")
+    record = None
+    for row in reader:
+        location = f"line {reader.line_num}"
+        if record is None or row["external_id"] != record[1]["external_id"]:
+            if record is not None:
+                yield record
+            route = {key: value for key, value in row.items() if not key.startswith(CSV_POINT_PREFIX)}
+            images = [name.strip() for name in (route.pop("images", "") or "").split(CSV_IMAGE_SEPARATOR)]
+            route["images"] = [
+                {"image": name, "is_cover": index == 0} for index, name in enumerate(filter(None, images))
+            ]
+            route["points"] = []
+            record = location, route
+        point = {
+            key.removeprefix(CSV_POINT_PREFIX): value
+            for key, value in row.items()
+            if key.startswith(CSV_POINT_PREFIX)
+        }
+        if any(point.values()):
+            record[1]["points"].append(point)
+    if record is not None:
+        yield record
+
+
+class _JSONStream:
+    """Incremental reader over a text file for raw_decode() of successive JSON values."""
+
+    def __init__(self, file, chunk_size=1 << 16):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ImportFileError("Unexpected end of GeoJSON.")
+            self._fill()
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ImportFileError(f"Expected {' or '.join(map(repr, chars))} in GeoJSON, got {char!r}.")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError as exc:
+                # Значення могло обірватися на межі шматка — дочитуємо
+                if self.eof:
+                    raise ImportFileError(f"Invalid GeoJSON: {exc}")
+                self._fill()
+                continue
+            # Число в кінці буфера могло бути неповним
+            if end == len(self.buffer) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+
+def read_geojson(file, chunk_size=1 << 16):
+    stream = _JSONStream(file, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "features":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                number = 0
+                while True:
+                    number += 1
+                    yield f"feature {number}", _feature_record(stream.value())
+                    if stream.expect(",]") == "]":
+                        break
+        else:
+            stream.value()
+        if stream.expect(",}") == "}":
+            return
+
+
+def _feature_record(feature):
+    if not isinstance(feature, dict) or not isinstance(feature.get("properties"), dict):
+        return RowError("feature without properties")
+    record = dict(feature["properties"])
+    geometry = feature.get("geometry") or {"type": "MultiPoint", "coordinates": []}
+    coordinates = geometry.get("coordinates")
+    if geometry.get("type") == "Point":
+        coordinates = [coordinates]
+    elif geometry.get("type") not in ("LineString", "MultiPoint"):
+        return RowError(f"unsupported geometry {geometry.get('type')!r}")
+    details = record.get("points") or [{} for _ in coordinates]
+    if not isinstance(coordinates, list) or not isinstance(details, list) or len(details) != len(coordinates):
+        return RowError("properties.points does not match the geometry coordinates")
+    points = []
+    for position, detail in zip(coordinates, details):
+        if not isinstance(position, list) or len(position) < 2 or not isinstance(detail, dict):
+            return RowError("invalid geometry coordinates")
+        points.append({**detail, "longitude": position[0], "latitude": position[1]})
+    record["points"] = points
+    return record
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv, "geojson": read_geojson}
+
+
+# ── Перевірка ───────────────────────────────────────────────────────────────
+
+
+def _fields(model, names):
+    return [(name, model._meta.get_field(name)) for name in names]
+
+
+_ROUTE_FIELDS = _fields(Route, ROUTE_FIELDS)
+_POINT_FIELDS = _fields(RoutePoint, POINT_FIELDS)
+
+
+def _clean_fields(fields, data, errors, prefix=""):
+    values = {}
+    for name, field in fields:
+        raw = data.get(name)
+        if raw is None or raw == "":
+            raw = field.get_default() if field.has_default() else raw
+            if raw is None and field.blank:
+                raw = ""
+        elif name in ("latitude", "longitude"):
+            try:
+                raw = Decimal(str(raw)).quantize(COORDINATE)
+            except InvalidOperation:
+                pass  # повідомлення про помилку дасть field.clean()
+        elif isinstance(raw, float):
+            # DecimalField.clean(float) дає хвіст знаків (12.34 -> 12.34000000) і не проходить перевірку
+            raw = Decimal(str(raw))
+        try:
+            values[name] = field.clean(raw, None)
+        except ValidationError as exc:
+            errors.append(f"{prefix}{name}: {' '.join(exc.messages)}")
+    return values
+
+
+def _clean_image(value, errors, prefix):
+    if value in (None, ""):
+        return ""
+    if not isinstance(value, str) or len(value) > IMAGE_NAME_LENGTH:
+        errors.append(f"{prefix}image: expected a storage name of at most {IMAGE_NAME_LENGTH} characters")
+        return ""
+    return value
+
+
+def clean_record(data):
+    """Validated ``{"external_id", "route", "points", "images"}`` for a raw record; raises RowError."""
+    if isinstance(data, RowError):
+        raise data
+    if not isinstance(data, dict):
+        raise RowError("expected an object")
+    errors = []
+    external_id = str(data.get("external_id") or "").strip()
+    if not external_id:
+        errors.append("external_id: required")
+    elif len(external_id) > Route._meta.get_field("external_id").max_length:
+        errors.append("external_id: too long")
+    route = _clean_fields(_ROUTE_FIELDS, data, errors)
+    if not errors and route["budget_min"] > route["budget_max"]:
+        errors.append("budget_min: greater than budget_max")
+
+    raw_points = data.get("points") or []
+    raw_images = data.get("images") or []
+    if not isinstance(raw_points, list) or not isinstance(raw_images, list):
+        raise RowError("points and images must be lists")
+    points = []
+    for index, raw in enumerate(raw_points):
+        prefix = f"points[{index}]."
+        if not isinstance(raw, dict):
+            errors.append(f"{prefix[:-1]}: expected an object")
+            continue
+        point = _clean_fields(_POINT_FIELDS, raw, errors, prefix)
+        if "latitude" in point and not -90 <= point["latitude"] <= 90:
+            errors.append(f"{prefix}latitude: out of range")
+        if "longitude" in point and not -180 <= point["longitude"] <= 180:
+            errors.append(f"{prefix}longitude: out of range")
+        point["image"] = _clean_image(raw.get("image"), errors, prefix)
+        points.append(point)
+    images = []
+    for index, raw in enumerate(raw_images):
+        raw = {"image": raw} if isinstance(raw, str) else raw
+        if not isinstance(raw, dict) or not raw.get("image"):
+            errors.append(f"images[{index}]: expected a storage name")
+            continue
+        images.append((_clean_image(raw["image"], errors, f"images[{index}]."), bool(raw.get("is_cover"))))
+    if errors:
+        raise RowError("; ".join(errors))
+    return {"external_id": external_id, "route": route, "points": points, "images": images}
+
+
+# ── Запис ───────────────────────────────────────────────────────────────────
+
+
+def _new_point(route, order, values):
+    return RoutePoint(
+        route=route,
+        order=order,
+        geohash=geohash_encode(values["latitude"], values["longitude"]),
+        **{**values, "image": values["image"] or None},
+    )
+
+
+def _new_images(route, images):
+    return [
+        RouteImage(route=route, image=name, is_cover=is_cover, order=order)
+        for order, (name, is_cover) in enumerate(images)
+    ]
+
+
+def _update_point(point, order, values, now):
+    """Apply ``values`` to an existing point; True if anything changed."""
+    image = values["image"] or None
+    if (
+        point.order == order
+        and (point.image.name or None) == image
+        and all(getattr(point, name) == values[name] for name in POINT_FIELDS)
+    ):
+        return False
+    for name in POINT_FIELDS:
+        setattr(point, name, values[name])
+    point.image = image
+    point.order = order
+    point.geohash = geohash_encode(point.latitude, point.longitude)
+    point.updated_at = now
+    return True
+
+
+def _bump_versions(created, updated):
+    if created:
+        bump_list_version()
+    for route_id in updated:
+        bump_route_version(route_id)
+
+
+def write_chunk(records, batch_size=1000):
+    """
+    Upsert cleaned records (``{external_id: clean_record()}``) in one
+    transaction; returns ``{"created", "updated", "unchanged", "points", "images"}``.
+    """
+    now = timezone.now()
+    stats = dict.fromkeys(("created", "updated", "unchanged", "points", "images"), 0)
+    with transaction.atomic():
+        existing = Route.objects.in_bulk(list(records), field_name="external_id")
+        current_points = defaultdict(list)
+        for point in RoutePoint.objects.filter(route__in=existing.values()).order_by("route_id", "order", "pk"):
+            current_points[point.route_id].append(point)
+        current_images = defaultdict(list)
+        for route_id, name, is_cover in (
+            RouteImage.objects.filter(route__in=existing.values())
+            .order_by("route_id", "order", "pk")
+            .values_list("route_id", "image", "is_cover")
+        ):
+            current_images[route_id].append((name, is_cover))
+
+        new_routes, changed_routes = [], []
+        points_to_create, points_to_update, points_to_delete = [], [], []
+        images_to_create, images_to_replace = [], []
+        for external_id, record in records.items():
+            route = existing.get(external_id)
+            if route is None:
+                new_routes.append((Route(external_id=external_id, **record["route"]), record))
+                continue
+            changed = False
+            if any(getattr(route, name) != value for name, value in record["route"].items()):
+                for name, value in record["route"].items():
+                    setattr(route, name, value)
+                changed = True
+            points = current_points[route.pk]
+            for order, values in enumerate(record["points"]):
+                if order >= len(points):
+                    points_to_create.append(_new_point(route, order, values))
+                    changed = True
+                elif _update_point(points[order], order, values, now):
+                    points_to_update.append(points[order])
+                    changed = True
+            if len(points) > len(record["points"]):
+                points_to_delete.extend(point.pk for point in points[len(record["points"]):])
+                changed = True
+            if current_images[route.pk] != record["images"]:
+                images_to_replace.append(route.pk)
+                images_to_create.extend(_new_images(route, record["images"]))
+                changed = True
+            if changed:
+                route.updated_at = now
+                changed_routes.append(route)
+                stats["points"] += len(record["points"])
+                stats["images"] += len(record["images"])
+            else:
+                stats["unchanged"] += 1
+
+        Route.objects.bulk_create([route for route, _ in new_routes], batch_size=batch_size)
+        for route, record in new_routes:
+            points_to_create.extend(_new_point(route, order, values) for order, values in enumerate(record["points"]))
+            images_to_create.extend(_new_images(route, record["images"]))
+            stats["points"] += len(record["points"])
+            stats["images"] += len(record["images"])
+        Route.objects.bulk_update(changed_routes, [*ROUTE_FIELDS, "updated_at"], batch_size=batch_size)
+        RoutePoint.objects.bulk_update(
+            points_to_update, [*POINT_FIELDS, "image", "order", "geohash", "updated_at"], batch_size=batch_size
+        )
+        # Лише зайві точки й старі фото; сигнали видалення оновлять те саме, що й нижче
+        if points_to_delete:
+            RoutePoint.objects.filter(pk__in=points_to_delete).delete()
+        if images_to_replace:
+            RouteImage.objects.filter(route_id__in=images_to_replace).delete()
+        RoutePoint.objects.bulk_create(points_to_create, batch_size=batch_size)
+        RouteImage.objects.bulk_create(images_to_create, batch_size=batch_size)
+
+        created = [route.pk for route, _ in new_routes]
+        updated = [route.pk for route in changed_routes]
+        if created or updated:
+            refresh_route_geometry(created + updated, batch_size=batch_size)
+            refresh_route_cards(created + updated)
+            get_search_backend().index_routes(created + updated)
+            transaction.on_commit(partial(_bump_versions, created, updated))
+    stats["created"] = len(created)
+    stats["updated"] = len(updated)
+    return stats
+
+
+def import_routes(rows, *, chunk_size=500, batch_size=1000, on_error=None, on_chunk=None):
+    """
+    Import ``(location, raw record)`` pairs from a reader. Invalid records are
+    passed to ``on_error(location, message)`` and skipped; ``on_chunk(stats)``
+    gets the running totals after every written chunk. Returns the totals.
+    """
+    totals = dict.fromkeys(("created", "updated", "unchanged", "points", "images", "errors"), 0)
+    chunk = {}
+
+    def flush():
+        for key, value in write_chunk(chunk, batch_size).items():
+            totals[key] += value
+        chunk.clear()
+        if on_chunk is not None:
+            on_chunk(totals)
+
+    for location, raw in rows:
+        try:
+            record = clean_record(raw)
+        except RowError as exc:
+            totals["errors"] += 1
+            if on_error is not None:
+                on_error(location, str(exc))
+            continue
+        # Повтор external_id у пачці: перемагає пізніший запис, як і між пачками
+        chunk[record["external_id"]] = record
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return totals
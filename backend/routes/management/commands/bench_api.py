@@ -0,0 +1,273 @@
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from routes.models import Rating, Route, RoutePointPhoto, UserRoute
+from routes.synthetic import CITIES, generate_dataset
+from routes.urls import async_routes_urlpatterns, routes_urlpatterns, user_routes_urlpatterns
+from users.urls import urlpatterns as users_urlpatterns
+
+# Ендпоінти, які бенчмарк свідомо не викликає
+SKIPPED = {
+    "point-photos": "upload writes files to the photo spool",
+    "route-points-optimize": "POST only; with save it rewrites the stop order",
+}
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` counting queries and their time (connection.queries rounds to 1 ms)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency, SQL query count / time and Python allocations for every endpoint in "
+        "routes/urls.py and users/urls.py, on a synthetic dataset (routes.synthetic) generated "
+        "inside a transaction that is rolled back. Results can be written as JSON and compared "
+        "with an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--routes-per-city", type=int, default=50)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--use-existing", action="store_true", help="Measure the data already in the database instead."
+        )
+        parser.add_argument("--repeat", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Keep the response cache between requests (by default every request is a cache miss).",
+        )
+        parser.add_argument("--only", nargs="+", metavar="NAME", help="Only these URL names.")
+        parser.add_argument("--output", type=Path, help="Write the results to this JSON file.")
+        parser.add_argument("--compare", type=Path, help="Print the change against this earlier JSON file.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = json.loads(options["compare"].read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        with transaction.atomic():
+            if options["use_existing"]:
+                dataset = None
+            else:
+                dataset = generate_dataset(
+                    routes_per_city=options["routes_per_city"],
+                    cities=tuple(CITIES),
+                    users=options["users"],
+                    seed=options["seed"],
+                )
+            cases = self._cases()
+            if options["only"]:
+                cases = [case for case in cases if case[1] in options["only"]]
+            results = {}
+            for label, name, args, params, user in cases:
+                results[label] = self._measure(name, args, params, user, options)
+            transaction.set_rollback(True)
+
+        report = {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": self._git_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "dataset": dataset,
+            "repeat": options["repeat"],
+            "warm_cache": options["warm_cache"],
+            "endpoints": results,
+        }
+        self._print(results, (baseline or {}).get("endpoints"))
+        if options["output"]:
+            options["output"].parent.mkdir(parents=True, exist_ok=True)
+            options["output"].write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _cases(self):
+        """``(label, url name, args, params, user)`` for every endpoint, on the busiest rows."""
+        route = Route.objects.annotate(n=Count("points")).order_by("-n", "pk").first()
+        user_route = (
+            UserRoute.objects.filter(user__in=UserRoute.objects.values("user"))
+            .annotate(n=Count("user__user_routes"))
+            .order_by("-n", "pk")
+            .select_related("user")
+            .first()
+        )
+        rating = Rating.objects.filter(route=route).select_related("user").first() if route else None
+        photo = RoutePointPhoto.objects.select_related("user").order_by("pk").first()
+        user = user_route.user if user_route else None
+        if route is None or user is None:
+            raise CommandError("Not enough data: needs routes and saved routes.")
+        city = route.city
+        if city in CITIES:
+            lat, lon = CITIES[city]
+        else:
+            # Найбільший маршрут може бути без точок, якщо їх немає ніде
+            point = route.points.first()
+            lat, lon = (point.latitude, point.longitude) if point else next(iter(CITIES.values()))
+
+        cases = [
+            ("route-list", "route-list", [], {}, None),
+            ("route-list ?city&ordering", "route-list", [], {"city": city, "ordering": "-avg_rating"}, None),
+            ("route-list ?search", "route-list", [], {"search": "парк"}, None),
+            ("route-list ?cursor", "route-list", [], {"cursor": ""}, None),
+            ("route-list (auth)", "route-list", [], {}, user),
+            ("route-nearby", "route-nearby", [], {"lat": lat, "lon": lon, "radius": 5}, None),
+            ("route-detail", "route-detail", [route.pk], {}, None),
+            ("route-detail (auth)", "route-detail", [route.pk], {}, user),
+            ("route-points", "route-points", [route.pk], {}, None),
+            ("route-export", "route-export", [], {"format": "ndjson"}, user),
+            ("route-ratings", "route-ratings", [route.pk], {}, None),
+            ("user-route-list", "user-route-list", [], {}, user),
+            ("user-route-detail", "user-route-detail", [user_route.pk], {}, user),
+            ("async-route-list", "async-route-list", [], {}, None),
+            ("async-route-detail", "async-route-detail", [route.pk], {}, None),
+            ("user-me", "user-me", [], {}, user),
+            ("user-stats", "user-stats", [], {}, user),
+        ]
+        if rating is not None:
+            cases.append(("route-rating-detail", "route-rating-detail", [route.pk, rating.pk], {}, rating.user))
+        if photo is not None:
+            cases.append(("point-photo-detail", "point-photo-detail", [photo.pk], {}, photo.user))
+
+        patterns = [*routes_urlpatterns, *user_routes_urlpatterns, *async_routes_urlpatterns, *users_urlpatterns]
+        covered = {case[1] for case in cases} | set(SKIPPED)
+        for pattern in patterns:
+            if pattern.name not in covered:
+                self.stderr.write(f"No benchmark case for {pattern.name!r}")
+        return cases
+
+    def _measure(self, name, args, params, user, options):
+        client = Client()
+        headers = {}
+        if user is not None:
+            headers["Authorization"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        url = reverse(name, args=args)
+
+        def request():
+            if not options["warm_cache"]:
+                cache.clear()
+            response = client.get(url, params, headers=headers)
+            return response, self._read(response)
+
+        for _ in range(options["warmup"]):
+            request()
+        timings = []
+        for _ in range(options["repeat"]):
+            if not options["warm_cache"]:
+                cache.clear()
+            started = time.perf_counter()
+            self._read(client.get(url, params, headers=headers))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response, body = request()
+        # Окремий прохід: tracemalloc сповільнює виконання в рази
+        tracemalloc.start()
+        try:
+            request()
+            allocated, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            "url": url,
+            "params": params,
+            "authenticated": user is not None,
+            "status": response.status_code,
+            "bytes": len(body),
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(self._percentile(timings, 95), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "min_ms": round(min(timings), 3),
+            "queries": timer.count,
+            "sql_ms": round(timer.seconds * 1000, 3),
+            "alloc_peak_kb": round(peak / 1024, 1),
+            "alloc_retained_kb": round(allocated / 1024, 1),
+        }
+
+    @staticmethod
+    def _read(response):
+        # Потокова відповідь (route-export) виконує запити лише під час читання
+        return b"".join(response.streaming_content) if response.streaming else response.content
+
+    @staticmethod
+    def _percentile(values, percent):
+        if len(values) < 2:
+            return values[0]
+        return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+    @staticmethod
+    def _git_commit():
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                timeout=5,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return result.stdout.strip() or None
+
+    def _print(self, results, baseline):
+        header = (
+            f"{'endpoint':<28}{'status':>7}{'p50 ms':>9}{'p95 ms':>9}{'queries':>8}"
+            f"{'sql ms':>8}{'alloc KB':>10}{'bytes':>9}"
+        )
+        if baseline:
+            header += f"{'Δ p50':>9}{'Δ queries':>10}{'Δ alloc':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for label, row in results.items():
+            line = (
+                f"{label:<28}{row['status']:>7}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['queries']:>8}"
+                f"{row['sql_ms']:>8.2f}{row['alloc_peak_kb']:>10.1f}{row['bytes']:>9}"
+            )
+            before = (baseline or {}).get(label)
+            if before:
+                line += (
+                    f"{self._change(row['p50_ms'], before['p50_ms']):>9}"
+                    f"{row['queries'] - before['queries']:>+10}"
+                    f"{self._change(row['alloc_peak_kb'], before['alloc_peak_kb']):>9}"
+                )
+            self.stdout.write(line)
+
+    @staticmethod
+    def _change(now, before):
+        if not before:
+            return "n/a"
+        return f"{(now - before) / before:+.0%}"
@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.settings import api_settings
+
+from core.testing import StubHTTPServer
+from routes.cards import rebuild_route_cards
+from routes.models import Route, RouteImage, RoutePoint
+
+CITIES = ["Lviv", "Kyiv", "Odesa", "Kharkiv", "Dnipro"]
+
+WEATHER = {
+    "name": "Lviv",
+    "sys": {"country": "UA"},
+    "main": {"temp": 21.5, "feels_like": 20.9, "humidity": 40},
+    "weather": [{"description": "clear sky", "icon": "01d"}],
+    "wind": {"speed": 3.1},
+}
+
+
+def _wsgi_command(port, options):
+    return [sys.executable] + (
+        f"-m gunicorn config.wsgi:application --bind 127.0.0.1:{port} --worker-class gthread "
+        f"--workers {options['workers']} --threads {options['threads']}"
+    ).split()
+
+
+def _asgi_command(port, options):
+    return [sys.executable] + (
+        f"-m uvicorn config.asgi:application --host 127.0.0.1 --port {port} "
+        f"--workers {options['workers']} --no-access-log"
+    ).split()
+
+
+# Сервер -> (команда запуску, префікс API): WSGI обслуговує sync-представлення, ASGI — async
+SERVERS = {
+    "wsgi": (_wsgi_command, "/api/"),
+    "asgi": (_asgi_command, "/api/async/"),
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests per second and p99 latency of the route list, route detail and weather "
+        "endpoints under concurrent load: gunicorn (gthread) with the sync views against "
+        "uvicorn with the async ones. Both servers use a throwaway SQLite database and a "
+        "local OpenWeatherMap stub with a fixed latency; needs gunicorn and uvicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--routes", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--duration", type=float, default=10, help="Seconds per endpoint.")
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--threads", type=int, default=8, help="Threads per gunicorn worker.")
+        parser.add_argument("--weather-latency", type=float, default=100, help="Stub latency, ms.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--seed-only", action="store_true", help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["seed_only"]:
+            self._generate(random.Random(options["seed"]), options["routes"])
+            return
+
+        latency = options["weather_latency"] / 1000
+
+        def respond(handler):
+            time.sleep(latency)
+            return 200, WEATHER, None
+
+        stub = StubHTTPServer(respond)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {
+                    **os.environ,
+                    "DATABASE_URL": f"sqlite:///{Path(tmp) / 'bench.sqlite3'}",
+                    # Без кешу: кожен запит іде в БД і до upstream — міряємо саме очікування
+                    "CACHE_URL": "dummycache://",
+                    "OPENWEATHER_URL": stub.url("/data/2.5/weather"),
+                    "OPENWEATHER_API_KEY": "bench",
+                    "DEBUG": "False",
+                    "ALLOWED_HOSTS": "127.0.0.1",
+                }
+                self._seed(env, options)
+                header = (
+                    f"{'server':<8}{'endpoint':<10}{'requests':>10}{'errors':>8}"
+                    f"{'rps':>9}{'p50 ms':>9}{'p99 ms':>9}"
+                )
+                self.stdout.write(header)
+                self.stdout.write("-" * len(header))
+                for name, (command, prefix) in SERVERS.items():
+                    log = Path(tmp) / f"{name}.log"
+                    for endpoint, row in self._bench_server(command, prefix, env, log, options):
+                        self.stdout.write(f"{name:<8}{endpoint:<10}{row}")
+        finally:
+            stub.close()
+
+    def _seed(self, env, options):
+        """Migrates the throwaway database and fills it in a child process with the same env."""
+        started = time.perf_counter()
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+        seed = f"bench_asgi --seed-only --routes {options['routes']} --seed {options['seed']}".split()
+        for command in ("migrate -v 0".split(), seed):
+            subprocess.run(manage + command, env=env, cwd=settings.BASE_DIR, check=True)
+        self.stdout.write(f"Generated {options['routes']} routes in {time.perf_counter() - started:.1f}s")
+
+    def _generate(self, rng, total):
+        with transaction.atomic():
+            routes = Route.objects.bulk_create(
+                Route(
+                    name=f"Synthetic {i}",
+                    city=rng.choice(CITIES),
+                    mood=rng.choice(Route.Mood.values),
+                    budget_max=rng.randint(0, 500),
+                    estimated_duration=rng.randint(30, 300),
+                )
+                for i in range(total)
+            )
+            RouteImage.objects.bulk_create(
+                RouteImage(route=route, image=f"routes/{route.pk}.jpg", is_cover=True) for route in routes
+            )
+            RoutePoint.objects.bulk_create(
+                RoutePoint(
+                    route=route,
+                    name=f"Stop {order}",
+                    latitude=round(49.84 + rng.uniform(-0.05, 0.05), 6),
+                    longitude=round(24.03 + rng.uniform(-0.05, 0.05), 6),
+                    order=order,
+                )
+                for route in routes
+                for order in range(5)
+            )
+            rebuild_route_cards()
+
+    def _bench_server(self, command, prefix, env, log, options):
+        port = _free_port()
+        with log.open("wb") as output:
+            process = subprocess.Popen(
+                command(port, options), env=env, cwd=settings.BASE_DIR, stdout=output, stderr=output
+            )
+        try:
+            base = f"http://127.0.0.1:{port}{prefix}"
+            self._wait_until_ready(process, base + "routes/", log)
+            pages = max(1, min(5, options["routes"] // api_settings.PAGE_SIZE))
+            endpoints = {
+                "list": lambda rng: (base + "routes/", {"page": rng.randint(1, pages)}),
+                "detail": lambda rng: (base + f"routes/{rng.randint(1, options['routes'])}/", None),
+                "weather": lambda rng: (base + "weather/", {"city": rng.choice(CITIES)}),
+            }
+            rows = []
+            for endpoint, make_request in endpoints.items():
+                timings, errors, elapsed = asyncio.run(
+                    self._load(make_request, options["concurrency"], options["duration"], options["seed"])
+                )
+                rows.append((endpoint, self._format(timings, errors, elapsed)))
+            return rows
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    @staticmethod
+    def _wait_until_ready(process, url, log, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"{process.args[2]} exited: {log.read_text()[-1000:]}")
+            try:
+                httpx.get(url, timeout=1)
+                return
+            except httpx.TransportError:
+                time.sleep(0.2)
+        raise CommandError(f"{process.args[2]} did not start within {timeout}s.")
+
+    @staticmethod
+    async def _load(make_request, concurrency, duration, seed):
+        """Keeps ``concurrency`` requests in flight: a one-second warm-up, then ``duration`` seconds."""
+        timings, errors = [], []
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+
+            async def worker(rng, stop_at):
+                while time.perf_counter() < stop_at:
+                    url, params = make_request(rng)
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(url, params=params)
+                    except httpx.HTTPError as exc:
+                        errors.append(exc)
+                        continue
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+                        continue
+                    timings.append((time.perf_counter() - started) * 1000)
+
+            async def run(seconds):
+                stop_at = time.perf_counter() + seconds
+                await asyncio.gather(*(worker(random.Random(seed + i), stop_at) for i in range(concurrency)))
+
+            await run(1)
+            timings.clear()
+            errors.clear()
+            started = time.perf_counter()
+            await run(duration)
+            return timings, len(errors), time.perf_counter() - started
+
+    @staticmethod
+    def _format(timings, errors, elapsed):
+        if len(timings) < 2:
+            return f"{len(timings):>10}{errors:>8}{'-':>9}{'-':>9}{'-':>9}"
+        p99 = statistics.quantiles(timings, n=100)[98]
+        return (
+            f"{len(timings):>10}{errors:>8}{len(timings) / elapsed:>9.0f}"
+            f"{statistics.median(timings):>9.1f}{p99:>9.1f}"
+        )
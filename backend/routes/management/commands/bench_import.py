@@ -0,0 +1,130 @@
+import csv
+import json
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from routes.importer import CSV_IMAGE_SEPARATOR, CSV_POINT_PREFIX, FORMATS, POINT_FIELDS, READERS, import_routes
+from routes.models import Route
+from routes.synthetic import CITIES, PLACES, SENTENCE, STREETS
+
+
+class Command(BaseCommand):
+    help = (
+        "Throughput of import_routes (routes.importer): writes a synthetic file "
+        "(100k routes / 1M points by default), imports it, then imports it again to "
+        "measure the idempotent pass. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--routes", type=int, default=100_000)
+        parser.add_argument("--points", type=int, default=10, help="Points per route.")
+        parser.add_argument("--format", choices=FORMATS, default="jsonl")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--file", type=Path, help="Keep the generated file here instead of a temp dir.")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = options["file"] or Path(tmp) / f"routes.{options['format']}"
+            started = time.perf_counter()
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                getattr(self, f"_write_{options['format']}")(file, self._records(options))
+            self.stdout.write(
+                f"Wrote {options['routes']} routes / {options['routes'] * options['points']} points "
+                f"({path.stat().st_size / 1024 / 1024:.1f} MB) in {time.perf_counter() - started:.2f}s"
+            )
+            with transaction.atomic():
+                existing = Route.objects.count()
+                for label in ("first import", "re-import"):
+                    self._run(label, path, options)
+                self.stdout.write(f"Routes in the database: {existing} before, {Route.objects.count()} after")
+                transaction.set_rollback(True)
+        self.stdout.write("Rolled back.")
+
+    def _run(self, label, path, options):
+        started = time.perf_counter()
+        with open(path, encoding="utf-8", newline="") as file:
+            totals = import_routes(
+                READERS[options["format"]](file),
+                chunk_size=options["chunk_size"],
+                batch_size=options["batch_size"],
+            )
+        elapsed = time.perf_counter() - started
+        routes = totals["created"] + totals["updated"] + totals["unchanged"]
+        # ru_maxrss — пік процесу в КБ (Linux); має лишатися пласким незалежно від розміру файлу
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            f"{label:<13} {elapsed:8.2f}s {routes / elapsed:9.0f} routes/s {totals['points'] / elapsed:9.0f} points/s  "
+            f"created {totals['created']}, updated {totals['updated']}, unchanged {totals['unchanged']}, "
+            f"errors {totals['errors']}; peak RSS {peak:.0f} MB"
+        )
+
+    @staticmethod
+    def _records(options):
+        rng = random.Random(options["seed"])
+        cities = list(CITIES)
+        for i in range(options["routes"]):
+            city = cities[i % len(cities)]
+            lat, lon = CITIES[city]
+            yield {
+                "external_id": f"bench-{i}",
+                "name": f"{city} {rng.choice(PLACES).lower()} {i}",
+                "description": SENTENCE * rng.randint(1, 4),
+                "city": city,
+                "mood": rng.choice(Route.Mood.values),
+                "category": rng.choice(Route.Category.values),
+                "budget_min": rng.randint(0, 300),
+                "budget_max": rng.randint(300, 3000),
+                "estimated_duration": rng.randint(30, 480),
+                "points": [
+                    {
+                        "name": f"{rng.choice(PLACES)} {order + 1}",
+                        "description": "",
+                        "address": f"вул. {rng.choice(STREETS)}, {rng.randint(1, 120)}",
+                        "latitude": round(lat + rng.uniform(-0.045, 0.045), 6),
+                        "longitude": round(lon + rng.uniform(-0.07, 0.07), 6),
+                        "duration_at_stop": rng.choice((10, 15, 30, 60)),
+                    }
+                    for order in range(options["points"])
+                ],
+                "images": [{"image": f"routes/bench/{i}.jpg", "is_cover": True}],
+            }
+
+    @staticmethod
+    def _write_jsonl(file, records):
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def _write_csv(file, records):
+        writer = None
+        for record in records:
+            points = record.pop("points")
+            record["images"] = CSV_IMAGE_SEPARATOR.join(image["image"] for image in record["images"])
+            if writer is None:
+                fields = [*record, *(CSV_POINT_PREFIX + name for name in POINT_FIELDS)]
+                writer = csv.DictWriter(file, fields)
+                writer.writeheader()
+            for point in points:
+                writer.writerow({**record, **{CSV_POINT_PREFIX + key: value for key, value in point.items()}})
+
+    @staticmethod
+    def _write_geojson(file, records):
+        file.write('{"type": "FeatureCollection", "features": [\n')
+        for index, record in enumerate(records):
+            points = record.pop("points")
+            coordinates = [[point.pop("longitude"), point.pop("latitude")] for point in points]
+            feature = {
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": coordinates},
+                "properties": {**record, "points": points},
+            }
+            file.write(("," if index else "") + json.dumps(feature, ensure_ascii=False) + "\n")
+        file.write("]}\n")
@@ -0,0 +1,124 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+
+from routes.cards import rebuild_route_cards
+from routes.geo import bounding_box, geohash_encode, haversine_m
+from routes.models import Route, RoutePoint
+from routes.nearby import route_distances
+
+CITIES = {
+    "Lviv": (49.8419, 24.0316),
+    "Kyiv": (50.4501, 30.5234),
+    "Odesa": (46.4825, 30.7233),
+    "Kharkiv": (49.9935, 36.2304),
+    "Dnipro": (48.4647, 35.0462),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency of /api/routes/nearby/ against a bounding-box scan without the geohash "
+        "index. Data is generated inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=1_000_000)
+        parser.add_argument("--points-per-route", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            self._generate(rng, options["points"], options["points_per_route"])
+            client = Client()
+            lat, lon = CITIES["Lviv"]
+            header = (
+                f"{'radius km':>10}{'routes':>9}{'bbox scan ms':>15}"
+                f"{'geohash ms':>13}{'endpoint ms':>14}"
+            )
+            self.stdout.write(header)
+            self.stdout.write("-" * len(header))
+            for radius_km in (0.5, 1, 3, 10):
+                scan_ms, _ = self._median(options["repeat"], self._bbox_scan, lat, lon, radius_km * 1000)
+                index_ms, found = self._median(options["repeat"], route_distances, lat, lon, radius_km * 1000)
+                endpoint_ms, _ = self._median(
+                    options["repeat"],
+                    client.get,
+                    "/api/routes/nearby/",
+                    {"lat": lat, "lon": lon, "radius": radius_km},
+                )
+                self.stdout.write(
+                    f"{radius_km:>10}{len(found):>9}{scan_ms:>15.2f}{index_ms:>13.2f}{endpoint_ms:>14.2f}"
+                )
+            transaction.set_rollback(True)
+
+    def _generate(self, rng, total_points, per_route):
+        started = time.perf_counter()
+        routes = [
+            Route(
+                name=f"Synthetic {i}",
+                city=city,
+                mood=rng.choice(Route.Mood.values),
+                budget_max=rng.randint(0, 500),
+                estimated_duration=rng.randint(30, 300),
+            )
+            for i, city in enumerate(rng.choices(list(CITIES), k=total_points // per_route))
+        ]
+        Route.objects.bulk_create(routes, batch_size=5000)
+        batch = []
+        for route in routes:
+            # Маршрут — ланцюжок точок у радіусі ~15 км від центру міста
+            lat, lon = CITIES[route.city]
+            lat += rng.gauss(0, 0.06)
+            lon += rng.gauss(0, 0.09)
+            for order in range(per_route):
+                lat += rng.uniform(-0.003, 0.003)
+                lon += rng.uniform(-0.004, 0.004)
+                batch.append(
+                    RoutePoint(
+                        route=route,
+                        name=f"Stop {order}",
+                        latitude=round(lat, 6),
+                        longitude=round(lon, 6),
+                        geohash=geohash_encode(lat, lon),  # bulk_create оминає pre_save
+                        order=order,
+                    )
+                )
+            if len(batch) >= 10_000:
+                RoutePoint.objects.bulk_create(batch)
+                batch = []
+        RoutePoint.objects.bulk_create(batch)
+        rebuild_route_cards()
+        self.stdout.write(
+            f"Generated {len(routes)} routes / {total_points} points "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    @staticmethod
+    def _bbox_scan(lat, lon, radius_m):
+        """Baseline: the same query as route_distances, filtered by lat/lon ranges."""
+        min_lat, min_lon, max_lat, max_lon = bounding_box(lat, lon, radius_m)
+        distances = {}
+        rows = RoutePoint.objects.filter(
+            latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon)
+        ).values_list("route_id", "latitude", "longitude")
+        for route_id, plat, plon in rows.iterator(chunk_size=5000):
+            d = haversine_m(lat, lon, float(plat), float(plon))
+            if d <= radius_m and d < distances.get(route_id, radius_m + 1):
+                distances[route_id] = d
+        return distances
+
+    @staticmethod
+    def _median(repeat, func, *args):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(*args)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), result
@@ -0,0 +1,133 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from core.middleware import brotli
+from core.renderers import FastJSONRenderer, orjson
+from routes.cards import rebuild_route_cards
+from routes.geo import geohash_encode
+from routes.models import Route, RouteImage, RoutePoint, RoutePointPhoto
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode time of JSONRenderer against FastJSONRenderer (orjson) and response size "
+        "with gzip / brotli for /api/routes/ pages and a large /api/routes/<id>/. "
+        "Data is generated inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=60, help="Points of the detail route.")
+        parser.add_argument("--photos", type=int, default=5, help="User photos per point.")
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed.")
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            route = self._generate(rng, options["points"], options["photos"])
+            client = Client()
+            payloads = {
+                "list 20": client.get("/api/routes/").data,
+                "nearby 100": client.get(
+                    "/api/routes/nearby/", {"lat": 49.84, "lon": 24.03, "radius": 10, "limit": 100}
+                ).data,
+                "detail": client.get(f"/api/routes/{route.pk}/").data,
+            }
+            transaction.set_rollback(True)
+
+        header = (
+            f"{'payload':<10}{'json ms':>9}{'orjson ms':>11}{'speedup':>9}"
+            f"{'bytes':>9}{'gzip':>8}{'gzip ms':>9}{'br':>8}{'br ms':>7}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        repeat = options["repeat"]
+        for name, data in payloads.items():
+            json_ms, expected = self._median(repeat, JSONRenderer().render, data)
+            orjson_ms, body = self._median(repeat, FastJSONRenderer().render, data)
+            if body != expected:
+                raise CommandError(f"FastJSONRenderer output differs for {name}.")
+            gzip_ms, gzipped = self._median(repeat, compress_string, body)
+            row = (
+                f"{name:<10}{json_ms:>9.3f}{orjson_ms:>11.3f}{json_ms / orjson_ms:>8.1f}x"
+                f"{len(body):>9}{len(gzipped):>8}{gzip_ms:>9.3f}"
+            )
+            if brotli is not None:
+                br_ms, compressed = self._median(
+                    repeat, lambda raw: brotli.compress(raw, quality=settings.COMPRESSION_BROTLI_QUALITY), body
+                )
+                row += f"{len(compressed):>8}{br_ms:>7.3f}"
+            self.stdout.write(row)
+
+    def _generate(self, rng, points, photos):
+        routes = Route.objects.bulk_create(
+            Route(
+                name=f"Synthetic {i}",
+                description="Прогулянка старим містом. " * rng.randint(5, 20),
+                city=rng.choice(("Lviv", "Kyiv", "Odesa")),
+                mood=rng.choice(Route.Mood.values),
+                budget_min=Decimal(rng.randint(0, 10000)) / 100,
+                budget_max=Decimal(rng.randint(10000, 50000)) / 100,
+                estimated_duration=rng.randint(30, 300),
+            )
+            for i in range(100)
+        )
+        RouteImage.objects.bulk_create(
+            RouteImage(route=route, image=f"routes/{route.pk}.jpg", is_cover=True) for route in routes
+        )
+        route = routes[0]
+        stops = RoutePoint.objects.bulk_create(
+            self._point(
+                rng,
+                route=route,
+                name=f"Зупинка {order}",
+                description="Кав'ярня з видом на площу. " * rng.randint(1, 4),
+                address=f"вул. Площа Ринок, {order}",
+                order=order,
+                duration_at_stop=rng.randint(5, 60),
+            )
+            for order in range(points)
+        )
+        RoutePoint.objects.bulk_create(self._point(rng, route=other, name="Старт") for other in routes[1:])
+        user = User.objects.create_user(username="bench", email="bench@example.com", first_name="Bench")
+        RoutePointPhoto.objects.bulk_create(
+            RoutePointPhoto(point=stop, user=user, image=f"user_point_photos/{stop.pk}-{i}.jpg")
+            for stop in stops
+            for i in range(photos)
+        )
+        rebuild_route_cards()
+        return route
+
+    @staticmethod
+    def _point(rng, **fields):
+        lat, lon = rng.uniform(49.80, 49.88), rng.uniform(23.98, 24.08)
+        # bulk_create оминає pre_save, тож geohash для /nearby/ — вручну
+        return RoutePoint(
+            latitude=round(Decimal(lat), 6),
+            longitude=round(Decimal(lon), 6),
+            geohash=geohash_encode(lat, lon),
+            **fields,
+        )
+
+    @staticmethod
+    def _median(repeat, func, *args):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(*args)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), result
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from routes.models import Route
+from routes.search import LikeSearchBackend, get_search_backend
+
+CITIES = ("Lviv", "Kyiv", "Odesa", "Kharkiv", "Dnipro", "Ivano-Frankivsk", "Uzhhorod", "Chernivtsi")
+WORDS = (
+    "парк", "кава", "музей", "площа", "собор", "набережна", "ринок", "галерея", "театр",
+    "сквер", "фортеця", "вежа", "міст", "бульвар", "ботанічний", "сад", "озеро", "пагорб",
+    "старе", "місто", "вечірній", "ранковий", "прогулянка", "екскурсія", "історія", "архітектура",
+    "park", "coffee", "museum", "square", "river", "castle", "market", "gallery", "old", "town",
+)
+QUERIES = ("парк", "кава музей", "Lviv", "фортеця", "набереж", "old town", "історія архітектура")
+SYLLABLES = ("ко", "ла", "ми", "ре", "ту", "ва", "ні", "бо", "се", "да", "ри", "пу", "ле", "жи")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark ?search= on routes: the indexed backend against the LIKE filter. "
+        "Data is generated inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--routes", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        # Шум зі згенерованих слів, щоб тематичні слова траплялись у кількох % описів
+        filler = ["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(5000)]
+        with transaction.atomic():
+            self._generate(rng, filler, options["routes"])
+            backend = get_search_backend()
+            started = time.perf_counter()
+            backend.rebuild()
+            self.stdout.write(
+                f"{type(backend).__name__}: indexed {options['routes']} routes "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+
+            header = f"{'query':<22}{'hits':>8}{'LIKE ms':>12}{'indexed ms':>13}{'speedup':>10}"
+            self.stdout.write(header)
+            self.stdout.write("-" * len(header))
+            for query in QUERIES:
+                terms = query.split()
+                like_ms, hits = self._measure(LikeSearchBackend(), terms, options["repeat"])
+                indexed_ms, _ = self._measure(backend, terms, options["repeat"])
+                self.stdout.write(
+                    f"{query:<22}{hits:>8}{like_ms:>12.2f}{indexed_ms:>13.2f}"
+                    f"{like_ms / indexed_ms:>9.1f}x"
+                )
+            transaction.set_rollback(True)
+
+    def _generate(self, rng, filler, count):
+        started = time.perf_counter()
+        batch = []
+        for _ in range(count):
+            batch.append(
+                Route(
+                    name=" ".join([rng.choice(WORDS), *rng.sample(filler, 2)]).capitalize(),
+                    city=rng.choice(CITIES),
+                    description=" ".join(
+                        rng.sample(filler, rng.randint(15, 40)) + rng.sample(WORDS, 2)
+                    ),
+                    mood=rng.choice(Route.Mood.values),
+                    budget_min=0,
+                    budget_max=rng.randint(0, 500),
+                    estimated_duration=rng.randint(30, 300),
+                )
+            )
+            if len(batch) == 5000:
+                Route.objects.bulk_create(batch)
+                batch = []
+        Route.objects.bulk_create(batch)
+        self.stdout.write(f"Generated {count} routes in {time.perf_counter() - started:.2f}s")
+
+    def _measure(self, backend, terms, repeat):
+        """Median time of what the list endpoint runs: COUNT(*) plus the first page."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            qs = backend.search(Route.objects.all(), terms)
+            hits = qs.count()
+            list(qs.order_by("search_rank", "-created_at")[:20])
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), hits
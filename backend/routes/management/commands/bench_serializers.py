@@ -0,0 +1,96 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from routes.cards import rebuild_route_cards
+from routes.fastpath import CardRowSerializer
+from routes.models import Route, RouteCard, RouteImage, RoutePoint
+from routes.serializers import RouteCardSerializer
+
+CITIES = ("Lviv", "Kyiv", "Odesa", "Kharkiv", "Dnipro")
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialization of a /api/routes/ page: RouteCardSerializer over model instances "
+        "against the .values() fast path (routes.fastpath), query included. Checks that "
+        "both render the same bytes. Data is generated inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[20, 100, 1000])
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            self._generate(rng, max(options["rows"]))
+            request = Request(APIRequestFactory().get("/api/routes/"))
+            context = {"request": request, "include_user_state": False}
+            renderer = JSONRenderer()
+
+            def serializer_path(n):
+                cards = RouteCard.objects.all()[:n]
+                return renderer.render(RouteCardSerializer(cards, many=True, context=context).data)
+
+            def fast_path(n):
+                row_serializer = CardRowSerializer(RouteCardSerializer(context=context))
+                rows = row_serializer.values(RouteCard.objects.all())[:n]
+                return renderer.render(row_serializer.to_representation(rows))
+
+            header = f"{'rows':>6}{'serializer ms':>15}{'fast path ms':>14}{'speedup':>10}"
+            self.stdout.write(header)
+            self.stdout.write("-" * len(header))
+            for n in options["rows"]:
+                serializer_ms, expected = self._median(options["repeat"], serializer_path, n)
+                fast_ms, body = self._median(options["repeat"], fast_path, n)
+                if body != expected:
+                    raise CommandError(f"Fast path output differs at {n} rows.")
+                self.stdout.write(f"{n:>6}{serializer_ms:>15.2f}{fast_ms:>14.2f}{serializer_ms / fast_ms:>9.1f}x")
+            transaction.set_rollback(True)
+
+    def _generate(self, rng, count):
+        routes = Route.objects.bulk_create(
+            Route(
+                name=f"Synthetic {i}",
+                city=rng.choice(CITIES),
+                mood=rng.choice(Route.Mood.values),
+                category=rng.choice(Route.Category.values),
+                budget_min=Decimal(rng.randint(0, 10000)) / 100,
+                budget_max=Decimal(rng.randint(10000, 50000)) / 100,
+                estimated_duration=rng.randint(30, 300),
+                avg_rating=Decimal(rng.randint(100, 500)) / 100,
+                rating_count=rng.randint(0, 50),
+            )
+            for i in range(count)
+        )
+        RouteImage.objects.bulk_create(
+            RouteImage(route=route, image=f"routes/{route.pk}.jpg", is_cover=True) for route in routes
+        )
+        RoutePoint.objects.bulk_create(
+            RoutePoint(
+                route=route,
+                name="Start",
+                latitude=round(Decimal(rng.uniform(46, 51)), 6),
+                longitude=round(Decimal(rng.uniform(23, 37)), 6),
+            )
+            for route in routes
+        )
+        rebuild_route_cards()
+
+    @staticmethod
+    def _median(repeat, func, *args):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(*args)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), result
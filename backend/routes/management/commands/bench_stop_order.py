@@ -0,0 +1,63 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from routes import ordering
+from routes.synthetic import CITIES
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency and quality of the stop-order heuristic (routes.ordering) on random "
+        "points around a city: distance matrix, full solve, and path length against "
+        "the nearest-neighbour tour and the original (random) order. No database access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 200])
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--no-numpy", action="store_true", help="Force the pure-Python fallback.")
+
+    def handle(self, *args, **options):
+        numpy = ordering.np
+        if options["no_numpy"]:
+            ordering.np = None
+        try:
+            self._run(options)
+        finally:
+            ordering.np = numpy
+
+    def _run(self, options):
+        rng = random.Random(options["seed"])
+        lat, lon = CITIES["Lviv"]
+        self.stdout.write(f"numpy: {'off' if ordering.np is None else ordering.np.__version__}")
+        header = (
+            f"{'stops':>6}{'matrix ms':>11}{'solve ms':>10}{'random km':>11}"
+            f"{'NN km':>9}{'optimized km':>14}{'vs NN':>8}{'vs random':>11}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for size in options["sizes"]:
+            matrix_ms, solve_ms, lengths = [], [], []
+            for _ in range(options["repeat"]):
+                lats = [lat + rng.uniform(-0.045, 0.045) for _ in range(size)]
+                lons = [lon + rng.uniform(-0.07, 0.07) for _ in range(size)]
+                started = time.perf_counter()
+                distances = ordering.distance_matrix(lats, lons)
+                matrix_ms.append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                order, _ = ordering.optimize_order(lats, lons, start=0)
+                solve_ms.append((time.perf_counter() - started) * 1000)
+                nearest = ordering._nearest_neighbour(distances, 0)
+                lengths.append(
+                    [sum(ordering.path_legs(distances, path)) / 1000 for path in (range(size), nearest, order)]
+                )
+            current, nearest, optimized = (statistics.mean(column) for column in zip(*lengths))
+            self.stdout.write(
+                f"{size:>6}{statistics.median(matrix_ms):>11.2f}{statistics.median(solve_ms):>10.2f}"
+                f"{current:>11.1f}{nearest:>9.1f}{optimized:>14.1f}"
+                f"{(1 - optimized / nearest) * 100:>7.1f}%{(1 - optimized / current) * 100:>10.1f}%"
+            )
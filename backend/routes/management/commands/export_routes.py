@@ -0,0 +1,74 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from routes.export import STREAMS, changed_since, parse_updated_since
+from routes.filters import RouteFilter
+from routes.models import Route
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the route catalogue with points and images as NDJSON or a GeoJSON FeatureCollection "
+        "(routes.export). The output can be imported again with import_routes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=STREAMS, default="ndjson")
+        parser.add_argument("--output", help="File to write (.gz is compressed); stdout by default.")
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="NAME=VALUE",
+            help="RouteFilter parameter, e.g. --filter city=Lviv --filter budget_max__lte=500 (repeatable).",
+        )
+        parser.add_argument("--updated-since", help="ISO date or datetime; routes whose data changed since then.")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        params = {}
+        for item in options["filter"]:
+            name, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"--filter expects NAME=VALUE, got {item!r}.")
+            params[name] = value
+        unknown = set(params) - set(RouteFilter.base_filters)
+        if unknown:
+            raise CommandError(f"Unknown filters: {', '.join(sorted(unknown))}.")
+        filterset = RouteFilter(params, queryset=Route.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(f"Invalid filters: {dict(filterset.errors)}")
+        queryset = filterset.qs
+        if options["updated_since"]:
+            try:
+                queryset = changed_since(queryset, parse_updated_since(options["updated_since"]))
+            except ValueError as exc:
+                raise CommandError(f"--updated-since: {exc}")
+
+        started = time.perf_counter()
+        written = 0
+        output = options["output"]
+        if output is None:
+            file = sys.stdout.buffer
+        elif output.endswith(".gz"):
+            file = gzip.open(output, "wb")
+        else:
+            file = open(output, "wb")
+        try:
+            for chunk in STREAMS[options["format"]](queryset, options["chunk_size"]):
+                file.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not None:
+                file.close()
+            else:
+                file.flush()
+        if output is not None:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Wrote {written / 1024 / 1024:.1f} MB to {output} in {time.perf_counter() - started:.2f}s"
+                )
+            )
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from routes.images import refresh_derivatives
+from routes.models import RouteImage, RoutePoint, RoutePointPhoto
+
+MODELS = {
+    "route_images": RouteImage,
+    "points": RoutePoint,
+    "point_photos": RoutePointPhoto,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate thumb / card / full derivatives (routes.images) for images that have none "
+        "or whose derivatives belong to a replaced file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=MODELS, action="append", help="Limit to these models (repeatable)."
+        )
+        parser.add_argument("--force", action="store_true", help="Regenerate existing derivatives too.")
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = {"generated": 0, "skipped": 0, "failed": 0}
+        for label in options["model"] or MODELS:
+            queryset = MODELS[label].objects.exclude(image="").exclude(image=None).order_by("pk")
+            batch = []
+            for instance in queryset.iterator(chunk_size=options["batch_size"]):
+                if not options["force"] and instance.derivatives.get("source") == instance.image.name:
+                    counts["skipped"] += 1
+                    continue
+                batch.append(instance)
+                if len(batch) == options["batch_size"]:
+                    self._process(batch, counts)
+                    batch = []
+            self._process(batch, counts)
+        elapsed = time.perf_counter() - started
+        summary = (
+            f"Generated derivatives for {counts['generated']} images, "
+            f"skipped {counts['skipped']}, failed {counts['failed']} in {elapsed:.2f}s"
+        )
+        self.stdout.write(self.style.WARNING(summary) if counts["failed"] else self.style.SUCCESS(summary))
+
+    @staticmethod
+    def _process(batch, counts):
+        # Одна транзакція на пачку: картки й версії кешу оновлюються раз після коміту;
+        # нечитабельні файли логує routes.images
+        with transaction.atomic():
+            for instance in batch:
+                counts["generated" if refresh_derivatives(instance) else "failed"] += 1
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from routes.synthetic import CITIES, clear_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a realistic dataset: routes per city with points, images, ratings, "
+        "saved routes and user photos (routes.synthetic). Image files are not written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--routes-per-city", type=int, default=100)
+        parser.add_argument("--cities", nargs="+", choices=CITIES, default=list(CITIES))
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--points", type=int, nargs=2, default=(3, 10), metavar=("MIN", "MAX"))
+        parser.add_argument("--images", type=int, nargs=2, default=(1, 4), metavar=("MIN", "MAX"))
+        parser.add_argument("--ratings", type=int, nargs=2, default=(0, 15), metavar=("MIN", "MAX"))
+        parser.add_argument(
+            "--saved", type=int, nargs=2, default=(0, 20), metavar=("MIN", "MAX"), help="Saved routes per user."
+        )
+        parser.add_argument("--photos", type=float, default=0.3, help="Share of points with user photos.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--clear", action="store_true", help="Delete previously generated data first.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            if options["clear"]:
+                deleted = clear_dataset()
+                self.stdout.write(f"Deleted {deleted.get('routes.Route', 0)} synthetic routes")
+            counts = generate_dataset(
+                routes_per_city=options["routes_per_city"],
+                cities=options["cities"],
+                users=options["users"],
+                points=options["points"],
+                images=options["images"],
+                ratings=options["ratings"],
+                saved=options["saved"],
+                photos=options["photos"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+            )
+        elapsed = time.perf_counter() - started
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary} in {elapsed:.2f}s"))
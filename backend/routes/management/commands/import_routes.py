@@ -0,0 +1,76 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from routes.importer import FORMATS, READERS, ImportFileError, detect_format, import_routes
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import routes with points and images from JSON Lines, CSV or GeoJSON (routes.importer). "
+        "The file is streamed; rows are validated and written in chunks, each in its own transaction. "
+        "Routes are matched by external_id, so re-running the import only updates what changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import (.gz is decompressed on the fly); - for stdin.")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Routes per transaction.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT / UPDATE.")
+        parser.add_argument(
+            "--max-errors", type=int, default=100, help="Stop after this many invalid records (0 — never)."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+        started = time.perf_counter()
+        errors = 0
+
+        def on_error(location, message):
+            nonlocal errors
+            errors += 1
+            self.stderr.write(f"{location}: {message}")
+            if options["max_errors"] and errors >= options["max_errors"]:
+                raise CommandError(f"Stopped after {errors} invalid records; earlier chunks are committed.")
+
+        def on_chunk(totals):
+            if options["verbosity"] >= 2:
+                routes = totals["created"] + totals["updated"] + totals["unchanged"]
+                self.stdout.write(f"{routes} routes, {routes / (time.perf_counter() - started):.0f}/s")
+
+        try:
+            with self._open(path) as file:
+                totals = import_routes(
+                    READERS[fmt](file),
+                    chunk_size=options["chunk_size"],
+                    batch_size=options["batch_size"],
+                    on_error=on_error,
+                    on_chunk=on_chunk,
+                )
+        except (OSError, UnicodeDecodeError, ImportFileError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+        elapsed = time.perf_counter() - started
+        routes = totals["created"] + totals["updated"] + totals["unchanged"]
+        summary = (
+            f"Imported {routes} routes ({totals['created']} created, {totals['updated']} updated, "
+            f"{totals['unchanged']} unchanged), {totals['points']} points, {totals['images']} images "
+            f"in {elapsed:.2f}s — {routes / elapsed:.0f} routes/s, {totals['points'] / elapsed:.0f} points/s; "
+            f"{totals['errors']} invalid records skipped"
+        )
+        self.stdout.write(self.style.WARNING(summary) if totals["errors"] else self.style.SUCCESS(summary))
+        if totals["images"]:
+            self.stdout.write("Run generate_image_derivatives to build thumbnails for the imported images.")
+
+    @staticmethod
+    def _open(path):
+        if path == "-":
+            return open(sys.stdin.fileno(), encoding="utf-8", newline="", closefd=False)
+        if path.endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8", newline="")
+        return open(path, encoding="utf-8", newline="")
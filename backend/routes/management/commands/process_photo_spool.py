@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from routes.models import RoutePointPhoto
+from routes.uploads import process_photo
+
+
+class Command(BaseCommand):
+    help = (
+        "Process user photos left in 'processing' (worker restarted or its queue was full). "
+        "Storage errors leave the photo for the next run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=300,
+            help="Only photos uploaded at least this many seconds ago, so that live workers keep theirs.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options["older_than"])
+        ids = list(
+            RoutePointPhoto.objects.filter(status=RoutePointPhoto.Status.PROCESSING, created_at__lte=cutoff)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        errors = 0
+        for photo_id in ids:
+            try:
+                process_photo(photo_id)
+            except Exception as exc:
+                errors += 1
+                self.stderr.write(f"Photo {photo_id}: {exc}")
+        statuses = list(RoutePointPhoto.objects.filter(pk__in=ids).values_list("status", flat=True))
+        ready = statuses.count(RoutePointPhoto.Status.READY)
+        failed = statuses.count(RoutePointPhoto.Status.FAILED)
+        summary = f"Processed {len(ids)} photos: {ready} ready, {failed} rejected, {errors} to retry"
+        self.stdout.write(self.style.WARNING(summary) if errors else self.style.SUCCESS(summary))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from routes.cards import rebuild_route_cards
+
+
+class Command(BaseCommand):
+    help = "Rebuild route geometry and the denormalized RouteCard table from Route and its relations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_route_cards(batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} route cards in {elapsed:.2f}s"))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from routes.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index used by ?search= on /api/routes/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options["database"])
+        started = time.perf_counter()
+        indexed = backend.rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{type(backend).__name__}: indexed {indexed} routes in {elapsed:.2f}s"
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from routes.cache import bump_route_version
+from routes.cards import refresh_route_cards
+from routes.models import Route
+from routes.ratings import drifted_routes, reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Repair Route.rating_sum / rating_count / avg_rating that drifted from the "
+        "ratings table (raw SQL, fixtures, bulk deletes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recompute every route, not only drifted ones.")
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = Route.objects.all() if options["all"] else drifted_routes()
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True))
+        if options["dry_run"]:
+            self.stdout.write(f"{len(ids)} routes need reconciling")
+            return
+        batch_size = options["batch_size"]
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            with transaction.atomic():
+                reconcile_ratings(batch)
+                refresh_route_cards(batch)
+            for route_id in batch:
+                bump_route_version(route_id)
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {len(ids)} routes"))
@@ -0,0 +1,109 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_route_cards(apps, schema_editor):
+    Route = apps.get_model("routes", "Route")
+    RouteCard = apps.get_model("routes", "RouteCard")
+    cards = []
+    for route in Route.objects.prefetch_related("images", "points", "ratings"):
+        images = sorted(route.images.all(), key=lambda i: (not i.is_cover, i.order, i.pk))
+        points = sorted(route.points.all(), key=lambda p: (p.order, p.pk))
+        cards.append(
+            RouteCard(
+                route=route,
+                name=route.name,
+                description=route.description,
+                city=route.city,
+                mood=route.mood,
+                category=route.category,
+                budget_min=route.budget_min,
+                budget_max=route.budget_max,
+                estimated_duration=route.estimated_duration,
+                avg_rating=route.avg_rating,
+                rating_count=len(route.ratings.all()),
+                cover_image=images[0].image.name if images else "",
+                first_point_latitude=points[0].latitude if points else None,
+                first_point_longitude=points[0].longitude if points else None,
+                created_at=route.created_at,
+            )
+        )
+    RouteCard.objects.bulk_create(cards, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0004_routepointphoto"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteCard",
+            fields=[
+                (
+                    "route",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="card",
+                        serialize=False,
+                        to="routes.route",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("description", models.TextField(blank=True)),
+                ("city", models.CharField(db_index=True, max_length=100)),
+                (
+                    "mood",
+                    models.CharField(
+                        choices=[
+                            ("calm", "Calm"),
+                            ("adventurous", "Adventurous"),
+                            ("curious", "Curious"),
+                        ],
+                        db_index=True,
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "category",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("parks", "Parks"),
+                            ("museums", "Museums"),
+                            ("cafes", "Cafes"),
+                            ("mixed", "Mixed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("budget_min", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("budget_max", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("estimated_duration", models.PositiveIntegerField()),
+                ("avg_rating", models.DecimalField(decimal_places=2, max_digits=3)),
+                ("rating_count", models.PositiveIntegerField(default=0)),
+                ("cover_image", models.CharField(blank=True, max_length=255)),
+                (
+                    "first_point_latitude",
+                    models.DecimalField(
+                        blank=True, decimal_places=6, max_digits=9, null=True
+                    ),
+                ),
+                (
+                    "first_point_longitude",
+                    models.DecimalField(
+                        blank=True, decimal_places=6, max_digits=9, null=True
+                    ),
+                ),
+                ("created_at", models.DateTimeField(db_index=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.RunPython(populate_route_cards, migrations.RunPython.noop),
+    ]
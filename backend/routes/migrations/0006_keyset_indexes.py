@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0005_routecard"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rating",
+            index=models.Index(
+                fields=["route", "created_at", "id"], name="rating_keyset"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="routecard",
+            index=models.Index(
+                fields=["avg_rating", "route"], name="routecard_rating_keyset"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="routecard",
+            index=models.Index(
+                fields=["estimated_duration", "route"], name="routecard_duration_keyset"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="routecard",
+            index=models.Index(
+                fields=["budget_max", "route"], name="routecard_budget_keyset"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="routecard",
+            index=models.Index(
+                fields=["created_at", "route"], name="routecard_created_keyset"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userroute",
+            index=models.Index(
+                fields=["user", "date_saved", "id"], name="userroute_keyset"
+            ),
+        ),
+    ]
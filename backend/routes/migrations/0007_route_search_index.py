@@ -0,0 +1,68 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:02
+
+from django.db import migrations
+
+# Знімок routes.search на момент міграції — історична міграція не залежить
+# від подальших змін живого коду. Бекенд обирається лише за типом БД.
+SEARCH_COLUMNS = "name, city, description"
+SQLITE_TABLE = "routes_route_fts"
+POSTGRES_TABLE = "routes_route_search"
+POSTGRES_DOCUMENT_SQL = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(city, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == "ENABLE_FTS5" for row in cursor.fetchall())
+
+
+def install_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+            "route_id bigint PRIMARY KEY REFERENCES routes_route (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_document_gin "
+            f"ON {POSTGRES_TABLE} USING GIN (document)"
+        )
+        schema_editor.execute(f"TRUNCATE {POSTGRES_TABLE}")
+        schema_editor.execute(
+            f"INSERT INTO {POSTGRES_TABLE} (route_id, document) "
+            f"SELECT id, {POSTGRES_DOCUMENT_SQL} FROM routes_route"
+        )
+    elif connection.vendor == "sqlite" and sqlite_has_fts5(connection):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} "
+            f"USING fts5({SEARCH_COLUMNS}, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(f"DELETE FROM {SQLITE_TABLE}")
+        schema_editor.execute(
+            f"INSERT INTO {SQLITE_TABLE} (rowid, {SEARCH_COLUMNS}) "
+            f"SELECT id, {SEARCH_COLUMNS} FROM routes_route"
+        )
+
+
+def uninstall_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {POSTGRES_TABLE}")
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0006_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_counters(apps, schema_editor):
+    Route = apps.get_model("routes", "Route")
+    Rating = apps.get_model("routes", "Rating")
+    ratings = Rating.objects.filter(route=OuterRef("pk")).order_by().values("route")
+    Route.objects.update(
+        rating_sum=Coalesce(Subquery(ratings.annotate(s=Sum("score")).values("s")), 0),
+        rating_count=Coalesce(Subquery(ratings.annotate(c=Count("pk")).values("c")), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0009_updated_at_validators"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_rating_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0011_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="routepointphoto",
+            name="spool_file",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="routepointphoto",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="ready",
+                max_length=10,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="routepointphoto",
+            name="image",
+            field=models.ImageField(blank=True, upload_to="user_point_photos/"),
+        ),
+    ]
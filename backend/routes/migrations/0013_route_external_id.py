@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0012_point_photo_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="external_id",
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
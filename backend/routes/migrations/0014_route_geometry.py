@@ -0,0 +1,233 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:05
+
+import math
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Знімок routes.geometry / routes.geo на момент міграції — історична міграція
+# не залежить від подальших змін живого коду
+GEOMETRY_FIELDS = (
+    "path_length_m",
+    "min_latitude",
+    "min_longitude",
+    "max_latitude",
+    "max_longitude",
+    "centroid_latitude",
+    "centroid_longitude",
+    "polyline",
+)
+EARTH_RADIUS_M = 6_371_000
+COORDINATE_QUANTUM = Decimal("0.000001")
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def polyline_encode(coordinates, precision=5):
+    factor = 10**precision
+    chars = []
+    previous = (0, 0)
+    for latitude, longitude in coordinates:
+        current = (
+            math.floor(float(latitude) * factor + 0.5),
+            math.floor(float(longitude) * factor + 0.5),
+        )
+        for value, last in zip(current, previous):
+            delta = value - last
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                chars.append(chr((0x20 | (delta & 0x1F)) + 63))
+                delta >>= 5
+            chars.append(chr(delta + 63))
+        previous = current
+    return "".join(chars)
+
+
+def route_geometry(coordinates):
+    if not coordinates:
+        return {**dict.fromkeys(GEOMETRY_FIELDS), "path_length_m": 0, "polyline": ""}
+    latitudes = [Decimal(latitude) for latitude, _ in coordinates]
+    longitudes = [Decimal(longitude) for _, longitude in coordinates]
+    length = sum(
+        haversine_m(float(a[0]), float(a[1]), float(b[0]), float(b[1]))
+        for a, b in zip(coordinates, coordinates[1:])
+    )
+    return {
+        "path_length_m": round(length),
+        "min_latitude": min(latitudes),
+        "min_longitude": min(longitudes),
+        "max_latitude": max(latitudes),
+        "max_longitude": max(longitudes),
+        "centroid_latitude": (sum(latitudes) / len(latitudes)).quantize(
+            COORDINATE_QUANTUM
+        ),
+        "centroid_longitude": (sum(longitudes) / len(longitudes)).quantize(
+            COORDINATE_QUANTUM
+        ),
+        "polyline": polyline_encode(coordinates),
+    }
+
+
+def fill_geometry(apps, schema_editor):
+    Route = apps.get_model("routes", "Route")
+    RouteCard = apps.get_model("routes", "RouteCard")
+    RoutePoint = apps.get_model("routes", "RoutePoint")
+    coordinates = defaultdict(list)
+    for route_id, latitude, longitude in RoutePoint.objects.order_by(
+        "route_id", "order", "pk"
+    ).values_list("route_id", "latitude", "longitude"):
+        coordinates[route_id].append((latitude, longitude))
+    geometry = {
+        pk: route_geometry(coordinates[pk])
+        for pk in Route.objects.values_list("pk", flat=True)
+    }
+    Route.objects.bulk_update(
+        [Route(pk=pk, **values) for pk, values in geometry.items()],
+        GEOMETRY_FIELDS,
+        batch_size=1000,
+    )
+    RouteCard.objects.bulk_update(
+        [
+            RouteCard(pk=pk, **geometry[pk])
+            for pk in RouteCard.objects.values_list("pk", flat=True)
+        ],
+        GEOMETRY_FIELDS,
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0013_route_external_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="centroid_latitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="centroid_longitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="max_latitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="max_longitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="min_latitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="min_longitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="path_length_m",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="polyline",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="routecard",
+            name="centroid_latitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="routecard",
+            name="centroid_longitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="routecard",
+            name="max_latitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="routecard",
+            name="max_longitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="routecard",
+            name="min_latitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="routecard",
+            name="min_longitude",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="routecard",
+            name="path_length_m",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="routecard",
+            name="polyline",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="routecard",
+            index=models.Index(
+                fields=[
+                    "min_latitude",
+                    "max_latitude",
+                    "min_longitude",
+                    "max_longitude",
+                ],
+                name="routecard_bbox",
+            ),
+        ),
+        migrations.RunPython(fill_geometry, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,41 @@
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 
+# Геометрія шляху через точки маршруту (routes.geometry); пише лише refresh_route_geometry
+GEOMETRY_FIELDS = (
+    "path_length_m",
+    "min_latitude",
+    "min_longitude",
+    "max_latitude",
+    "max_longitude",
+    "centroid_latitude",
+    "centroid_longitude",
+    "polyline",
+)
 
-class Route(models.Model):
+
+def _coordinate():
+    return models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, editable=False)
+
+
+class RouteGeometry(models.Model):
+    """Derived geometry of the path through the route's points, in their order."""
+    path_length_m = models.PositiveIntegerField(default=0, editable=False)
+    min_latitude = _coordinate()
+    min_longitude = _coordinate()
+    max_latitude = _coordinate()
+    max_longitude = _coordinate()
+    centroid_latitude = _coordinate()
+    centroid_longitude = _coordinate()
+    # Encoded polyline (routes.geo.polyline_encode) — для малювання на карті без точок
+    polyline = models.TextField(blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+
+class Route(RouteGeometry):
     class Mood(models.TextChoices):
         CALM = "calm", "Calm"
         ADVENTUROUS = "adventurous", "Adventurous"
@@ -25,9 +57,14 @@ class Route(models.Model):
     budget_min = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     budget_max = models.DecimalField(max_digits=10, decimal_places=2)
     estimated_duration = models.PositiveIntegerField(help_text="Duration in minutes")
+    # Ключ маршруту в зовнішньому джерелі: повторний import_routes оновлює, а не дублює
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     avg_rating = models.DecimalField(
         max_digits=3, decimal_places=2, default=0, editable=False
     )
+    # Лічильники оцінок; avg_rating = rating_sum / rating_count (routes.ratings)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -37,19 +74,34 @@ class Route(models.Model):
     def __str__(self):
         return f"{self.name} ({self.city})"
 
-    def update_avg_rating(self):
-        from django.db.models import Avg
-
-        result = self.ratings.aggregate(avg=Avg("score"))["avg"]
-        self.avg_rating = result or 0
-        self.save(update_fields=["avg_rating"])
+    def save(self, *args, **kwargs):
+        # Лічильники оцінок пишуть лише UPDATE з F() (routes.ratings), геометрію —
+        # routes.geometry; збереження застарілого екземпляра (адмінка) їх не перетирає.
+        # Тому save() рядка, якого вже немає в БД, падає з Route.NotUpdated, а не
+        # вставляє його знову — для цього є save(force_insert=True)
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+            and not args
+        ):
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key
+                and f.name not in ("rating_sum", "rating_count", "avg_rating", *GEOMETRY_FIELDS)
+            ]
+        super().save(*args, **kwargs)
 
 
 class RouteImage(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(upload_to="routes/")
+    # Зменшені копії поруч з оригіналом (routes.images)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
     is_cover = models.BooleanField(default=False)
     order = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["order"]
@@ -65,11 +117,15 @@ class RoutePoint(models.Model):
     address = models.CharField(max_length=255, blank=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    # Просторовий індекс для /api/routes/nearby/; заповнюється сигналом pre_save
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     order = models.PositiveSmallIntegerField(default=0)
     duration_at_stop = models.PositiveIntegerField(
         default=0, help_text="Time to spend here in minutes"
     )
     image = models.ImageField(upload_to="points/", blank=True, null=True)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["order"]
@@ -80,14 +136,24 @@ class RoutePoint(models.Model):
 
 class RoutePointPhoto(models.Model):
     """Фото до точки маршруту, завантажені користувачем."""
+    class Status(models.TextChoices):
+        PROCESSING = "processing", "Processing"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
     point = models.ForeignKey(RoutePoint, on_delete=models.CASCADE, related_name="user_photos")
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="point_photos",
     )
-    image = models.ImageField(upload_to="user_point_photos/")
+    # Порожнє, поки фото чекає обробки у спулі (routes.uploads)
+    image = models.ImageField(upload_to="user_point_photos/", blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.READY)
+    spool_file = models.CharField(max_length=255, blank=True, editable=False)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
@@ -118,10 +184,12 @@ class UserRoute(models.Model):
     date_saved = models.DateTimeField(auto_now_add=True)
     date_started = models.DateTimeField(null=True, blank=True)
     date_completed = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("user", "route")
         ordering = ["-date_saved"]
+        indexes = [models.Index(fields=["user", "date_saved", "id"], name="userroute_keyset")]
 
     def __str__(self):
         return f"{self.user.email} — {self.route.name} [{self.status}]"
@@ -146,15 +214,79 @@ class Rating(models.Model):
     class Meta:
         unique_together = ("user", "route")
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["route", "created_at", "id"], name="rating_keyset")]
 
     def __str__(self):
         return f"{self.user.email} rated {self.route.name}: {self.score}/5"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.route.update_avg_rating()
+        from .ratings import apply_rating_delta
+
+        with transaction.atomic():
+            # Стара оцінка — з рядка під блокуванням, а не з екземпляра
+            previous = (
+                Rating.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list("route_id", "score")
+                .first()
+                if self.pk
+                else None
+            )
+            super().save(*args, **kwargs)
+            if previous is None:
+                apply_rating_delta(self.route_id, self.score, 1)
+            elif previous[0] != self.route_id:
+                apply_rating_delta(previous[0], -previous[1], -1)
+                apply_rating_delta(self.route_id, self.score, 1)
+            elif previous[1] != self.score:
+                apply_rating_delta(self.route_id, self.score - previous[1], 0)
 
-    def delete(self, *args, **kwargs):
-        route = self.route
-        super().delete(*args, **kwargs)
-        route.update_avg_rating()
+
+class RouteCard(RouteGeometry):
+    """
+    Денормалізована картка маршруту для списку та пошуку.
+    Оновлюється інкрементально сигналами (routes.cards), повністю —
+    командою ``manage.py rebuild_route_cards``.
+    """
+    route = models.OneToOneField(
+        Route, on_delete=models.CASCADE, primary_key=True, related_name="card"
+    )
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    city = models.CharField(max_length=100, db_index=True)
+    mood = models.CharField(max_length=20, choices=Route.Mood.choices, db_index=True)
+    category = models.CharField(max_length=20, choices=Route.Category.choices, blank=True)
+    budget_min = models.DecimalField(max_digits=10, decimal_places=2)
+    budget_max = models.DecimalField(max_digits=10, decimal_places=2)
+    estimated_duration = models.PositiveIntegerField()
+    avg_rating = models.DecimalField(max_digits=3, decimal_places=2)
+    rating_count = models.PositiveIntegerField(default=0)
+    cover_image = models.CharField(max_length=255, blank=True)
+    cover_derivatives = models.JSONField(default=dict, blank=True)
+    first_point_latitude = models.DecimalField(
+        max_digits=9, decimal_places=6, null=True, blank=True
+    )
+    first_point_longitude = models.DecimalField(
+        max_digits=9, decimal_places=6, null=True, blank=True
+    )
+    created_at = models.DateTimeField(db_index=True)
+    # Час останнього оновлення картки — валідатор ETag для списку
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        # (поле, id) — для keyset-пагінації по кожному варіанту ?ordering=
+        indexes = [
+            models.Index(fields=["avg_rating", "route"], name="routecard_rating_keyset"),
+            models.Index(fields=["estimated_duration", "route"], name="routecard_duration_keyset"),
+            models.Index(fields=["budget_max", "route"], name="routecard_budget_keyset"),
+            models.Index(fields=["created_at", "route"], name="routecard_created_keyset"),
+            # ?in_bbox=: діапазон по min_latitude, решта меж — з того ж індексу
+            models.Index(
+                fields=["min_latitude", "max_latitude", "min_longitude", "max_longitude"],
+                name="routecard_bbox",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Card for {self.name} ({self.city})"
@@ -0,0 +1,38 @@
+"""
+Пошук маршрутів поруч із координатою.
+
+Кандидати вибираються діапазонами по індексованому RoutePoint.geohash
+(кілька клітинок, що покривають коло), точна відстань — haversine у Python.
+Відстань до маршруту — до його найближчої точки.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+
+from .geo import GEOHASH_UPPER, bounding_box, geohash_cover, haversine_m
+from .models import RoutePoint
+
+
+def route_distances(latitude, longitude, radius_m, points=None):
+    """``{route_id: metres}`` for every route with a point within ``radius_m``."""
+    points = RoutePoint.objects.all() if points is None else points
+    cells = geohash_cover(latitude, longitude, radius_m)
+    min_lat, min_lon, max_lat, max_lon = bounding_box(latitude, longitude, radius_m)
+    # Діапазони geohash читають індекс; bbox відсікає кути клітинок ще в SQL
+    candidates = points.filter(
+        reduce(or_, (Q(geohash__gte=cell, geohash__lt=cell + GEOHASH_UPPER) for cell in cells)),
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).values_list(
+        # float одразу з БД — без побудови Decimal для кожної з тисяч точок
+        "route_id", Cast("latitude", FloatField()), Cast("longitude", FloatField())
+    )
+
+    distances = {}
+    for route_id, lat, lon in candidates.iterator(chunk_size=5000):
+        d = haversine_m(latitude, longitude, lat, lon)
+        if d <= radius_m and d < distances.get(route_id, radius_m + 1):
+            distances[route_id] = d
+    return distances
@@ -0,0 +1,315 @@
+"""
+Порядок відвідування точок маршруту: евристика задачі комівояжера.
+
+Матриця відстаней haversine будується векторно (numpy), далі — найближчий
+сусід і покращення 2-opt та Or-opt (перенесення відрізка з 1–3 точок, також
+розвернутого), поки хоч один хід скорочує шлях. Шлях відкритий: початок і
+кінець можна закріпити за точками або лишити вільними — для цього до матриці
+додається фіктивна вершина, що замикає шлях у цикл.
+
+На 200 точках — мілісекунди з numpy; без нього (numpy опційний) ті самі
+ходи рахуються циклами Python, помітно повільніше.
+"""
+import time
+from functools import lru_cache
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import schedule_version_bump
+from .cards import schedule_card_refresh
+from .geo import EARTH_RADIUS_M, haversine_m
+from .models import Route, RoutePoint
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy опційний
+    np = None
+
+EPSILON = 1e-7
+OR_OPT_SEGMENTS = (1, 2, 3)
+# Запобіжник від зациклення на рівних за довжиною ходах
+MAX_MOVES_PER_POINT = 50
+
+
+def distance_matrix(latitudes, longitudes):
+    """Pairwise great-circle distances in metres (numpy array, or list of lists without numpy)."""
+    if np is None:
+        n = len(latitudes)
+        matrix = [[0.0] * n for _ in range(n)]
+        for i in range(n):
+            for j in range(i + 1, n):
+                matrix[i][j] = matrix[j][i] = haversine_m(latitudes[i], longitudes[i], latitudes[j], longitudes[j])
+        return matrix
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    a = (
+        np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+        + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _with_dummy(distances, n, start, end):
+    """Matrix with a dummy vertex ``n`` that closes the open path; fixed ends get free edges to it."""
+    if np is None:
+        total = sum(map(sum, distances))
+    else:
+        total = float(distances.sum())
+    # Дорожче за будь-який шлях: ребро до незакріпленої вершини не вигідне ніколи
+    penalty = total + 1.0 if start is not None or end is not None else 0.0
+    dummy = [penalty] * n + [0.0]
+    for fixed in (start, end):
+        if fixed is not None:
+            dummy[fixed] = 0.0
+    if np is None:
+        return [row + [dummy[i]] for i, row in enumerate(distances)] + [dummy]
+    extended = np.empty((n + 1, n + 1))
+    extended[:n, :n] = distances
+    extended[n, :] = extended[:, n] = dummy
+    return extended
+
+
+def _nearest_neighbour(matrix, first):
+    size = len(matrix)
+    tour = [first]
+    if np is None:
+        unvisited = set(range(size)) - {first}
+        while unvisited:
+            row = matrix[tour[-1]]
+            nearest = min(unvisited, key=row.__getitem__)
+            unvisited.remove(nearest)
+            tour.append(nearest)
+        return tour
+    visited = np.zeros(size, dtype=bool)
+    visited[first] = True
+    for _ in range(size - 1):
+        row = np.where(visited, np.inf, matrix[tour[-1]])
+        nearest = int(row.argmin())
+        visited[nearest] = True
+        tour.append(nearest)
+    return tour
+
+
+def _move_segment(tour, i, length, j, reverse):
+    """Move ``tour[i:i + length]`` to follow the vertex at position ``j``."""
+    segment = tour[i:i + length]
+    if reverse:
+        segment.reverse()
+    anchor = tour[j]
+    rest = tour[:i] + tour[i + length:]
+    position = rest.index(anchor) + 1
+    return rest[:position] + segment + rest[position:]
+
+
+# ── numpy: найкращий хід за раз, усі кандидати однією операцією ─────────────
+
+
+def _tour_matrices(matrix, tour):
+    """Distances between tour positions: ``[p, q]`` and ``[p, q + 1]`` (next vertex after q)."""
+    t = np.asarray(tour)
+    by_position = matrix[np.ix_(t, t)]
+    return by_position, np.roll(by_position, -1, axis=1)
+
+
+@lru_cache(maxsize=32)
+def _two_opt_blocked(size):
+    # Хід (i, j), i < j - 1: розвернути tour[i + 1 .. j]; (0, size - 1) — ті самі ребра
+    blocked = ~np.triu(np.ones((size, size), dtype=bool), 2)
+    blocked[0, size - 1] = True
+    return blocked
+
+
+@lru_cache(maxsize=96)
+def _or_opt_blocked(size, length):
+    # Вставка на ребро (j, j + 1), що не торкається відрізка [i, i + length)
+    positions = np.arange(size)
+    return (positions[None, :] - (positions[: size - length + 1, None] - 1)) % size <= length
+
+
+def _two_opt_numpy(matrix, tour):
+    size = len(tour)
+    by_position, to_next = _tour_matrices(matrix, tour)
+    edges = np.diagonal(to_next)
+    # delta[i, j]: ребра (i, i+1), (j, j+1) -> (i, j), (i+1, j+1)
+    delta = by_position + np.roll(to_next, -1, axis=0) - edges[:, None] - edges[None, :]
+    delta[_two_opt_blocked(size)] = np.inf
+    i, j = divmod(int(delta.argmin()), size)
+    if delta[i, j] >= -EPSILON:
+        return None
+    return tour[:i + 1] + tour[i + 1:j + 1][::-1] + tour[j + 1:]
+
+
+def _or_opt_numpy(matrix, tour):
+    size = len(tour)
+    by_position, to_next = _tour_matrices(matrix, tour)
+    edges = np.diagonal(to_next)
+    positions = np.arange(size)
+    best = None
+    for length in OR_OPT_SEGMENTS:
+        if length > size - 3:
+            break
+        # Відрізок позицій [i, i + length); рядки first / last — його кінці
+        count = size - length + 1
+        starts = positions[:count]
+        first, last = slice(0, count), slice(length - 1, size)
+        removed = edges[starts - 1] + edges[starts + length - 1] - by_position[starts - 1, (starts + length) % size]
+        blocked = _or_opt_blocked(size, length)
+        for reverse in (False, True):
+            head, tail = (last, first) if reverse else (first, last)
+            delta = by_position[head] + to_next[tail] - edges[None, :] - removed[:, None]
+            delta[blocked] = np.inf
+            i, j = divmod(int(delta.argmin()), size)
+            if delta[i, j] < -EPSILON and (best is None or delta[i, j] < best[0]):
+                best = (delta[i, j], i, length, j, reverse)
+    if best is None:
+        return None
+    return _move_segment(tour, *best[1:])
+
+
+# ── Без numpy: перший знайдений покращувальний хід ─────────────────────────
+
+
+def _two_opt_python(matrix, tour):
+    size = len(tour)
+    for i in range(size - 2):
+        a, b = tour[i], tour[i + 1]
+        row_a, row_b = matrix[a], matrix[b]
+        ab = row_a[b]
+        for j in range(i + 2, size - (i == 0)):
+            c, d = tour[j], tour[(j + 1) % size]
+            if row_a[c] + row_b[d] - ab - matrix[c][d] < -EPSILON:
+                return tour[:i + 1] + tour[i + 1:j + 1][::-1] + tour[j + 1:]
+    return None
+
+
+def _or_opt_python(matrix, tour):
+    size = len(tour)
+    for length in OR_OPT_SEGMENTS:
+        if length > size - 3:
+            break
+        for i in range(size - length + 1):
+            first, last = tour[i], tour[i + length - 1]
+            before, after = tour[i - 1], tour[(i + length) % size]
+            removed = matrix[before][first] + matrix[last][after] - matrix[before][after]
+            for j in range(size):
+                if (j - (i - 1)) % size <= length:
+                    continue
+                a, b = tour[j], tour[(j + 1) % size]
+                base = matrix[a][b] + removed
+                if matrix[a][first] + matrix[last][b] - base < -EPSILON:
+                    return _move_segment(tour, i, length, j, False)
+                if matrix[a][last] + matrix[first][b] - base < -EPSILON:
+                    return _move_segment(tour, i, length, j, True)
+    return None
+
+
+def _improve(matrix, tour):
+    if np is None:
+        moves = (_two_opt_python, _or_opt_python)
+    else:
+        moves = (_two_opt_numpy, _or_opt_numpy)
+    for _ in range(MAX_MOVES_PER_POINT * len(tour)):
+        for move in moves:
+            improved = move(matrix, tour)
+            if improved is not None:
+                tour = improved
+                break
+        else:
+            break
+    return tour
+
+
+def path_legs(distances, order):
+    return [float(distances[a][b]) for a, b in zip(order, order[1:])]
+
+
+def optimize_order(latitudes, longitudes, start=None, end=None):
+    """
+    Short visiting order of the points as a list of indices. ``start`` /
+    ``end`` are indices of points that must come first / last (None — free).
+    Returns ``(order, distances)``; ``distances`` is the matrix in metres.
+    """
+    n = len(latitudes)
+    distances = distance_matrix(latitudes, longitudes)
+    if n <= 3:
+        # Перебір на кількох точках точніший і дешевший
+        from itertools import permutations
+
+        candidates = [
+            list(order)
+            for order in permutations(range(n))
+            if (start is None or order[0] == start) and (end is None or order[-1] == end)
+        ]
+        return min(candidates, key=lambda order: sum(path_legs(distances, order))), distances
+    matrix = _with_dummy(distances, n, start, end)
+    tour = _improve(matrix, _nearest_neighbour(matrix, n))
+    position = tour.index(n)
+    order = tour[position + 1:] + tour[:position]
+    if (start is not None and order[0] != start) or (start is None and end is not None and order[0] == end):
+        order.reverse()
+    return order, distances
+
+
+class StopOrderError(ValueError):
+    """The requested fixed start / end point does not belong to the route."""
+
+
+def optimize_route(route_id, *, start="first", end=None, save=False):
+    """
+    Optimize the stops of route ``route_id``. ``start`` / ``end`` are point ids,
+    None for a free end, or ``"first"`` / ``"last"`` for the point that is first /
+    last in the current order. Returns a dict with the point ids in the new
+    order, leg and total distances (metres), the current total and whether the
+    order was saved.
+    """
+    started = time.perf_counter()
+    points = list(RoutePoint.objects.filter(route_id=route_id).order_by("order", "pk"))
+    ids = [point.pk for point in points]
+    aliases = {"first": ids[0] if ids else None, "last": ids[-1] if ids else None}
+    fixed = []
+    for point_id in (start, end):
+        point_id = aliases.get(point_id, point_id)
+        if point_id is not None and point_id not in ids:
+            raise StopOrderError(f"Point {point_id} is not a stop of route {route_id}.")
+        fixed.append(ids.index(point_id) if point_id is not None else None)
+    if len(ids) > 1 and fixed[0] is not None and fixed[0] == fixed[1]:
+        raise StopOrderError("Start and end must be different points.")
+
+    order, distances = optimize_order(
+        [point.latitude for point in points], [point.longitude for point in points], *fixed
+    )
+    legs = path_legs(distances, order)
+    result = {
+        "route": route_id,
+        "order": [ids[index] for index in order],
+        "legs_m": [round(leg, 1) for leg in legs],
+        "total_m": round(sum(legs), 1),
+        "current_total_m": round(sum(path_legs(distances, range(len(ids)))), 1),
+        "saved": False,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    if save:
+        result["saved"] = save_order(route_id, points, order)
+    return result
+
+
+def save_order(route_id, points, order):
+    """Renumber ``points`` (current order) to follow ``order``; True if anything moved."""
+    now = timezone.now()
+    changed = []
+    for position, index in enumerate(order):
+        point = points[index]
+        if point.order != position:
+            point.order = position
+            point.updated_at = now
+            changed.append(point)
+    if not changed:
+        return False
+    with transaction.atomic():
+        RoutePoint.objects.bulk_update(changed, ["order", "updated_at"])
+        # bulk_update без сигналів: геометрія, картка (перша точка), кеш і ETag маршруту — тут
+        Route.objects.filter(pk=route_id).update(updated_at=now)
+        schedule_card_refresh(route_id, geometry=True)
+        schedule_version_bump(route_id)
+    return True
@@ -0,0 +1,196 @@
+"""
+Пагінація API: номери сторінок за замовчуванням, keyset-курсор за запитом.
+
+``?cursor=`` (порожній на першій сторінці, далі — з посилань next/previous)
+вмикає keyset-режим: сторінка вибирається умовою ``(field, pk) > (value, id)``
+по поточному сортуванню з id як tie-breaker, без COUNT(*) та OFFSET.
+``?total=approx`` додає до відповіді орієнтовну кількість рядків.
+"""
+import base64
+import json
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def approximate_count(queryset, cap=10000):
+    """
+    Cheap row estimate for ``queryset``: the planner's estimate on PostgreSQL,
+    otherwise an exact count that stops at ``cap``.
+    Returns ``(count, is_exact)``.
+    """
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor == "postgresql":
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"]), False
+    count = queryset[:cap + 1].count()
+    return min(count, cap), count <= cap
+
+
+class CursorOrPageNumberPagination(PageNumberPagination):
+    cursor_query_param = "cursor"
+    total_query_param = "total"
+    approximate_total_cap = 10000
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Сортування за обчисленою колонкою (search_rank) курсор не закодує — тоді номери сторінок
+        self.use_cursor = self.cursor_query_param in request.query_params and not self._ordered_by_expression(queryset)
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        field, descending = self._get_sort_key(queryset)
+        self.sort_field = field
+        token = self._decode_cursor(request.query_params[self.cursor_query_param], field)
+        reverse = bool(token and token["reverse"])
+
+        # Попередня сторінка — той самий запит у зворотному напрямку
+        forward_desc = descending != reverse
+        name = field.attname
+        qs = queryset.order_by(*(f"-{f}" if forward_desc else f for f in (name, "pk")))
+        if token:
+            op = "lt" if forward_desc else "gt"
+            qs = qs.filter(
+                Q(**{f"{name}__{op}": token["value"]})
+                | Q(**{name: token["value"], f"pk__{op}": token["pk"]})
+            )
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = token is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, token is not None
+
+        self.approximate_total = None
+        if request.query_params.get(self.total_query_param) == "approx":
+            self.approximate_total = approximate_count(queryset, self.approximate_total_cap)
+
+        self.page_rows = rows
+        return rows
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views: COUNT and the page SELECT run on the async ORM."""
+        if self.cursor_query_param in request.query_params:
+            return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+        self.use_cursor = False
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg) from exc
+        self.page.object_list = [row async for row in self.page.object_list]
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        payload = OrderedDict(
+            [
+                ("next", self.get_next_link()),
+                ("previous", self.get_previous_link()),
+            ]
+        )
+        if self.approximate_total is not None:
+            count, is_exact = self.approximate_total
+            payload["approximate_count"] = count
+            payload["approximate_count_is_exact"] = is_exact
+        payload["results"] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next or not self.page_rows:
+            return None
+        return self._cursor_link(self.page_rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_rows:
+            return None
+        return self._cursor_link(self.page_rows[0], reverse=True)
+
+    # ── helpers ──────────────────────────────────────────────────────────────
+
+    def _ordered_by_expression(self, queryset):
+        """Whether the leading ordering term is an expression, extra select or annotation."""
+        ordering = queryset.query.order_by
+        if not ordering:
+            return False
+        if not isinstance(ordering[0], str):
+            return True
+        name = ordering[0].lstrip("-")
+        return name in queryset.query.extra or name in queryset.query.annotations
+
+    def _get_sort_key(self, queryset):
+        """First ordering term of the queryset (OrderingFilter or Meta.ordering)."""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or ("-pk",)
+        term = ordering[0] if isinstance(ordering[0], str) else "-pk"
+        descending = term.startswith("-")
+        name = term.lstrip("-")
+        opts = queryset.model._meta
+        try:
+            field = opts.pk if name == "pk" else opts.get_field(name)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or not field.concrete or field.is_relation and not field.primary_key:
+            field, descending = opts.pk, True
+        return field, descending
+
+    def _decode_cursor(self, raw, field):
+        if not raw:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(raw.encode("ascii")))
+            if data["v"] is None and not field.null:
+                # to_python(None) -> None, а фільтр field__lt=None падає вже поза цим try
+                raise ValueError("Null sort value.")
+            return {
+                "value": field.to_python(data["v"]),
+                "pk": int(data["k"]),
+                "reverse": bool(data.get("r")),
+            }
+        except (TypeError, ValueError, KeyError, ValidationError) as exc:
+            raise NotFound(self.invalid_cursor_message) from exc
+
+    def _encode_cursor(self, row, reverse):
+        if isinstance(row, dict):
+            # Рядок .values() (routes.fastpath) з колонками під іменами attname
+            pk = row[self.sort_field.model._meta.pk.attname]
+            row = SimpleNamespace(**row)
+        else:
+            pk = row.pk
+        value = self.sort_field.value_to_string(row)
+        data = {"v": value, "k": pk}
+        if reverse:
+            data["r"] = 1
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    def _cursor_link(self, row, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode_cursor(row, reverse))
@@ -0,0 +1,58 @@
+"""
+Лічильники оцінок маршруту: Route.rating_sum / rating_count.
+
+Кожна зміна оцінки — один UPDATE маршруту з F()-виразами, без AVG по всіх
+оцінках; avg_rating рахується в тому ж UPDATE зі старих значень лічильників,
+тож паралельні записи не перетирають одне одного. Розбіжності (зміни в обхід
+ORM) виправляє ``manage.py reconcile_ratings``.
+"""
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from .models import Rating, Route
+
+
+def average_expression(total, count):
+    """avg_rating as an SQL expression of the rating sum and count."""
+    avg_field = Route._meta.get_field("avg_rating")
+    return Case(
+        When(GreaterThan(count, 0), then=Cast(Cast(total, FloatField()) / count, avg_field)),
+        default=Value(0),
+        output_field=avg_field,
+    )
+
+
+def apply_rating_delta(route_id, score_delta, count_delta):
+    """Shift the counters of ``route_id``; called for every rating write."""
+    total = F("rating_sum") + score_delta
+    count = F("rating_count") + count_delta
+    Route.objects.filter(pk=route_id).update(
+        rating_sum=total,
+        rating_count=count,
+        avg_rating=average_expression(total, count),
+        updated_at=timezone.now(),
+    )
+
+
+def drifted_routes():
+    """Routes whose stored counters differ from their ratings, annotated with the actual values."""
+    ratings = Rating.objects.filter(route=OuterRef("pk")).order_by().values("route")
+    return Route.objects.annotate(
+        actual_sum=Coalesce(Subquery(ratings.annotate(s=Sum("score")).values("s")), 0),
+        actual_count=Coalesce(Subquery(ratings.annotate(c=Count("pk")).values("c")), 0),
+    ).exclude(rating_sum=F("actual_sum"), rating_count=F("actual_count"))
+
+
+def reconcile_ratings(route_ids):
+    """Recompute the counters and avg_rating of ``route_ids`` from their ratings."""
+    ratings = Rating.objects.filter(route=OuterRef("pk")).order_by().values("route")
+    total = Coalesce(Subquery(ratings.annotate(s=Sum("score")).values("s")), 0)
+    count = Coalesce(Subquery(ratings.annotate(c=Count("pk")).values("c")), 0)
+    return Route.objects.filter(pk__in=route_ids).update(
+        rating_sum=total,
+        rating_count=count,
+        avg_rating=average_expression(total, count),
+        updated_at=timezone.now(),
+    )
@@ -0,0 +1,185 @@
+"""
+Повнотекстовий пошук маршрутів для ``?search=``.
+
+Бекенд обирається за типом БД: SQLite — віртуальна таблиця FTS5,
+PostgreSQL — таблиця з tsvector та GIN-індексом, інші — LIKE як у DRF
+SearchFilter. Таблиці індексу створює міграція 0007_route_search_index;
+індекс оновлюється сигналами після збереження Route, повністю — командою
+``manage.py rebuild_search_index``.
+
+Пошук повертає queryset з extra-колонкою ``search_rank`` (менше — релевантніше)
+і працює з будь-якою моделлю, чий pk дорівнює id маршруту (Route, RouteCard).
+"""
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+SEARCH_FIELDS = ("name", "city", "description")
+
+_backends = {}
+
+
+def _pk_column(queryset):
+    opts = queryset.model._meta
+    return f'"{opts.db_table}"."{opts.pk.column}"'
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class LikeSearchBackend:
+    """Без індексу: ``icontains`` по кожному полю, як rest_framework.filters.SearchFilter."""
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+
+    def index_routes(self, route_ids):
+        pass
+
+    def remove_routes(self, route_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, queryset, terms):
+        conditions = [
+            reduce(or_, (Q(**{f"{field}__icontains": term}) for field in SEARCH_FIELDS))
+            for term in terms
+        ]
+        return queryset.filter(reduce(and_, conditions)).extra(select={"search_rank": "0"})
+
+
+class SQLiteFTS5Backend(LikeSearchBackend):
+    table = "routes_route_fts"
+    # Ваги колонок для bm25() у порядку SEARCH_FIELDS: назва > місто > опис
+    weights = (10.0, 5.0, 1.0)
+
+    def index_routes(self, route_ids):
+        with connections[self.alias].cursor() as cursor:
+            for chunk in _chunks(route_ids):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", chunk)
+                cursor.execute(
+                    f"INSERT INTO {self.table} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                    f"SELECT id, {', '.join(SEARCH_FIELDS)} FROM routes_route "
+                    f"WHERE id IN ({placeholders})",
+                    chunk,
+                )
+
+    def remove_routes(self, route_ids):
+        with connections[self.alias].cursor() as cursor:
+            for chunk in _chunks(route_ids):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", chunk)
+
+    def rebuild(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                f"SELECT id, {', '.join(SEARCH_FIELDS)} FROM routes_route"
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def match_expression(terms):
+        # Кожне слово — префіксний рядок FTS5 ("львів"*), слова поєднуються через AND
+        return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+    def search(self, queryset, terms):
+        # JOIN замість корельованого підзапиту: MATCH виконується один раз,
+        # bm25() рахується для кожного збігу в тому ж проході
+        t = self.table
+        weights = ", ".join(map(str, self.weights))
+        return queryset.extra(
+            select={"search_rank": f"bm25({t}, {weights})"},
+            tables=[t],
+            where=[f"{t}.rowid = {_pk_column(queryset)}", f"{t} MATCH %s"],
+            params=[self.match_expression(terms)],
+        )
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    table = "routes_route_search"
+    # Назва важливіша за місто, місто — за опис
+    document_sql = (
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(city, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+    )
+
+    def index_routes(self, route_ids):
+        with connections[self.alias].cursor() as cursor:
+            for chunk in _chunks(route_ids):
+                cursor.execute(
+                    f"INSERT INTO {self.table} (route_id, document) "
+                    f"SELECT id, {self.document_sql} FROM routes_route WHERE id = ANY(%s) "
+                    "ON CONFLICT (route_id) DO UPDATE SET document = EXCLUDED.document",
+                    [chunk],
+                )
+
+    def remove_routes(self, route_ids):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE route_id = ANY(%s)", [list(route_ids)])
+
+    def rebuild(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (route_id, document) "
+                f"SELECT id, {self.document_sql} FROM routes_route"
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def tsquery(terms):
+        words = [w for term in terms for w in re.findall(r"\w+", term)]
+        return " & ".join(f"{w}:*" for w in words)
+
+    def search(self, queryset, terms):
+        query = self.tsquery(terms)
+        if not query:
+            return queryset.none()
+        t = self.table
+        return queryset.extra(
+            select={"search_rank": "-ts_rank(document, to_tsquery('simple', %s))"},
+            select_params=[query],
+            tables=[t],
+            where=[f"{t}.route_id = {_pk_column(queryset)}", "document @@ to_tsquery('simple', %s)"],
+            params=[query],
+        )
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == "ENABLE_FTS5" for row in cursor.fetchall())
+
+
+def get_search_backend(alias="default"):
+    """
+    Бекенд для підключення ``alias``. ``settings.ROUTE_SEARCH_BACKEND`` —
+    dotted path до класу, щоб обрати його явно.
+    """
+    if alias not in _backends:
+        path = getattr(settings, "ROUTE_SEARCH_BACKEND", None)
+        connection = connections[alias]
+        if path:
+            backend_class = import_string(path)
+        elif connection.vendor == "postgresql":
+            backend_class = PostgresSearchBackend
+        elif connection.vendor == "sqlite" and _sqlite_has_fts5(connection):
+            backend_class = SQLiteFTS5Backend
+        else:
+            backend_class = LikeSearchBackend
+        _backends[alias] = backend_class(alias)
+    return _backends[alias]
@@ -1,29 +1,80 @@
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Route, RouteImage, RoutePoint, RoutePointPhoto, UserRoute, Rating
 
+from core.timing import TimedSerializerMixin
+
+from .fieldsets import SparseFieldsMixin
+from .images import derivative_urls
+from .models import Route, RouteCard, RouteImage, RoutePoint, RoutePointPhoto, UserRoute, Rating
+
+COORDINATE_QUANTUM = Decimal(1).scaleb(-RoutePoint._meta.get_field("latitude").decimal_places)
+
+
+def _cover_image_url(name, request):
+    if not name:
+        return None
+    url = RouteImage.image.field.storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def _image_derivatives(derivatives, name, request):
+    return derivative_urls(derivatives, name, lambda value: _cover_image_url(value, request))
+
+
+def _coordinates(latitude, longitude):
+    if latitude is None:
+        return None
+    # SQLite returns subquery decimals unquantized
+    return {
+        "latitude": str(latitude.quantize(COORDINATE_QUANTUM)),
+        "longitude": str(longitude.quantize(COORDINATE_QUANTUM)),
+    }
+
+
+def _bbox(min_latitude, min_longitude, max_latitude, max_longitude):
+    if min_latitude is None:
+        return None
+    return {
+        "min": _coordinates(min_latitude, min_longitude),
+        "max": _coordinates(max_latitude, max_longitude),
+    }
+
+
+class RouteImageSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    derivatives = serializers.SerializerMethodField()
 
-class RouteImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = RouteImage
-        fields = ("id", "image", "is_cover", "order")
+        fields = ("id", "image", "derivatives", "is_cover", "order")
 
+    def get_derivatives(self, obj):
+        return _image_derivatives(obj.derivatives, obj.image.name, self.context.get("request"))
 
-class RoutePointPhotoSerializer(serializers.ModelSerializer):
+
+class RoutePointPhotoSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_derivatives = serializers.SerializerMethodField()
     user_name = serializers.SerializerMethodField()
 
     class Meta:
         model = RoutePointPhoto
-        fields = ("id", "image", "image_url", "user_name", "created_at")
-        read_only_fields = ("id", "image_url", "user_name", "created_at")
+        fields = ("id", "image", "image_url", "image_derivatives", "status", "user_name", "created_at")
+        read_only_fields = ("id", "image_url", "image_derivatives", "status", "user_name", "created_at")
         extra_kwargs = {
-            "image": {"write_only": True},  # приймаємо при POST, не повертаємо назад
+            # приймаємо при POST, не повертаємо назад; порожнє в моделі лише до обробки
+            "image": {"write_only": True, "required": True, "allow_null": False},
         }
 
     def get_image_url(self, obj):
+        if not obj.image:
+            return None  # ще в обробці (routes.uploads)
         request = self.context.get("request")
         return request.build_absolute_uri(obj.image.url) if request else obj.image.url
 
+    def get_image_derivatives(self, obj):
+        return _image_derivatives(obj.derivatives, obj.image.name, self.context.get("request"))
+
     def get_user_name(self, obj):
         u = obj.user
         if u.first_name:
@@ -33,8 +84,9 @@ class RoutePointPhotoSerializer(serializers.ModelSerializer):
         return u.email.split("@")[0]
 
 
-class RoutePointSerializer(serializers.ModelSerializer):
+class RoutePointSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_derivatives = serializers.SerializerMethodField()
     user_photos = RoutePointPhotoSerializer(many=True, read_only=True)
 
     class Meta:
@@ -49,6 +101,7 @@ class RoutePointSerializer(serializers.ModelSerializer):
             "order",
             "duration_at_stop",
             "image_url",
+            "image_derivatives",
             "user_photos",
         )
 
@@ -58,13 +111,41 @@ class RoutePointSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         return request.build_absolute_uri(obj.image.url) if request else obj.image.url
 
+    def get_image_derivatives(self, obj):
+        return _image_derivatives(obj.derivatives, obj.image.name, self.context.get("request"))
+
+
+class StopOrderSerializer(serializers.Serializer):
+    """Body of POST /api/routes/<id>/points/optimize/: fixed ends as point ids, "first", "last" or null."""
+
+    STOP_ALIASES = ("first", "last")
+
+    start = serializers.CharField(allow_null=True, default="first")
+    end = serializers.CharField(allow_null=True, default=None)
+    save = serializers.BooleanField(default=False)
+
+    def _stop(self, value):
+        if value is None or value in self.STOP_ALIASES:
+            return value
+        if not value.isdigit():
+            raise serializers.ValidationError('Expected a point id, "first", "last" or null.')
+        return int(value)
+
+    def validate_start(self, value):
+        return self._stop(value)
+
+    def validate_end(self, value):
+        return self._stop(value)
+
 
-class RouteListSerializer(serializers.ModelSerializer):
+class RouteListSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     cover_image = serializers.SerializerMethodField()
-    rating_count = serializers.SerializerMethodField()
+    cover_derivatives = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
     is_favorite = serializers.SerializerMethodField()
     first_point = serializers.SerializerMethodField()
+    bbox = serializers.SerializerMethodField()
+    centroid = serializers.SerializerMethodField()
 
     class Meta:
         model = Route
@@ -80,22 +161,53 @@ class RouteListSerializer(serializers.ModelSerializer):
             "avg_rating",
             "rating_count",
             "cover_image",
+            "cover_derivatives",
             "is_saved",
             "is_favorite",
             "first_point",
+            "path_length_m",
+            "bbox",
+            "centroid",
+            "polyline",
         )
 
+    def _get_cover(self, obj):
+        # cover_image і cover_derivatives — один пошук на маршрут
+        if not hasattr(obj, "_cover"):
+            obj._cover = self._find_cover(obj)
+        return obj._cover
+
+    def _find_cover(self, obj):
+        """(image name, derivatives) of the cover: prefetched images, else the card."""
+        if "images" not in getattr(obj, "_prefetched_objects_cache", {}):
+            # Збережені маршрути (select_related("route__card")) — з картки
+            card = getattr(obj, "card", None)
+            if card is not None:
+                return card.cover_image, card.cover_derivatives
+        images = sorted(obj.images.all(), key=lambda i: (not i.is_cover, i.order, i.pk))
+        return (images[0].image.name, images[0].derivatives) if images else (None, None)
+
     def get_cover_image(self, obj):
-        image = obj.images.filter(is_cover=True).first() or obj.images.first()
-        if image:
-            request = self.context.get("request")
-            return request.build_absolute_uri(image.image.url) if request else image.image.url
-        return None
+        name, _ = self._get_cover(obj)
+        return _cover_image_url(name, self.context.get("request"))
+
+    def get_cover_derivatives(self, obj):
+        name, derivatives = self._get_cover(obj)
+        return _image_derivatives(derivatives, name, self.context.get("request"))
 
     def _get_user_route(self, obj):
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return None
+        if not self.context.get("include_user_state", True):
+            return None  # анонімна відповідь для кешу
+        saved = getattr(obj, "saved_user_route", None)
+        if saved is not None and saved.user_id == request.user.pk:
+            return saved  # вкладений у UserRouteSerializer — це сам рядок збереження
+        if "user_routes" in getattr(obj, "_prefetched_objects_cache", {}):
+            return next(
+                (ur for ur in obj.user_routes.all() if ur.user_id == request.user.pk), None
+            )
         return obj.user_routes.filter(user=request.user).first()
 
     def get_is_saved(self, obj):
@@ -105,19 +217,60 @@ class RouteListSerializer(serializers.ModelSerializer):
         ur = self._get_user_route(obj)
         return ur.is_favorite if ur else False
 
-    def get_rating_count(self, obj):
-        # rating_count_annotated — анотується в RouteListView через Count('ratings'),
-        # що дає один COUNT-запит на всю колекцію замість N окремих SELECT
-        if hasattr(obj, "rating_count_annotated"):
-            return obj.rating_count_annotated
-        return obj.ratings.count()  # fallback (наприклад, RouteDetailView)
-
     def get_first_point(self, obj):
-        pt = obj.points.order_by("order").first()
-        if pt:
-            return {"latitude": str(pt.latitude), "longitude": str(pt.longitude)}
+        if "points" not in getattr(obj, "_prefetched_objects_cache", {}):
+            # Без prefetch — з картки (select_related("route__card")), а не запитом точок
+            card = getattr(obj, "card", None)
+            return card and _coordinates(card.first_point_latitude, card.first_point_longitude)
+        points = obj.points.all()
+        if points:
+            pt = min(points, key=lambda p: (p.order, p.pk))
+            return _coordinates(pt.latitude, pt.longitude)
         return None
 
+    def get_bbox(self, obj):
+        return _bbox(obj.min_latitude, obj.min_longitude, obj.max_latitude, obj.max_longitude)
+
+    def get_centroid(self, obj):
+        return _coordinates(obj.centroid_latitude, obj.centroid_longitude)
+
+
+class RouteCardSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    """Той самий формат, що й RouteListSerializer, але з готової картки RouteCard."""
+    id = serializers.IntegerField(source="route_id", read_only=True)
+    cover_image = serializers.SerializerMethodField()
+    cover_derivatives = serializers.SerializerMethodField()
+    is_saved = serializers.SerializerMethodField()
+    is_favorite = serializers.SerializerMethodField()
+    first_point = serializers.SerializerMethodField()
+    bbox = serializers.SerializerMethodField()
+    centroid = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RouteCard
+        fields = RouteListSerializer.Meta.fields
+
+    def get_cover_image(self, obj):
+        return _cover_image_url(obj.cover_image, self.context.get("request"))
+
+    def get_cover_derivatives(self, obj):
+        return _image_derivatives(obj.cover_derivatives, obj.cover_image, self.context.get("request"))
+
+    def get_is_saved(self, obj):
+        return getattr(obj, "user_route_is_favorite", None) is not None
+
+    def get_is_favorite(self, obj):
+        return bool(getattr(obj, "user_route_is_favorite", False))
+
+    def get_first_point(self, obj):
+        return _coordinates(obj.first_point_latitude, obj.first_point_longitude)
+
+    def get_bbox(self, obj):
+        return _bbox(obj.min_latitude, obj.min_longitude, obj.max_latitude, obj.max_longitude)
+
+    def get_centroid(self, obj):
+        return _coordinates(obj.centroid_latitude, obj.centroid_longitude)
+
 
 class RouteDetailSerializer(RouteListSerializer):
     images = RouteImageSerializer(many=True, read_only=True)
@@ -132,7 +285,7 @@ class RouteDetailSerializer(RouteListSerializer):
         )
 
 
-class UserRouteSerializer(serializers.ModelSerializer):
+class UserRouteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     route = RouteListSerializer(read_only=True)
     route_id = serializers.PrimaryKeyRelatedField(
         queryset=Route.objects.all(), source="route", write_only=True
@@ -155,14 +308,21 @@ class UserRouteSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id", "date_saved")
 
+    def to_representation(self, instance):
+        instance.route.saved_user_route = instance
+        return super().to_representation(instance)
+
     def get_user_rating(self, obj):
-        r = obj.route.ratings.filter(user=obj.user).first()
+        ratings = getattr(obj.route, "user_ratings", None)  # user_route_queryset()
+        if ratings is None:
+            ratings = obj.route.ratings.filter(user_id=obj.user_id)[:1]
+        r = next(iter(ratings), None)
         if r:
             return {"id": r.id, "score": r.score, "comment": r.comment}
         return None
 
 
-class RatingSerializer(serializers.ModelSerializer):
+class RatingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -0,0 +1,101 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import schedule_version_bump
+from .cards import schedule_card_refresh
+from .geo import geohash_encode
+from .images import refresh_uploaded
+from .models import Rating, Route, RouteImage, RoutePoint, RoutePointPhoto
+from .ratings import apply_rating_delta
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Route)
+def route_saved(sender, instance, using, **kwargs):
+    pk = instance.pk
+    schedule_card_refresh(pk)
+    transaction.on_commit(lambda: get_search_backend(using).index_routes([pk]), using=using)
+    schedule_version_bump(pk)
+
+
+@receiver(post_delete, sender=Route)
+def route_deleted(sender, instance, using, **kwargs):
+    pk = instance.pk  # Collector обнуляє pk ще до коміту
+    transaction.on_commit(lambda: get_search_backend(using).remove_routes([pk]), using=using)
+    schedule_version_bump(pk)
+
+
+@receiver(post_save, sender=RouteImage)
+@receiver(post_delete, sender=RouteImage)
+@receiver(post_save, sender=RoutePoint)
+@receiver(post_delete, sender=RoutePoint)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def route_child_changed(sender, instance, **kwargs):
+    # Версія кешу — після оновлення картки, щоб новий ключ не закешував стару картку
+    schedule_card_refresh(instance.route_id, geometry=sender is RoutePoint)
+    schedule_version_bump(instance.route_id)
+
+
+@receiver(post_save, sender=RoutePointPhoto)
+@receiver(post_delete, sender=RoutePointPhoto)
+def point_photo_changed(sender, instance, **kwargs):
+    route_id = (
+        RoutePoint.objects.filter(pk=instance.point_id).values_list("route_id", flat=True).first()
+    )
+    if route_id is not None:
+        schedule_version_bump(route_id)
+
+
+@receiver(post_delete, sender=RouteImage)
+@receiver(post_delete, sender=RoutePoint)
+@receiver(post_delete, sender=RoutePointPhoto)
+def route_child_deleted(sender, instance, origin=None, **kwargs):
+    # Видалений рядок не лишає мітки часу — зсуваємо Route.updated_at,
+    # щоб ETag / Last-Modified маршруту змінились (routes.conditional)
+    if getattr(origin, "model", type(origin)) is Route:
+        return  # каскад від видалення самого маршруту (origin — екземпляр або QuerySet)
+    if sender is RoutePointPhoto:
+        routes = Route.objects.filter(points=instance.point_id)
+    else:
+        routes = Route.objects.filter(pk=instance.route_id)
+    routes.update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, origin=None, **kwargs):
+    # Сигнал, а не Rating.delete(): спрацьовує й для каскаду від видалення користувача.
+    # Лічильники зсуває той самий UPDATE, що й updated_at маршруту.
+    if getattr(origin, "model", type(origin)) is not Route:
+        apply_rating_delta(instance.route_id, -instance.score, -1)
+
+
+@receiver(pre_save, sender=RoutePoint)
+def point_geohash(sender, instance, **kwargs):
+    # pre_save спрацьовує і для loaddata (raw), на відміну від Model.save()
+    instance.geohash = geohash_encode(instance.latitude, instance.longitude)
+
+
+@receiver(pre_save, sender=RouteImage)
+@receiver(pre_save, sender=RoutePoint)
+@receiver(pre_save, sender=RoutePointPhoto)
+def image_uploaded(sender, instance, raw=False, **kwargs):
+    # Незакомічений файл FileField.pre_save ще збереже — це і є завантаження;
+    # рядки з іменем файлу (loaddata, тести) покриває generate_image_derivatives
+    image = instance.image
+    instance._image_uploaded = not raw and bool(image) and not image._committed
+    if not image:
+        instance.derivatives = {}
+
+
+@receiver(post_save, sender=RouteImage)
+@receiver(post_save, sender=RoutePoint)
+@receiver(post_save, sender=RoutePointPhoto)
+def schedule_image_derivatives(sender, instance, using, **kwargs):
+    if getattr(instance, "_image_uploaded", False):
+        instance._image_uploaded = False
+        transaction.on_commit(partial(refresh_uploaded, sender, instance.pk, instance.image.name), using=using)
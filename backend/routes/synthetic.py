@@ -0,0 +1,205 @@
+"""
+Синтетичний набір даних для бенчмарків і ручного профілювання.
+
+Маршрути в кожному місті з точками навколо центру, фото (з іменами похідних,
+як після routes.images — самих файлів немає), оцінками, збереженими
+маршрутами та фото користувачів. Все пишеться bulk_create, тож сигнали не
+спрацьовують: geohash, лічильники оцінок, геометрія, картки й пошуковий індекс
+оновлюються тут явно. Дані позначені префіксами (назва маршруту, username),
+щоб ``clear_dataset()`` прибирав лише їх.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .cache import bump_list_version
+from .cards import refresh_route_cards
+from .geo import geohash_encode
+from .geometry import refresh_route_geometry
+from .images import SIZES, derivative_name, formats
+from .models import Rating, Route, RouteImage, RoutePoint, RoutePointPhoto, UserRoute
+from .ratings import reconcile_ratings
+from .search import get_search_backend
+
+SYNTHETIC = "synthetic"
+ROUTE_PREFIX = "Synthetic "
+
+# Місто -> центр (lat, lon); точки маршруту — в межах ~5 км
+CITIES = {
+    "Lviv": (49.8419, 24.0315),
+    "Kyiv": (50.4501, 30.5234),
+    "Odesa": (46.4825, 30.7233),
+    "Kharkiv": (49.9935, 36.2304),
+    "Dnipro": (48.4647, 35.0462),
+    "Ivano-Frankivsk": (48.9226, 24.7111),
+}
+PLACES = ("Кав'ярня", "Площа", "Парк", "Музей", "Оглядовий майданчик", "Галерея", "Ринок", "Набережна")
+STREETS = ("Шевченка", "Франка", "Лесі Українки", "Грушевського", "Соборна", "Театральна")
+SENTENCE = "Затишне місце з історією, варто зупинитися на каву й роззирнутися довкола. "
+COMMENTS = ("", "", "Дуже сподобалось!", "Забагато людей увечері.", "Ідеально для вихідних.")
+
+
+def _derivatives(name, rng):
+    width, height = rng.choice(((4000, 3000), (3000, 4000), (4032, 2268)))
+    sizes = {}
+    for size, (box_width, box_height) in SIZES.items():
+        scale = min(box_width / width, box_height / height, 1)
+        variant = {"width": round(width * scale), "height": round(height * scale)}
+        for fmt in formats():
+            variant[fmt] = derivative_name(name, size, fmt)
+        sizes[size] = variant
+    return {"source": name, "sizes": sizes}
+
+
+def _point(rng, center, **fields):
+    lat = center[0] + rng.uniform(-0.045, 0.045)
+    lon = center[1] + rng.uniform(-0.07, 0.07)
+    return RoutePoint(
+        latitude=round(Decimal(lat), 6),
+        longitude=round(Decimal(lon), 6),
+        geohash=geohash_encode(lat, lon),
+        **fields,
+    )
+
+
+def generate_dataset(
+    *,
+    routes_per_city=100,
+    cities=tuple(CITIES),
+    users=200,
+    points=(3, 10),
+    images=(1, 4),
+    ratings=(0, 15),
+    saved=(0, 20),
+    photos=0.3,
+    seed=42,
+    batch_size=1000,
+):
+    """
+    Write the dataset and return ``{model name: rows created}``. Ranges are
+    inclusive ``(min, max)`` per route (``saved`` — per user); ``photos`` is
+    the chance that a point has user photos.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    offset = User.objects.filter(username__startswith=f"{SYNTHETIC}-").count()
+    password = make_password(None)
+    people = User.objects.bulk_create(
+        (
+            User(
+                username=f"{SYNTHETIC}-{offset + i}",
+                email=f"{SYNTHETIC}-{offset + i}@example.com",
+                first_name=rng.choice(("Оксана", "Тарас", "Ірина", "Андрій", "Марта", "")),
+                last_name=rng.choice(("Коваль", "Бондар", "")),
+                password=password,
+            )
+            for i in range(users)
+        ),
+        batch_size=batch_size,
+    )
+    routes = Route.objects.bulk_create(
+        (
+            Route(
+                name=f"{ROUTE_PREFIX}{city} {rng.choice(PLACES).lower()} {i}",
+                description=SENTENCE * rng.randint(2, 12),
+                city=city,
+                mood=rng.choice(Route.Mood.values),
+                category=rng.choice(Route.Category.values),
+                budget_min=Decimal(rng.randint(0, 300)),
+                budget_max=Decimal(rng.randint(300, 3000)),
+                estimated_duration=rng.randint(30, 480),
+            )
+            for city in cities
+            for i in range(routes_per_city)
+        ),
+        batch_size=batch_size,
+    )
+    route_images = []
+    route_points = []
+    for route in routes:
+        center = CITIES[route.city]
+        for order in range(rng.randint(*images)):
+            name = f"routes/{SYNTHETIC}/{route.pk}-{order}.jpg"
+            route_images.append(
+                RouteImage(
+                    route=route, image=name, derivatives=_derivatives(name, rng), is_cover=order == 0, order=order
+                )
+            )
+        for order in range(rng.randint(*points)):
+            route_points.append(
+                _point(
+                    rng,
+                    center,
+                    route=route,
+                    name=f"{rng.choice(PLACES)} {order + 1}",
+                    description=SENTENCE * rng.randint(0, 3),
+                    address=f"вул. {rng.choice(STREETS)}, {rng.randint(1, 120)}",
+                    order=order,
+                    duration_at_stop=rng.choice((10, 15, 20, 30, 45, 60)),
+                )
+            )
+    RouteImage.objects.bulk_create(route_images, batch_size=batch_size)
+    route_points = RoutePoint.objects.bulk_create(route_points, batch_size=batch_size)
+
+    point_photos = []
+    for point in route_points:
+        if rng.random() < photos:
+            for author in rng.sample(people, min(len(people), rng.randint(1, 4))):
+                name = f"user_point_photos/{SYNTHETIC}/{point.pk}-{author.pk}.jpg"
+                point_photos.append(
+                    RoutePointPhoto(point=point, user=author, image=name, derivatives=_derivatives(name, rng))
+                )
+    RoutePointPhoto.objects.bulk_create(point_photos, batch_size=batch_size)
+
+    route_ratings = [
+        Rating(
+            route=route,
+            user=author,
+            score=rng.choices((1, 2, 3, 4, 5), (1, 1, 3, 6, 6))[0],
+            comment=rng.choice(COMMENTS),
+        )
+        for route in routes
+        for author in rng.sample(people, min(len(people), rng.randint(*ratings)))
+    ]
+    Rating.objects.bulk_create(route_ratings, batch_size=batch_size)
+    user_routes = [
+        UserRoute(
+            user=person,
+            route=route,
+            status=rng.choice(UserRoute.Status.values),
+            is_favorite=rng.random() < 0.3,
+            comment=rng.choice(COMMENTS),
+        )
+        for person in people
+        for route in rng.sample(routes, min(len(routes), rng.randint(*saved)))
+    ]
+    UserRoute.objects.bulk_create(user_routes, batch_size=batch_size)
+
+    ids = [route.pk for route in routes]
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        reconcile_ratings(batch)
+        refresh_route_geometry(batch, batch_size=batch_size)
+        refresh_route_cards(batch)
+        get_search_backend().index_routes(batch)
+    # Нові маршрути: досить скинути закешовані сторінки списків
+    transaction.on_commit(bump_list_version)
+    return {
+        "users": len(people),
+        "routes": len(routes),
+        "route_images": len(route_images),
+        "route_points": len(route_points),
+        "point_photos": len(point_photos),
+        "ratings": len(route_ratings),
+        "user_routes": len(user_routes),
+    }
+
+
+def clear_dataset():
+    """Delete everything generate_dataset() wrote; returns Django's delete() counts."""
+    _, routes = Route.objects.filter(name__startswith=ROUTE_PREFIX).delete()
+    _, users = get_user_model().objects.filter(username__startswith=f"{SYNTHETIC}-").delete()
+    return {**routes, **users}
@@ -1,3 +1,1175 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from PIL import Image
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cards import rebuild_route_cards
+from .fastpath import CardRowSerializer
+from .fieldsets import FieldSet
+from .geo import geohash_encode, haversine_m, polyline_encode
+from .importer import import_routes, read_geojson, read_jsonl
+from .models import Rating, Route, RouteCard, RouteImage, RoutePoint, RoutePointPhoto, UserRoute
+from .ordering import optimize_order, path_legs
+from .ratings import drifted_routes
+from .serializers import RouteCardSerializer
+from .synthetic import CITIES
+from .uploads import get_photo_queue, process_photo
+
+User = get_user_model()
+
+
+class RouteAPITestCase(APITestCase):
+    def setUp(self):
+        cache.clear()  # кеш відповідей живе між тестами
+
+
+def make_route(index, **extra):
+    fields = {
+        "name": f"Route {index}",
+        "city": "Lviv",
+        "mood": Route.Mood.CALM,
+        "budget_min": Decimal("10.00"),
+        "budget_max": Decimal("50.00"),
+        "estimated_duration": 60 + index,
+    }
+    fields.update(extra)
+    return Route.objects.create(**fields)
+
+
+class RouteListQueryCountTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="walker", email="walker@example.com", password="pass12345")
+        other = User.objects.create_user(username="other", email="other@example.com", password="pass12345")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls._create_routes(other)
+
+    @classmethod
+    def _create_routes(cls, other):
+        for i in range(100):
+            route = make_route(i)
+            RouteImage.objects.create(route=route, image=f"routes/{i}-a.jpg", order=0)
+            RouteImage.objects.create(route=route, image=f"routes/{i}-cover.jpg", is_cover=True, order=1)
+            RoutePoint.objects.create(
+                route=route, name="B", latitude=Decimal("49.8"), longitude=Decimal("24.0"), order=2
+            )
+            RoutePoint.objects.create(
+                route=route, name="A", latitude=Decimal("49.841952"), longitude=Decimal("24.031592"), order=1
+            )
+            Rating.objects.create(user=other, route=route, score=4)
+            if i % 2:
+                UserRoute.objects.create(user=cls.user, route=route, is_favorite=i % 4 == 1)
+
+    def _count_queries(self, page_size, expected=3):
+        cache.clear()
+        with mock.patch.object(PageNumberPagination, "page_size", page_size):
+            with self.assertNumQueries(expected):
+                response = self.client.get(reverse("route-list"))
+        self.assertEqual(len(response.data["results"]), page_size)
+        return response
+
+    def test_anonymous_query_count_is_constant(self):
+        for page_size in (1, 20, 100):
+            with self.subTest(page_size=page_size):
+                self._count_queries(page_size)  # ETag aggregate + COUNT(*) + one SELECT for the page
+
+    def test_authenticated_query_count_is_constant(self):
+        self.client.force_authenticate(self.user)
+        for page_size in (1, 20, 100):
+            with self.subTest(page_size=page_size):
+                self._count_queries(page_size, expected=5)  # + saved routes in ETag, saved/favorite state
+
+    def test_list_matches_per_object_serialization(self):
+        self.client.force_authenticate(self.user)
+        response = self._count_queries(100, expected=5)
+        by_id = {item["id"]: item for item in response.data["results"]}
+        for route in Route.objects.all():
+            item = by_id[route.pk]
+            self.assertTrue(item["cover_image"].endswith(f"/media/routes/{route.name.split()[1]}-cover.jpg"))
+            self.assertEqual(item["first_point"], {"latitude": "49.841952", "longitude": "24.031592"})
+            self.assertEqual(item["rating_count"], 1)
+            saved = route.user_routes.filter(user=self.user).first()
+            self.assertEqual(item["is_saved"], saved is not None)
+            self.assertEqual(item["is_favorite"], bool(saved and saved.is_favorite))
+
+    def test_detail_uses_prefetched_relations(self):
+        self.client.force_authenticate(self.user)
+        route = Route.objects.get(name="Route 1")
+        response = self.client.get(reverse("route-detail", args=[route.pk]))
+        self.assertTrue(response.data["cover_image"].endswith("/media/routes/1-cover.jpg"))
+        self.assertEqual(response.data["first_point"], {"latitude": "49.841952", "longitude": "24.031592"})
+        self.assertTrue(response.data["is_saved"])
+        self.assertTrue(response.data["is_favorite"])
+
+    def test_saved_routes_query_count_is_constant(self):
+        self.client.force_authenticate(self.user)
+        rated = list(Route.objects.filter(user_routes__user=self.user).order_by("pk")[:3])
+        for route in rated:
+            Rating.objects.create(user=self.user, route=route, score=5, comment="top")
+        for page_size in (1, 20, 50):
+            with self.subTest(page_size=page_size):
+                with mock.patch.object(PageNumberPagination, "page_size", page_size):
+                    with self.assertNumQueries(3):  # COUNT(*) + маршрути з картками + власні оцінки
+                        response = self.client.get(reverse("user-route-list"))
+                self.assertEqual(len(response.data["results"]), page_size)
+        by_route = {item["route"]["id"]: item for item in response.data["results"]}
+        for user_route in UserRoute.objects.filter(user=self.user).select_related("route"):
+            item = by_route[user_route.route_id]
+            index = user_route.route.name.split()[1]
+            self.assertTrue(item["route"]["cover_image"].endswith(f"/media/routes/{index}-cover.jpg"))
+            self.assertTrue(item["route"]["is_saved"])
+            self.assertEqual(item["route"]["is_favorite"], user_route.is_favorite)
+            expected = {"score": 5, "comment": "top"} if user_route.route in rated else None
+            rating = item["user_rating"] and {k: item["user_rating"][k] for k in ("score", "comment")}
+            self.assertEqual(rating, expected)
+
+
+class RouteCardSyncTests(RouteAPITestCase):
+    def test_card_follows_route_and_relations(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            route = make_route(1)
+        card = RouteCard.objects.get(pk=route.pk)
+        self.assertEqual((card.name, card.cover_image, card.first_point_latitude), ("Route 1", "", None))
+
+        user = User.objects.create_user(username="rater", email="rater@example.com", password="pass12345")
+        with self.captureOnCommitCallbacks(execute=True):
+            route.name = "Renamed"
+            route.save()
+            RouteImage.objects.create(route=route, image="routes/cover.jpg", is_cover=True)
+            RoutePoint.objects.create(
+                route=route, name="A", latitude=Decimal("49.1"), longitude=Decimal("24.2")
+            )
+            Rating.objects.create(user=user, route=route, score=5)
+        card.refresh_from_db()
+        self.assertEqual(card.name, "Renamed")
+        self.assertEqual(card.cover_image, "routes/cover.jpg")
+        self.assertEqual(card.first_point_latitude, Decimal("49.100000"))
+        self.assertEqual((card.rating_count, card.avg_rating), (1, Decimal("5.00")))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            route.delete()
+        self.assertFalse(RouteCard.objects.exists())
+
+    def test_rebuild_restores_missing_cards(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            routes = [make_route(i) for i in range(3)]
+        RouteCard.objects.filter(pk=routes[0].pk).delete()
+        self.assertEqual(rebuild_route_cards(batch_size=2), 3)
+        self.assertEqual(RouteCard.objects.count(), 3)
+
+
+class CardRowSerializerTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="walker", email="walker@example.com", password="pass12345")
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(12):
+                route = make_route(
+                    i,
+                    category=["", Route.Category.PARKS][i % 2],
+                    budget_min=Decimal(i) / 3,
+                    budget_max=Decimal("1234.5") + i,
+                )
+                if i % 3:
+                    name = ["routes/{} cover.jpg", "routes/../{}.jpg", "routes//ćіта:{}?.jpg"][i % 3 - 1 + i % 2]
+                    # Похідні від іншого файлу (i % 4 == 1) не віддаються
+                    source = name.format(i) if i % 4 != 1 else "routes/replaced.jpg"
+                    derivatives = {"source": source, "sizes": {"thumb": {"width": 3, "height": 2, "jpeg": "routes/t.jpg"}}}
+                    RouteImage.objects.create(
+                        route=route, image=name.format(i), is_cover=True, derivatives=derivatives if i % 2 else {}
+                    )
+                if i % 4:
+                    RoutePoint.objects.create(
+                        route=route, name="A", latitude=Decimal("49.84") + i, longitude=Decimal("-24.000001")
+                    )
+                Rating.objects.create(user=cls.user, route=route, score=i % 5 + 1)
+                if i % 5 == 0:
+                    UserRoute.objects.create(user=cls.user, route=route, is_favorite=i % 2 == 0)
+
+    def assertSameBytes(self, queryset, fieldset=None):
+        request = Request(APIRequestFactory().get("/api/routes/"))
+        serializer = RouteCardSerializer(context={"request": request}, fieldset=fieldset)
+        row_serializer = CardRowSerializer(serializer)
+        rows = row_serializer.values(queryset)
+        expected = RouteCardSerializer(queryset, many=True, context={"request": request}, fieldset=fieldset).data
+        self.assertEqual(
+            JSONRenderer().render(row_serializer.to_representation(rows)), JSONRenderer().render(expected)
+        )
+
+    def test_matches_route_card_serializer(self):
+        saved = UserRoute.objects.filter(route=OuterRef("route_id"), user=self.user).values("is_favorite")[:1]
+        querysets = {
+            "plain": RouteCard.objects.all(),
+            "user state": RouteCard.objects.annotate(user_route_is_favorite=Subquery(saved)),
+        }
+        fieldsets = [None, FieldSet({"name": {}, "first_point": {}}), FieldSet(omit={"cover_image": {}})]
+        for name, queryset in querysets.items():
+            for fieldset in fieldsets:
+                with self.subTest(queryset=name, fieldset=fieldset and (fieldset.fields, fieldset.omit)):
+                    self.assertSameBytes(queryset, fieldset)
+
+    def test_list_endpoints_use_rows(self):
+        response = self.client.get(reverse("route-list"), {"cursor": "", "ordering": "budget_max"})
+        self.assertEqual(len(response.data["results"]), 12)
+        nearby = self.client.get(reverse("route-nearby"), {"lat": 50.84, "lon": -24, "radius": 5})
+        self.assertEqual([item["name"] for item in nearby.data], ["Route 1"])
+        self.assertEqual(nearby.data[0]["first_point"], {"latitude": "50.840000", "longitude": "-24.000001"})
+
+
+class RatingCounterTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", email="alice@example.com", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", email="bob@example.com", password="pass12345")
+
+    def assertCounters(self, route, expected):
+        route.refresh_from_db()
+        self.assertEqual((route.rating_sum, route.rating_count, route.avg_rating), expected)
+
+    def test_writes_shift_counters(self):
+        route = make_route(1)
+        stale = Route.objects.get(pk=route.pk)
+        self.client.force_authenticate(self.alice)
+        url = reverse("route-ratings", args=[route.pk])
+        rating_id = self.client.post(url, {"score": 5}).data["id"]
+        Rating.objects.create(user=self.bob, route=route, score=2)
+        self.assertCounters(route, (7, 2, Decimal("3.50")))
+
+        detail = reverse("route-rating-detail", args=[route.pk, rating_id])
+        self.client.patch(detail, {"score": 3})
+        self.assertCounters(route, (5, 2, Decimal("2.50")))
+
+        stale.name = "Edited in admin"
+        stale.save()  # застарілий екземпляр не перетирає лічильники
+        self.assertCounters(route, (5, 2, Decimal("2.50")))
+
+        self.bob.delete()  # каскад теж зсуває лічильники
+        self.assertCounters(route, (3, 1, Decimal("3.00")))
+        self.client.delete(detail)
+        self.assertCounters(route, (0, 0, Decimal("0.00")))
+
+    def test_save_of_deleted_route(self):
+        route = make_route(1)
+        Route.objects.filter(pk=route.pk).delete()
+        with self.assertRaises(Route.NotUpdated), transaction.atomic():
+            route.save()
+        route.save(force_insert=True)  # явне відновлення пише всі поля
+        self.assertEqual(Route.objects.get(pk=route.pk).name, route.name)
+
+    def test_reconcile_repairs_drift(self):
+        routes = [make_route(i) for i in range(3)]
+        Rating.objects.create(user=self.alice, route=routes[0], score=4)
+        Rating.objects.create(user=self.bob, route=routes[0], score=1)
+        Route.objects.filter(pk=routes[0].pk).update(rating_sum=99)
+        Route.objects.filter(pk=routes[2].pk).update(rating_count=3, avg_rating=5)
+        out = StringIO()
+        call_command("reconcile_ratings", stdout=out)
+        self.assertIn("Reconciled 2 routes", out.getvalue())
+        self.assertCounters(routes[0], (5, 2, Decimal("2.50")))
+        self.assertCounters(routes[2], (0, 0, Decimal("0.00")))
+        self.assertEqual(RouteCard.objects.get(pk=routes[0].pk).rating_count, 2)
+
+
+class CursorPaginationTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="pager", email="pager@example.com", password="pass12345")
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(25):
+                # повторювані значення перевіряють tie-breaker по id
+                route = make_route(i, estimated_duration=30 * (i % 4), budget_max=Decimal(i % 3))
+                Rating.objects.create(user=cls.user, route=route, score=i % 5 + 1)
+                UserRoute.objects.create(user=cls.user, route=route)
+
+    def _walk(self, url, params):
+        ids = []
+        response = self.client.get(url, {**params, "cursor": ""})
+        while True:
+            self.assertNotIn("count", response.data)
+            ids += [item["id"] for item in response.data["results"]]
+            if not response.data["next"]:
+                return ids, response
+            response = self.client.get(response.data["next"])
+
+    def test_walks_every_ordering_forward_and_back(self):
+        with mock.patch.object(PageNumberPagination, "page_size", 4):
+            for ordering in ("avg_rating", "-avg_rating", "estimated_duration", "-estimated_duration",
+                             "budget_max", "-budget_max", "created_at", "-created_at"):
+                with self.subTest(ordering=ordering):
+                    expected = list(
+                        RouteCard.objects.order_by(ordering, ordering.replace(ordering.lstrip("-"), "pk"))
+                        .values_list("pk", flat=True)
+                    )
+                    ids, last = self._walk(reverse("route-list"), {"ordering": ordering})
+                    self.assertEqual(ids, expected)
+
+                    back = []
+                    response = last
+                    while response.data["previous"]:
+                        response = self.client.get(response.data["previous"])
+                        back = [item["id"] for item in response.data["results"]] + back
+                    self.assertEqual(back + [item["id"] for item in last.data["results"]], expected)
+
+    def test_ratings_and_saved_routes(self):
+        route = Route.objects.first()
+        with mock.patch.object(PageNumberPagination, "page_size", 1):
+            ids, _ = self._walk(reverse("route-ratings", args=[route.pk]), {})
+        self.assertEqual(ids, list(route.ratings.values_list("pk", flat=True)))
+
+        self.client.force_authenticate(self.user)
+        with mock.patch.object(PageNumberPagination, "page_size", 7):
+            ids, _ = self._walk(reverse("user-route-list"), {})
+        self.assertEqual(ids, list(UserRoute.objects.order_by("-date_saved", "-pk").values_list("pk", flat=True)))
+
+    def test_approximate_total_and_page_numbers(self):
+        response = self.client.get(reverse("route-list"), {"cursor": "", "total": "approx"})
+        self.assertEqual(response.data["approximate_count"], 25)
+        self.assertTrue(response.data["approximate_count_is_exact"])
+        self.assertEqual(self.client.get(reverse("route-list"), {"page": 2}).data["count"], 25)
+        self.assertEqual(self.client.get(reverse("route-list"), {"cursor": "garbage"}).status_code, 404)
+        null_value = base64.urlsafe_b64encode(b'{"v":null,"k":1}').decode()
+        for ordering in ("-avg_rating", "created_at"):
+            response = self.client.get(reverse("route-list"), {"cursor": null_value, "ordering": ordering})
+            self.assertEqual(response.status_code, 404)
+
+
+class RouteSearchTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.center = make_route(1, name="Центр міста", description="Ринкова площа та кава")
+            cls.parks = make_route(2, name="Парки Львова", description="Стрийський парк і центр")
+            cls.kyiv = make_route(3, name="Київ вечірній", city="Kyiv", description="Набережна")
+
+    def search(self, term, **params):
+        response = self.client.get(reverse("route-list"), {"search": term, **params})
+        return [item["id"] for item in response.data["results"]]
+
+    def test_ranked_prefix_search(self):
+        # збіг у назві важить більше, ніж в описі
+        self.assertEqual(self.search("центр"), [self.center.pk, self.parks.pk])
+        self.assertEqual(self.search("ЦЕНТ"), [self.center.pk, self.parks.pk])
+        self.assertEqual(self.search("kyiv набереж"), [self.kyiv.pk])
+        self.assertEqual(self.search("центр", ordering="-created_at"), [self.parks.pk, self.center.pk])
+        self.assertEqual(self.search('"'), [])
+
+    def test_cursor_keeps_relevance_order(self):
+        # Курсор не кодує ранг: ранжований пошук віддається сторінками з номерами
+        response = self.client.get(reverse("route-list"), {"search": "центр", "cursor": ""})
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.center.pk, self.parks.pk])
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(self.search("центр", cursor="", ordering="-created_at"), [self.parks.pk, self.center.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kyiv.name = "Нічний Київ"
+            self.kyiv.save()
+        self.assertEqual(self.search("нічний"), [self.kyiv.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kyiv.delete()
+        self.assertEqual(self.search("нічний"), [])
+
+
+class RouteNearbyTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.market = make_route(1, name="Market", mood=Route.Mood.CALM)
+            cls.park = make_route(2, name="Park", mood=Route.Mood.ADVENTUROUS)
+            cls.kyiv = make_route(3, name="Kyiv", city="Kyiv")
+            for route, lat, lon in (
+                (cls.market, "49.841952", "24.031592"),  # площа Ринок
+                (cls.market, "49.855000", "24.060000"),
+                (cls.park, "49.824000", "24.021000"),  # Стрийський парк, ~2.2 км
+                (cls.kyiv, "50.450100", "30.523400"),
+            ):
+                RoutePoint.objects.create(route=route, name="p", latitude=Decimal(lat), longitude=Decimal(lon))
+
+    def nearby(self, **params):
+        return self.client.get(reverse("route-nearby"), {"lat": 49.8419, "lon": 24.0316, **params})
+
+    def test_orders_by_distance_and_applies_filters(self):
+        response = self.nearby(radius=5)
+        self.assertEqual([item["id"] for item in response.data], [self.market.pk, self.park.pk])
+        self.assertLess(response.data[0]["distance_km"], 0.01)
+        self.assertAlmostEqual(response.data[1]["distance_km"], 2.2, delta=0.1)
+
+        self.assertEqual([item["id"] for item in self.nearby(radius=1).data], [self.market.pk])
+        self.assertEqual([item["id"] for item in self.nearby(radius=5, mood="adventurous").data], [self.park.pk])
+        self.assertEqual(len(self.nearby(radius=50, limit=1).data), 1)
+
+    def test_geohash_cover_matches_full_scan(self):
+        from .geo import haversine_m
+        from .nearby import route_distances
+
+        for radius_m in (50, 900, 2300, 50_000):
+            expected = {
+                p.route_id for p in RoutePoint.objects.all()
+                if haversine_m(49.8419, 24.0316, float(p.latitude), float(p.longitude)) <= radius_m
+            }
+            self.assertEqual(set(route_distances(49.8419, 24.0316, radius_m)), expected)
+
+    def test_rejects_bad_params(self):
+        self.assertEqual(self.client.get(reverse("route-nearby")).status_code, 400)
+        self.assertEqual(self.nearby(radius=500).status_code, 400)
+        self.assertEqual(self.nearby(lat="north").status_code, 400)
+
+
+class RouteResponseCacheTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", email="alice@example.com", password="pass12345")
+        cls.bob = User.objects.create_user(username="bob", email="bob@example.com", password="pass12345")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.route = make_route(1)
+            cls.point = RoutePoint.objects.create(
+                route=cls.route, name="A", latitude=Decimal("49.1"), longitude=Decimal("24.1")
+            )
+        UserRoute.objects.create(user=cls.alice, route=cls.route, is_favorite=True)
+
+    def test_hits_merge_per_user_state(self):
+        list_url, detail_url = reverse("route-list"), reverse("route-detail", args=[self.route.pk])
+        self.client.force_authenticate(self.alice)
+        first = self.client.get(list_url, {"mood": "calm", "city": "Lviv"}).data["results"][0]
+        self.assertEqual((first["is_saved"], first["is_favorite"]), (True, True))
+        self.assertTrue(self.client.get(detail_url).data["is_favorite"])
+
+        self.client.force_authenticate(self.bob)
+        with self.assertNumQueries(3):  # ETag + стан користувача; порядок параметрів не важливий
+            cached = self.client.get(list_url, {"city": "Lviv", "mood": "calm"}).data["results"][0]
+        self.assertEqual((cached["is_saved"], cached["is_favorite"]), (False, False))
+        with self.assertNumQueries(2):
+            self.assertFalse(self.client.get(detail_url).data["is_saved"])
+
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(1):
+            self.client.get(list_url, {"city": "Lviv", "mood": "calm"})
+
+    def test_content_changes_invalidate(self):
+        detail_url = reverse("route-detail", args=[self.route.pk])
+        self.client.get(reverse("route-list"))
+        self.client.get(detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.point.name = "Renamed stop"
+            self.point.latitude = Decimal("49.5")
+            self.point.save()
+        self.assertEqual(self.client.get(detail_url).data["points"][0]["name"], "Renamed stop")
+        first = self.client.get(reverse("route-list")).data["results"][0]
+        self.assertEqual(first["first_point"]["latitude"], "49.500000")
+
+
+class ConditionalGetTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="walker", email="walker@example.com", password="pass12345")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.route = make_route(1)
+            cls.image = RouteImage.objects.create(route=cls.route, image="routes/1.jpg")
+            cls.point = RoutePoint.objects.create(
+                route=cls.route, name="A", latitude=Decimal("49.1"), longitude=Decimal("24.1")
+            )
+
+    def test_detail_and_points_answer_304(self):
+        for url in (
+            reverse("route-detail", args=[self.route.pk]),
+            reverse("route-points", args=[self.route.pk]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag, last_modified = response["ETag"], response["Last-Modified"]
+                with self.assertNumQueries(1):  # лише валідатори, без prefetch
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 304)
+
+    def test_child_changes_and_deletes_change_etag(self):
+        url = reverse("route-detail", args=[self.route.pk])
+        etags = [self.client.get(url)["ETag"]]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.point.name = "Renamed"
+            self.point.save()
+        etags.append(self.client.get(url)["ETag"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.image.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[-1])
+        self.assertEqual(response.status_code, 200)
+        etags.append(response["ETag"])
+        self.assertEqual(len(set(etags)), 3)
+
+    def test_list_etag_follows_cards_and_saved_routes(self):
+        url = reverse("route-list")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_route(2)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+        saved = UserRoute.objects.create(user=self.user, route=self.route)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+        etag = self.client.get(url)["ETag"]
+        saved.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_compressed_response_keeps_matching(self):
+        url = reverse("route-detail", args=[self.route.pk])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+
+class SparseFieldsetTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="walker", email="walker@example.com", password="pass12345")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.route = make_route(1)
+            RouteImage.objects.create(route=cls.route, image="routes/1.jpg", is_cover=True)
+            point = RoutePoint.objects.create(
+                route=cls.route, name="A", latitude=Decimal("49.1"), longitude=Decimal("24.1")
+            )
+        RoutePointPhoto.objects.create(point=point, user=cls.user, image="user_point_photos/1.jpg")
+        UserRoute.objects.create(user=cls.user, route=cls.route, is_favorite=True)
+
+    def test_list_fields_and_omit(self):
+        url = reverse("route-list")
+        item = self.client.get(url, {"fields": "name,city"}).data["results"][0]
+        self.assertEqual(list(item), ["id", "name", "city"])  # id лишається завжди
+        item = self.client.get(url, {"omit": "cover_image,first_point"}).data["results"][0]
+        self.assertNotIn("cover_image", item)
+        self.assertIn("is_saved", item)
+
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(4):  # без запиту стану користувача
+            self.client.get(url, {"fields": "name"})
+        item = self.client.get(url, {"fields": "name,is_favorite"}).data["results"][0]
+        self.assertEqual(item, {"id": self.route.pk, "name": "Route 1", "is_favorite": True})
+
+    def test_detail_skips_prefetches(self):
+        url = reverse("route-detail", args=[self.route.pk])
+        cases = [
+            ({}, 5),  # ETag + маршрут + фото + точки + фото точок з авторами
+            ({"omit": "points.user_photos"}, 4),
+            ({"fields": "name,points.name"}, 3),
+            ({"fields": "name"}, 2),
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"id": self.route.pk, "name": "Route 1"})
+
+        data = self.client.get(url, {"omit": "points.user_photos,images"}).data
+        self.assertNotIn("images", data)
+        self.assertTrue(data["cover_image"].endswith("/media/routes/1.jpg"))
+        self.assertNotIn("user_photos", data["points"][0])
+
+    def test_unknown_fields_are_rejected(self):
+        for params in ({"fields": "name,nope"}, {"omit": "points.nope"}, {"fields": "name.first"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("route-detail", args=[self.route.pk]), params)
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse("route-list"), {"fields": "images"}).status_code, 400)
+
+
+class AsyncRouteViewTests(RouteAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="walker", email="walker@example.com", password="pass12345")
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(25):
+                route = make_route(i, city="Kyiv" if i % 3 else "Lviv")
+                RouteImage.objects.create(route=route, image=f"routes/{i}.jpg", is_cover=True)
+                RoutePoint.objects.create(
+                    route=route, name="A", latitude=Decimal("49.1"), longitude=Decimal("24.1")
+                )
+                Rating.objects.create(user=cls.user, route=route, score=i % 5 + 1)
+        cls.route = Route.objects.get(name="Route 3")
+        UserRoute.objects.create(user=cls.user, route=cls.route, is_favorite=True)
+        cls.token = f"Bearer {RefreshToken.for_user(cls.user).access_token}"
+
+    async def test_same_bytes_as_sync_views(self):
+        cases = [
+            ("route-list", [], {}),
+            ("route-list", [], {"city": "Kyiv", "ordering": "-avg_rating", "page": 2}),
+            ("route-list", [], {"cursor": "", "search": "route"}),
+            ("route-detail", [self.route.pk], {}),
+            ("route-detail", [self.route.pk], {"fields": "name,is_saved,points.name"}),
+            ("route-detail", [10**6], {}),
+        ]
+        for name, args, params in cases:
+            for headers in ({}, {"Authorization": self.token}):
+                with self.subTest(name=name, params=params, authenticated=bool(headers)):
+                    expected = await sync_to_async(self.client.get)(
+                        reverse(name, args=args), params, headers=headers
+                    )
+                    await sync_to_async(cache.clear)()
+                    response = await self.async_client.get(
+                        reverse(f"async-{name}", args=args), params, headers=headers
+                    )
+                    self.assertEqual(response.status_code, expected.status_code)
+                    # Посилання пагінації ведуть на свій префікс
+                    self.assertEqual(response.content.replace(b"/api/async/", b"/api/"), expected.content)
+                    self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    async def test_search_on_cold_backend_cache(self):
+        # Перший ?search= у процесі: бекенд пошуку ще не обрано, вибір читає БД
+        with mock.patch.dict("routes.search._backends", clear=True):
+            response = await self.async_client.get(reverse("async-route-list"), {"search": "route"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["count"], 25)
+
+    async def test_conditional_get_and_bad_token(self):
+        url = reverse("async-route-detail", args=[self.route.pk])
+        etag = (await self.async_client.get(url))["ETag"]
+        self.assertEqual((await self.async_client.get(url, headers={"If-None-Match": etag})).status_code, 304)
+        response = await self.async_client.get(url, headers={"Authorization": "Bearer broken"})
+        self.assertEqual(response.status_code, 401)
+
+
+def make_image(size, mode="RGB", fmt="JPEG"):
+    buffer = BytesIO()
+    Image.new(mode, size, "red").save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class ImageDerivativeTests(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.route = make_route(1)
+
+    def test_upload_generates_derivatives(self):
+        upload = SimpleUploadedFile("cover.jpg", make_image((2400, 1200)), content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            image = RouteImage.objects.create(route=self.route, image=upload, is_cover=True)
+        image.refresh_from_db()
+        self.assertEqual(image.derivatives["source"], image.image.name)
+        sizes = image.derivatives["sizes"]
+        self.assertEqual(
+            {size: (variant["width"], variant["height"]) for size, variant in sizes.items()},
+            {"full": (1920, 960), "card": (800, 400), "thumb": (320, 160)},
+        )
+        for variant in sizes.values():
+            for fmt in ("webp", "jpeg"):
+                with default_storage.open(variant[fmt]) as f, Image.open(f) as stored:
+                    self.assertEqual((stored.format.lower(), stored.size), (fmt, (variant["width"], variant["height"])))
+
+        card = self.client.get(reverse("route-list")).data["results"][0]
+        self.assertEqual(card["cover_derivatives"]["thumb"]["webp"], f"http://testserver/media/{sizes['thumb']['webp']}")
+        detail = self.client.get(reverse("route-detail", args=[self.route.pk])).data
+        self.assertEqual(detail["cover_derivatives"], card["cover_derivatives"])
+        self.assertEqual(detail["images"][0]["derivatives"], card["cover_derivatives"])
+
+    def test_backfill_command(self):
+        default_storage.save("points/logo.png", ContentFile(make_image((400, 400), "RGBA", "PNG")))
+        with self.captureOnCommitCallbacks(execute=True):
+            point = RoutePoint.objects.create(
+                route=self.route, name="A", latitude=Decimal("49.8"), longitude=Decimal("24.0"), image="points/logo.png"
+            )
+            RouteImage.objects.create(route=self.route, image="routes/missing.jpg")
+        self.assertEqual(point.derivatives, {})
+
+        out = StringIO()
+        with self.assertLogs("routes.images", "WARNING"):
+            call_command("generate_image_derivatives", stdout=out)
+        self.assertIn("Generated derivatives for 1 images, skipped 0, failed 1", out.getvalue())
+        point.refresh_from_db()
+        self.assertEqual(point.derivatives["sizes"]["thumb"]["jpeg"], "points/logo.thumb.jpg")
+        url = reverse("route-points", args=[self.route.pk])
+        self.assertEqual(self.client.get(url).data["results"][0]["image_derivatives"]["card"]["height"], 400)
+
+        out = StringIO()
+        call_command("generate_image_derivatives", model=["points"], stdout=out)
+        self.assertIn("Generated derivatives for 0 images, skipped 1, failed 0", out.getvalue())
+        # Замінений файл: похідні старого не віддаються до повторної генерації
+        point.image = "points/other.png"
+        point.save()
+        self.assertIsNone(self.client.get(url).data["results"][0]["image_derivatives"])
+
+
+@override_settings(PHOTO_MAX_DIMENSION=1000)
+class PhotoUploadTests(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        media_root, spool_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, spool_dir)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, PHOTO_SPOOL_DIR=spool_dir))
+        self.user = User.objects.create_user(username="walker", email="walker@example.com", password="pass12345")
+        self.client.force_authenticate(self.user)
+        self.route = make_route(1)
+        self.point = RoutePoint.objects.create(
+            route=self.route, name="A", latitude=Decimal("49.8"), longitude=Decimal("24.0")
+        )
+        self.submit = self.enterContext(mock.patch.object(get_photo_queue(), "submit"))
+
+    def upload(self, content):
+        upload = SimpleUploadedFile("photo.jpg", content, content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("point-photos", args=[self.point.pk]), {"image": upload})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "processing")
+        self.assertIsNone(response.data["image_url"])
+        self.assertTrue(response["Location"].endswith(reverse("point-photo-detail", args=[response.data["id"]])))
+        self.submit.assert_called_once_with(response.data["id"])
+        return RoutePointPhoto.objects.get(pk=response.data["id"])
+
+    def test_photo_is_processed_off_request(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернути на 90°
+        exif[0x010F] = "Phone"  # Make
+        buffer = BytesIO()
+        Image.new("RGB", (3000, 1500), "blue").save(buffer, "JPEG", exif=exif.tobytes())
+        photo = self.upload(buffer.getvalue())
+        route_url = reverse("route-detail", args=[self.route.pk])
+        self.assertEqual(self.client.get(route_url).data["points"][0]["user_photos"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_photo(photo.pk)
+        photo.refresh_from_db()
+        self.assertEqual((photo.status, photo.spool_file), ("ready", ""))
+        self.assertEqual(os.listdir(settings.PHOTO_SPOOL_DIR), [])
+        with default_storage.open(photo.image.name) as f, Image.open(f) as stored:
+            self.assertEqual((stored.size, dict(stored.getexif())), ((500, 1000), {}))
+        self.assertEqual(photo.derivatives["sizes"]["thumb"]["height"], 320)
+
+        status = self.client.get(reverse("point-photo-detail", args=[photo.pk])).data
+        self.assertEqual(status["status"], "ready")
+        self.assertTrue(status["image_url"].endswith(photo.image.name))
+        self.assertEqual(self.client.get(route_url).data["points"][0]["user_photos"], [status])
+
+    def test_invalid_file_fails_and_status_is_private(self):
+        photo = self.upload(make_image((40, 30)))
+        # Заголовок валідний, але сам файл пошкоджений (перевіряє лише фоновий потік)
+        (Path(settings.PHOTO_SPOOL_DIR) / photo.spool_file).write_bytes(make_image((40, 30))[:200])
+        with self.assertLogs("routes.uploads", "WARNING"):
+            process_photo(photo.pk)
+        photo.refresh_from_db()
+        self.assertEqual((photo.status, photo.image.name), ("failed", ""))
+        self.assertEqual(os.listdir(settings.PHOTO_SPOOL_DIR), [])
+
+        other = User.objects.create_user(username="other", email="other@example.com", password="pass12345")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(reverse("point-photo-detail", args=[photo.pk])).status_code, 404)
+
+    def test_retry_overwrites_stored_image(self):
+        photo = self.upload(make_image((40, 30)))
+        with mock.patch("routes.uploads.generate_derivatives", side_effect=RuntimeError("storage down")):
+            with self.assertRaises(RuntimeError):
+                process_photo(photo.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            process_photo(photo.pk)
+        photo.refresh_from_db()
+        self.assertEqual(photo.status, "ready")
+        self.assertTrue(Path(photo.image.name).name.startswith(f"{photo.pk}-"))
+        stored = os.listdir(Path(settings.MEDIA_ROOT) / Path(photo.image.name).parent)
+        self.assertEqual([name for name in stored if name.count(".") == 1], [Path(photo.image.name).name])
+
+    def test_full_queue_is_rejected(self):
+        with mock.patch.object(get_photo_queue(), "full", return_value=True):
+            upload = SimpleUploadedFile("photo.jpg", make_image((40, 30)), content_type="image/jpeg")
+            response = self.client.post(reverse("point-photos", args=[self.point.pk]), {"image": upload})
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "30"))
+        self.assertFalse(RoutePointPhoto.objects.exists())
+        self.assertEqual(os.listdir(settings.PHOTO_SPOOL_DIR), [])
+
+
+class SyntheticDataTests(RouteAPITestCase):
+    def test_generate_and_clear(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "generate_synthetic_data", routes_per_city=3, cities=["Lviv", "Odesa"], users=6, stdout=out
+            )
+        self.assertIn("6 users, 6 routes", out.getvalue())
+        self.assertFalse(drifted_routes().exists())
+        self.assertEqual(RouteCard.objects.count(), 6)
+        self.assertFalse(RoutePoint.objects.filter(geohash="").exists())
+        response = self.client.get(reverse("route-nearby"), {"lat": 46.48, "lon": 30.72, "radius": 10})
+        self.assertEqual({item["city"] for item in response.data}, {"Odesa"})
+        self.assertIsNotNone(response.data[0]["cover_derivatives"])
+
+        make_route(99)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("generate_synthetic_data", "--clear", routes_per_city=1, users=1, stdout=out)
+        self.assertEqual(Route.objects.count(), len(CITIES) + 1)
+        self.assertEqual(User.objects.count(), 1)
+
+
+def import_record(external_id, points=2, **extra):
+    return {
+        "external_id": external_id,
+        "name": f"Imported {external_id}",
+        "city": "Lviv",
+        "mood": "calm",
+        "budget_max": "100",
+        "estimated_duration": 90,
+        "points": [
+            {"name": f"Stop {i}", "latitude": 49.84 + i / 100, "longitude": 24.03} for i in range(points)
+        ],
+        "images": [{"image": f"routes/{external_id}.jpg", "is_cover": True}],
+        **extra,
+    }
+
+
+class ImportRoutesTests(RouteAPITestCase):
+    def _import(self, records, suffix=".jsonl"):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as file:
+            if suffix == ".jsonl":
+                file.write("".join(json.dumps(record) + "\n" for record in records))
+            else:
+                file.write(records)
+        self.addCleanup(os.unlink, file.name)
+        out, err = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_routes", file.name, chunk_size=2, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_is_idempotent_by_external_id(self):
+        records = [import_record("a"), import_record("b"), import_record("c", mood="bad")]
+        out, err = self._import(records)
+        self.assertIn("2 created, 0 updated, 0 unchanged", out)
+        self.assertIn("line 3: mood:", err)
+        route = Route.objects.get(external_id="a")
+        self.assertEqual(route.card.cover_image, "routes/a.jpg")
+        point = route.points.get(order=1)
+        self.assertEqual(point.geohash, geohash_encode(point.latitude, point.longitude))
+        point_ids = list(route.points.values_list("pk", flat=True))
+        self.client.get(reverse("route-list"))  # закешувати список
+
+        out, _ = self._import(records[:2])
+        self.assertIn("0 created, 0 updated, 2 unchanged", out)
+
+        out, _ = self._import([import_record("a", points=1, name="Renamed"), import_record("b")])
+        self.assertIn("0 created, 1 updated, 1 unchanged", out)
+        route.refresh_from_db()
+        self.assertEqual(route.name, "Renamed")
+        self.assertEqual(list(route.points.values_list("pk", flat=True)), point_ids[:1])
+        self.assertEqual(RouteCard.objects.get(pk=route.pk).name, "Renamed")
+        names = {item["name"] for item in self.client.get(reverse("route-list")).data["results"]}
+        self.assertIn("Renamed", names)
+        self.assertEqual(Route.objects.count(), 2)
+
+    def test_csv_and_geojson(self):
+        out, _ = self._import(
+            "external_id,name,city,mood,budget_max,estimated_duration,images,point_name,point_latitude,point_longitude\n"
+            "a,Imported a,Lviv,calm,100,90,routes/a.jpg,Stop 0,49.84,24.03\n"
+            "a,Imported a,Lviv,calm,100,90,routes/a.jpg,Stop 1,49.85,24.03\n"
+            "b,Imported b,Odesa,curious,50,30,,,,\n",
+            suffix=".csv",
+        )
+        self.assertIn("2 created", out)
+        self.assertEqual(Route.objects.get(external_id="a").points.count(), 2)
+        self.assertEqual(Route.objects.get(external_id="b").points.count(), 0)
+
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [[24.03, 49.84], [24.03, 49.85]]},
+            "properties": {**import_record("a"), "points": [{"name": "Stop 0"}, {"name": "Stop 1"}]},
+        }
+        out, _ = self._import(json.dumps({"type": "FeatureCollection", "features": [feature]}), suffix=".geojson")
+        self.assertIn("0 created, 0 updated, 1 unchanged", out)
+
+    def test_geojson_is_read_incrementally(self):
+        collection = {
+            "type": "FeatureCollection",
+            "name": "catalogue",
+            "features": [
+                {"type": "Feature", "geometry": None, "properties": {"external_id": str(i), "name": "x" * 50}}
+                for i in range(20)
+            ],
+        }
+        # Крихітні шматки: значення рвуться на межах
+        rows = list(read_geojson(StringIO(json.dumps(collection)), chunk_size=7))
+        self.assertEqual([record["external_id"] for _, record in rows], [str(i) for i in range(20)])
+        self.assertEqual(rows[-1][0], "feature 20")
+
+    def test_rows_are_written_in_chunks(self):
+        chunks = []
+        with self.captureOnCommitCallbacks(execute=True):
+            totals = import_routes(
+                ((f"line {i}", import_record(str(i))) for i in range(5)),
+                chunk_size=2,
+                on_chunk=lambda totals: chunks.append(totals["created"]),
+            )
+        self.assertEqual(chunks, [2, 4, 5])
+        self.assertEqual(totals["points"], 10)
+
+
+@override_settings(ROUTE_EXPORT_CHUNK_SIZE=2)
+class RouteExportTests(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user(username="partner", email="partner@example.com", password="x")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        with self.captureOnCommitCallbacks(execute=True):
+            import_routes(
+                (f"line {i}", import_record(f"r{i}", points=i % 3, city="Odesa" if i == 4 else "Lviv"))
+                for i in range(5)
+            )
+
+    def _export(self, **params):
+        response = self.client.get(reverse("route-export"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_ndjson_round_trip(self):
+        # Користувач JWT, курсор маршрутів, точки й фото на кожну пачку з 2
+        with self.assertNumQueries(2 + 3 * 2):
+            body = self._export()
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([record["external_id"] for record in records], [f"r{i}" for i in range(5)])
+        self.assertEqual(records[2]["points"][1]["latitude"], "49.850000")
+        self.assertEqual(records[0]["images"], [{"image": "routes/r0.jpg", "is_cover": True}])
+
+        Route.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            totals = import_routes(read_jsonl(StringIO(body.decode())))
+        self.assertEqual((totals["created"], totals["points"]), (5, 4))
+        self.assertEqual(
+            [json.loads(line)["points"] for line in self._export().splitlines()],
+            [record["points"] for record in records],
+        )
+
+    def test_geojson_filters_and_round_trip(self):
+        collection = json.loads(self._export(format="geojson", city="lviv"))
+        self.assertEqual(len(collection["features"]), 4)
+        geometries = [feature["geometry"] for feature in collection["features"]]
+        self.assertEqual([geometry and geometry["type"] for geometry in geometries][:3], [None, "Point", "LineString"])
+        self.assertEqual(geometries[2]["coordinates"][1], [24.03, 49.85])
+
+        body = self._export(format="geojson")
+        totals = import_routes(read_geojson(StringIO(body.decode())))
+        self.assertEqual(totals["unchanged"], 5)
+
+    def test_updated_since(self):
+        old = timezone.now() - timedelta(days=2)
+        for model in (Route, RoutePoint, RouteImage):
+            model.objects.update(updated_at=old)
+        RoutePoint.objects.filter(route__external_id="r1").update(updated_at=timezone.now())  # змінилась лише точка
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        ids = [json.loads(line)["external_id"] for line in self._export(updated_since=since).splitlines()]
+        self.assertEqual(ids, ["r1"])
+
+        response = self.client.get(reverse("route-export"), {"updated_since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("updated_since", json.loads(response.content)["detail"])
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse("route-export")).status_code, 401)
+
+
+class StopOrderTests(RouteAPITestCase):
+    # Точки на одній широті, поточний порядок — зигзаг по довготі
+    LONGITUDES = ("24.00", "24.04", "24.01", "24.03", "24.02", "24.05")
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="planner", email="planner@example.com", password="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.route = make_route(1)
+            self.points = [
+                RoutePoint.objects.create(
+                    route=self.route, name=f"P{order}", latitude=Decimal("49.84"), longitude=Decimal(lon), order=order
+                )
+                for order, lon in enumerate(self.LONGITUDES)
+            ]
+        self.by_longitude = [point.pk for point in sorted(self.points, key=lambda point: point.longitude)]
+        self.url = reverse("route-points-optimize", args=[self.route.pk])
+
+    def _stored_order(self):
+        return list(RoutePoint.objects.filter(route=self.route).order_by("order").values_list("pk", flat=True))
+
+    def test_preview_keeps_first_stop_and_does_not_save(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order"], self.by_longitude)
+        self.assertLess(response.data["total_m"], response.data["current_total_m"])
+        self.assertEqual(len(response.data["legs_m"]), len(self.points) - 1)
+        self.assertFalse(response.data["saved"])
+        self.assertEqual(self._stored_order(), [point.pk for point in self.points])
+
+    def test_staff_save_with_fixed_end_refreshes_card(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {"start": None, "end": "first", "save": True}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["saved"])
+        self.assertEqual(self._stored_order(), self.by_longitude[::-1])
+        self.assertEqual(RouteCard.objects.get(pk=self.route.pk).first_point_longitude, Decimal("24.050000"))
+        points = self.client.get(reverse("route-points", args=[self.route.pk])).data
+        self.assertEqual([point["id"] for point in points["results"]], self.by_longitude[::-1])
+
+        # Повторний виклик нічого не переставляє
+        response = self.client.post(self.url, {"start": "first", "save": True}, format="json")
+        self.assertFalse(response.data["saved"])
+
+    def test_errors(self):
+        self.assertEqual(self.client.post(self.url, {}, format="json").status_code, 401)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(self.url, {"save": True}, format="json").status_code, 403)
+        foreign = RoutePoint.objects.create(
+            route=make_route(2), name="X", latitude=Decimal("50.45"), longitude=Decimal("30.52")
+        )
+        response = self.client.post(self.url, {"end": foreign.pk}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(foreign.pk), response.data["detail"])
+        self.assertEqual(self.client.post(self.url, {"start": "middle"}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(self.url, {"start": "last", "end": "last"}, format="json").status_code, 400)
+        missing = reverse("route-points-optimize", args=[self.route.pk + 100])
+        self.assertEqual(self.client.post(missing, {}, format="json").status_code, 404)
+
+    def test_python_fallback(self):
+        rng = random.Random(7)
+        lats = [49.84 + rng.uniform(-0.04, 0.04) for _ in range(30)]
+        lons = [24.03 + rng.uniform(-0.07, 0.07) for _ in range(30)]
+        results = [optimize_order(lats, lons, start=0, end=29)]
+        with mock.patch("routes.ordering.np", None):
+            results.append(optimize_order(lats, lons, start=0, end=29))
+        for order, distances in results:
+            self.assertEqual(sorted(order), list(range(30)))
+            self.assertEqual((order[0], order[-1]), (0, 29))
+        lengths = [sum(path_legs(distances, order)) for order, distances in results]
+        # Обидві реалізації — локальний оптимум тих самих ходів; різниця лише в порядку пошуку
+        self.assertLess(abs(lengths[0] - lengths[1]) / lengths[0], 0.1)
+
+
+class RouteGeometryTests(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="mapper", email="mapper@example.com", password="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lviv = make_route(1)
+            self.points = [
+                RoutePoint.objects.create(
+                    route=self.lviv, name=name, latitude=Decimal(lat), longitude=Decimal(lon), order=order
+                )
+                for order, (name, lat, lon) in enumerate(
+                    [("A", "49.84", "24.02"), ("B", "49.85", "24.03"), ("C", "49.83", "24.04")]
+                )
+            ]
+            self.kyiv = make_route(2, city="Kyiv")
+            RoutePoint.objects.create(route=self.kyiv, name="K", latitude=Decimal("50.45"), longitude=Decimal("30.52"))
+            self.empty = make_route(3)
+
+    def test_polyline_encoding(self):
+        # Приклад з документації Google Maps
+        self.assertEqual(
+            polyline_encode([(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]), "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+        )
+
+    def test_geometry_follows_points(self):
+        route = Route.objects.get(pk=self.lviv.pk)
+        legs = haversine_m(49.84, 24.02, 49.85, 24.03) + haversine_m(49.85, 24.03, 49.83, 24.04)
+        self.assertEqual(route.path_length_m, round(legs))
+        self.assertEqual((route.min_latitude, route.max_longitude), (Decimal("49.830000"), Decimal("24.040000")))
+        self.assertEqual(
+            (route.centroid_latitude, route.centroid_longitude), (Decimal("49.840000"), Decimal("24.030000"))
+        )
+
+        results = self.client.get(reverse("route-list"), {"city": "lviv"}).data["results"]
+        list_item = next(item for item in results if item["id"] == route.pk)
+        detail = self.client.get(reverse("route-detail", args=[route.pk])).data
+        for data in (list_item, detail):
+            self.assertEqual(data["polyline"], route.polyline)
+            self.assertEqual(data["path_length_m"], route.path_length_m)
+            self.assertEqual(
+                data["bbox"],
+                {
+                    "min": {"latitude": "49.830000", "longitude": "24.020000"},
+                    "max": {"latitude": "49.850000", "longitude": "24.040000"},
+                },
+            )
+            self.assertEqual(data["centroid"], {"latitude": "49.840000", "longitude": "24.030000"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.points[1].delete()
+        card = RouteCard.objects.get(pk=route.pk)
+        self.assertEqual(card.path_length_m, round(haversine_m(49.84, 24.02, 49.83, 24.04)))
+        self.assertEqual(card.max_latitude, Decimal("49.840000"))
+        self.assertEqual(card.polyline, polyline_encode([("49.84", "24.02"), ("49.83", "24.04")]))
+
+        empty = self.client.get(reverse("route-detail", args=[self.empty.pk])).data
+        self.assertEqual(
+            (empty["path_length_m"], empty["bbox"], empty["centroid"], empty["polyline"]), (0, None, None, "")
+        )
+
+    def test_in_bbox(self):
+        def ids(bbox, url=reverse("route-list")):
+            response = self.client.get(url, {"in_bbox": bbox})
+            self.assertEqual(response.status_code, 200)
+            return sorted(item["id"] for item in response.data["results"])
+
+        self.assertEqual(ids("23.9,49.7,24.2,49.9"), [self.lviv.pk])
+        # Перетин, а не вкладеність: рамка зачіпає лише кінчик маршруту
+        self.assertEqual(ids("24.035,49.80,24.5,49.835"), [self.lviv.pk])
+        self.assertEqual(ids("22,44,40,52"), [self.lviv.pk, self.kyiv.pk])
+        self.assertEqual(ids("0,0,1,1"), [])
+        for bad in ("24,49,23,50", "24,49,25", "a,b,c,d", "0,-91,1,1"):
+            self.assertEqual(self.client.get(reverse("route-list"), {"in_bbox": bad}).status_code, 400)
+
+        self.client.force_authenticate(self.user)
+        export = self.client.get(reverse("route-export"), {"in_bbox": "30,50,31,51"})
+        records = [json.loads(line) for line in b"".join(export.streaming_content).splitlines()]
+        self.assertEqual([record["id"] for record in records], [self.kyiv.pk])
+
+    def test_bulk_paths_and_saved_routes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            import_routes([("line 1", import_record("geo", points=3))])
+        imported = Route.objects.get(external_id="geo")
+        self.assertGreater(imported.path_length_m, 0)
+        self.assertEqual(RouteCard.objects.get(pk=imported.pk).polyline, imported.polyline)
+
+        # first_point у збережених маршрутах — з картки, без запиту точок на кожен маршрут
+        for route in (self.lviv, self.kyiv, self.empty):
+            UserRoute.objects.create(user=self.user, route=route)
+        self.client.force_authenticate(self.user)
+        results = self.client.get(reverse("user-route-list")).data["results"]
+        first_points = {item["route"]["id"]: item["route"]["first_point"] for item in results}
+        self.assertEqual(first_points[self.lviv.pk], {"latitude": "49.840000", "longitude": "24.020000"})
+        self.assertIsNone(first_points[self.empty.pk])
+        self.assertEqual(results[0]["route"]["polyline"], Route.objects.get(pk=results[0]["route"]["id"]).polyline)
@@ -0,0 +1,129 @@
+"""
+Обробка фото користувачів поза потоком запиту.
+
+POST лише переносить завантажений файл у локальний спул (PHOTO_SPOOL_DIR),
+створює RoutePointPhoto зі статусом ``processing`` і після коміту ставить
+його id у фонову чергу (core.background). Потік черги повністю декодує
+зображення (валідація), повертає за EXIF-орієнтацією, зменшує до
+PHOTO_MAX_DIMENSION, перекодовує без метаданих (EXIF, GPS) і зберігає в
+основний storage — для Cloudinary це і є повільне вивантаження. Далі —
+похідні розміри (routes.images) і статус ``ready``; битий файл — ``failed``.
+
+Помилки storage повторюються з backoff. Черга живе в пам'яті процесу: фото,
+що лишились у ``processing`` після перезапуску або переповнення черги,
+дообробляє ``manage.py process_photo_spool``.
+"""
+import logging
+import threading
+import uuid
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from PIL import Image, ImageOps
+
+from core.background import BackgroundQueue
+
+from .images import GENERATION_ERRORS, _store, generate_derivatives
+from .models import RoutePointPhoto
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def spool_path(name):
+    return Path(settings.PHOTO_SPOOL_DIR) / name
+
+
+def spool_upload(upload):
+    """Move or copy an UploadedFile into the spool; returns the spool file name."""
+    spool_dir = Path(settings.PHOTO_SPOOL_DIR)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{uuid.uuid4().hex}{Path(upload.name).suffix.lower()[:10]}"
+    if hasattr(upload, "temporary_file_path"):
+        # Великий файл уже на диску — переносимо, як і FileSystemStorage
+        file_move_safe(upload.temporary_file_path(), str(spool_dir / name))
+    else:
+        with open(spool_dir / name, "wb") as f:
+            for chunk in upload.chunks():
+                f.write(chunk)
+    return name
+
+
+def _reencode(path):
+    """``(bytes, extension)`` of the decoded, oriented, resized image without metadata."""
+    with Image.open(path) as original:
+        original.load()
+        icc_profile = original.info.get("icc_profile")
+        image = ImageOps.exif_transpose(original)
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    image.info = {}
+    limit = settings.PHOTO_MAX_DIMENSION
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    buffer = BytesIO()
+    if has_alpha:
+        image.save(buffer, "PNG", optimize=True, icc_profile=icc_profile)
+        return buffer.getvalue(), "png"
+    image.save(buffer, "JPEG", quality=90, optimize=True, progressive=True, icc_profile=icc_profile)
+    return buffer.getvalue(), "jpg"
+
+
+def process_photo(photo_id):
+    """
+    Turn the spooled file of ``photo_id`` into its stored image. Storage
+    errors propagate so that the queue retries them.
+    """
+    photo = RoutePointPhoto.objects.filter(pk=photo_id, status=RoutePointPhoto.Status.PROCESSING).first()
+    if photo is None:
+        return  # видалене або вже оброблене
+    path = spool_path(photo.spool_file)
+    try:
+        content, extension = _reencode(path)
+    except GENERATION_ERRORS as exc:
+        logger.warning("Rejected photo %s (%s): %s", photo_id, photo.spool_file, exc)
+        mark_failed(photo_id)
+        return
+    # Ім'я — з id фото та випадкового імені в спулі: повтор після збою далі перезаписує
+    # той самий файл, а не лишає в storage сироти з новими uuid
+    basename = f"{photo_id}-{Path(photo.spool_file).stem}.{extension}"
+    photo.image.name = _store(photo.image.storage, photo.image.field.generate_filename(photo, basename), content)
+    try:
+        photo.derivatives = generate_derivatives(photo.image)
+    except GENERATION_ERRORS as exc:
+        logger.warning("No derivatives for photo %s: %s", photo_id, exc)
+    photo.status = RoutePointPhoto.Status.READY
+    photo.spool_file = ""
+    photo.save(update_fields=["image", "derivatives", "status", "spool_file", "updated_at"])
+    path.unlink(missing_ok=True)
+
+
+def mark_failed(photo_id, exc=None):
+    """Queue ``on_failure`` callback: the photo stays as ``failed``, its spool file goes."""
+    photo = RoutePointPhoto.objects.filter(pk=photo_id, status=RoutePointPhoto.Status.PROCESSING).first()
+    if photo is None:
+        return
+    spool_path(photo.spool_file).unlink(missing_ok=True)
+    photo.status = RoutePointPhoto.Status.FAILED
+    photo.spool_file = ""
+    photo.save(update_fields=["status", "spool_file", "updated_at"])
+
+
+def get_photo_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = BackgroundQueue(
+                    process_photo,
+                    name="photo-worker",
+                    workers=settings.PHOTO_WORKERS,
+                    max_size=settings.PHOTO_QUEUE_SIZE,
+                    retries=settings.PHOTO_RETRIES,
+                    backoff=settings.PHOTO_RETRY_BACKOFF,
+                    on_failure=mark_failed,
+                )
+    return _queue
@@ -1,9 +1,14 @@
 from django.urls import path
+from .async_views import AsyncRouteDetailView, AsyncRouteListView
 from .views import (
     RouteListView,
+    RouteNearbyView,
     RouteDetailView,
+    RouteExportView,
     RoutePointListView,
+    RouteStopOrderView,
     RoutePointPhotoView,
+    RoutePointPhotoDetailView,
     UserRouteListCreateView,
     UserRouteDetailView,
     RatingListCreateView,
@@ -12,8 +17,11 @@ from .views import (
 
 routes_urlpatterns = [
     path("", RouteListView.as_view(), name="route-list"),
+    path("nearby/", RouteNearbyView.as_view(), name="route-nearby"),
+    path("export/", RouteExportView.as_view(), name="route-export"),
     path("<int:pk>/", RouteDetailView.as_view(), name="route-detail"),
     path("<int:route_pk>/points/", RoutePointListView.as_view(), name="route-points"),
+    path("<int:route_pk>/points/optimize/", RouteStopOrderView.as_view(), name="route-points-optimize"),
     path("<int:route_pk>/ratings/", RatingListCreateView.as_view(), name="route-ratings"),
     path(
         "<int:route_pk>/ratings/<int:pk>/",
@@ -22,9 +30,16 @@ routes_urlpatterns = [
     ),
     # User-uploaded photos for route points
     path("points/<int:point_pk>/photos/", RoutePointPhotoView.as_view(), name="point-photos"),
+    path("points/photos/<int:pk>/", RoutePointPhotoDetailView.as_view(), name="point-photo-detail"),
 ]
 
 user_routes_urlpatterns = [
     path("", UserRouteListCreateView.as_view(), name="user-route-list"),
     path("<int:pk>/", UserRouteDetailView.as_view(), name="user-route-detail"),
 ]
+
+# Async-версії для ASGI (routes.async_views)
+async_routes_urlpatterns = [
+    path("", AsyncRouteListView.as_view(), name="async-route-list"),
+    path("<int:pk>/", AsyncRouteDetailView.as_view(), name="async-route-detail"),
+]
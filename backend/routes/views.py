@@ -1,12 +1,29 @@
-from django.db.models import Count
-from rest_framework import generics, permissions
-from .filters import RouteFilter
-from .models import Route, RoutePoint, RoutePointPhoto, UserRoute, Rating
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import OuterRef, Prefetch, Subquery
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from .cache import CachedResponseMixin, merge_user_state, response_cache_key
+from .conditional import ConditionalGetMixin, route_list_validators, route_validators
+from .export import STREAMS, GeoJSONRenderer, NDJSONRenderer, changed_since, parse_updated_since
+from .fastpath import CardRowSerializer
+from .fieldsets import SparseFieldsViewMixin
+from .filters import RouteCardFilter, RouteFilter, RouteOrderingFilter, RouteSearchFilter
+from .models import Route, RouteCard, RoutePoint, RoutePointPhoto, UserRoute, Rating
+from .nearby import route_distances
+from .ordering import StopOrderError, optimize_route
+from .uploads import get_photo_queue, spool_upload
 from .serializers import (
+    RouteCardSerializer,
     RouteDetailSerializer,
-    RouteListSerializer,
     RoutePointPhotoSerializer,
     RoutePointSerializer,
+    StopOrderSerializer,
     UserRouteSerializer,
     RatingSerializer,
 )
@@ -14,42 +31,251 @@ from .serializers import (
 
 # ── Routes ────────────────────────────────────────────────────────────────────
 
-class RouteListView(generics.ListAPIView):
+def ready_photos(lookup):
+    """Prefetch of the processed user photos behind ``lookup``."""
+    queryset = RoutePointPhoto.objects.filter(status=RoutePointPhoto.Status.READY).select_related("user")
+    return Prefetch(lookup, queryset=queryset)
+
+
+# Поле RouteCardSerializer -> колонки RouteCard, з яких воно будується
+CARD_COLUMNS = {
+    "id": ("route",),
+    "cover_derivatives": ("cover_image", "cover_derivatives"),
+    "first_point": ("first_point_latitude", "first_point_longitude"),
+    "bbox": ("min_latitude", "min_longitude", "max_latitude", "max_longitude"),
+    "centroid": ("centroid_latitude", "centroid_longitude"),
+    "is_saved": (),
+    "is_favorite": (),
+}
+
+
+class RouteListView(SparseFieldsViewMixin, ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """
     GET /api/routes/
     Filters: city, mood, budget_max__lte, budget_min__gte, duration__lte
-    Search:  ?search=...
+    Search:  ?search=...  (full-text, ranked by relevance unless ?ordering= is given)
     Order:   ?ordering=avg_rating
+    Fields:  ?fields=id,name / ?omit=first_point  (routes.fieldsets)
+
+    Reads the denormalized RouteCard table, so a page is one SELECT without
+    joins, serialized from .values() rows (routes.fastpath). Pages are cached
+    anonymously (routes.cache) and the current user's saved/favorite state
+    is merged in afterwards. Conditional GETs are answered with 304 from the
+    card timestamps (routes.conditional).
     """
-    queryset = Route.objects.prefetch_related("images", "user_routes", "points").annotate(
-        rating_count_annotated=Count("ratings", distinct=True)
-    )
-    serializer_class = RouteListSerializer
-    filterset_class = RouteFilter
+    queryset = RouteCard.objects.all()
+    serializer_class = RouteCardSerializer
+    filter_backends = (DjangoFilterBackend, RouteSearchFilter, RouteOrderingFilter)
+    filterset_class = RouteCardFilter
     search_fields = ("name", "city", "description")
     ordering_fields = ("avg_rating", "estimated_duration", "budget_max", "created_at")
     ordering = ("-created_at",)
 
+    def get_validators(self):
+        return route_list_validators(self.request.user)
 
-class RouteDetailView(generics.RetrieveAPIView):
-    """GET /api/routes/<id>/"""
-    queryset = Route.objects.prefetch_related(
-        "images", "points", "points__user_photos", "points__user_photos__user",
-        "ratings", "user_routes",
-    )
+    def get_queryset(self):
+        fieldset = self.get_fieldset()
+        # Лише колонки вибраних полів (+ поля сортування для курсора)
+        columns = {"route", *self.ordering_fields}
+        for name in self.get_serializer_class().Meta.fields:
+            if fieldset.includes(name):
+                columns.update(CARD_COLUMNS.get(name, (name,)))
+        qs = super().get_queryset().only(*columns)
+        user = self.request.user
+        wants_state = fieldset.includes("is_saved") or fieldset.includes("is_favorite")
+        if self.include_user_state and user.is_authenticated and wants_state:
+            # NULL when the route is not saved, otherwise its is_favorite flag
+            qs = qs.annotate(
+                user_route_is_favorite=Subquery(
+                    UserRoute.objects.filter(route=OuterRef("route_id"), user=user)
+                    .values("is_favorite")[:1]
+                )
+            )
+        return qs
+
+    def get_row_serializer(self):
+        return CardRowSerializer(self.get_serializer())
+
+    def get_rows(self, row_serializer):
+        """Filtered cards as .values() rows; sort columns are kept for cursor links."""
+        queryset = self.filter_queryset(self.get_queryset())
+        return row_serializer.values(queryset, extra=self.ordering_fields)
+
+    def list_rows(self):
+        """ListModelMixin.list() over .values() rows."""
+        row_serializer = self.get_row_serializer()
+        rows = self.get_rows(row_serializer)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.to_representation(page))
+        return Response(row_serializer.to_representation(rows))
+
+    def list(self, request, *args, **kwargs):
+        data = self.get_cached_data(response_cache_key(request), self.list_rows)
+        merge_user_state(data["results"] if isinstance(data, dict) else data, request.user)
+        return Response(data)
+
+
+class RouteNearbyView(RouteListView):
+    """
+    GET /api/routes/nearby/?lat=49.84&lon=24.03&radius=3
+    radius — у кілометрах (за замовчуванням 3, максимум 50); ?limit= — до 200.
+    Приймає ті самі фільтри й ?search=, що й /api/routes/. Маршрути
+    відсортовані за відстанню до найближчої точки (distance_km).
+    """
+    pagination_class = None
+    filter_backends = (DjangoFilterBackend, RouteSearchFilter)
+    default_radius_km = 3
+    max_radius_km = 50
+    default_limit = 50
+    max_limit = 200
+    chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        try:
+            lat = float(request.query_params["lat"])
+            lon = float(request.query_params["lon"])
+            radius_km = float(request.query_params.get("radius", self.default_radius_km))
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except (KeyError, ValueError):
+            return Response(
+                {"detail": "Query params 'lat' and 'lon' are required and must be numbers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and 0 < radius_km <= self.max_radius_km):
+            return Response(
+                {"detail": f"Coordinates out of range or radius not in (0, {self.max_radius_km}] km."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = max(1, min(limit, self.max_limit))
+
+        distances = route_distances(lat, lon, radius_km * 1000)
+        nearest = sorted(distances, key=lambda pk: (distances[pk], pk))
+        row_serializer = self.get_row_serializer()
+        rows = self.get_rows(row_serializer)
+        cards = []
+        # Найближчі спершу, порціями — фільтри можуть відсіяти частину маршрутів
+        for start in range(0, len(nearest), self.chunk_size):
+            chunk = nearest[start:start + self.chunk_size]
+            found = {row["route_id"]: row for row in rows.filter(pk__in=chunk)}
+            cards += [found[pk] for pk in chunk if pk in found]
+            if len(cards) >= limit:
+                break
+        data = row_serializer.to_representation(cards[:limit])
+        for item in data:
+            item["distance_km"] = round(distances[item["id"]] / 1000, 3)
+        return Response(data)
+
+
+class RouteDetailView(SparseFieldsViewMixin, ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    """
+    GET /api/routes/<id>/ — кешується до зміни маршруту (routes.cache),
+    на If-None-Match / If-Modified-Since відповідає 304 (routes.conditional).
+    ?fields= / ?omit= (наприклад, ?omit=points.user_photos) прибирають і
+    відповідні prefetch-запити.
+    """
     serializer_class = RouteDetailSerializer
 
+    def get_validators(self):
+        return route_validators(self.kwargs["pk"], self.request.user)
+
+    def get_queryset(self):
+        fieldset = self.get_fieldset()
+        lookups = []
+        if any(fieldset.includes(name) for name in ("images", "cover_image", "cover_derivatives")):
+            lookups.append("images")
+        if fieldset.includes("points") or fieldset.includes("first_point"):
+            lookups.append("points")
+        if fieldset.includes("points", "user_photos"):
+            lookups.append(ready_photos("points__user_photos"))
+        return Route.objects.prefetch_related(*lookups)
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.get_cached_data(
+            response_cache_key(request, route_id=kwargs["pk"]),
+            partial(super().retrieve, request, *args, **kwargs),
+        )
+        merge_user_state([data], request.user)
+        return Response(data)
+
 
-class RoutePointListView(generics.ListAPIView):
-    """GET /api/routes/<route_pk>/points/"""
+class RoutePointListView(ConditionalGetMixin, generics.ListAPIView):
+    """GET /api/routes/<route_pk>/points/ — з ETag / Last-Modified маршруту"""
     serializer_class = RoutePointSerializer
 
+    def get_validators(self):
+        return route_validators(self.kwargs["route_pk"])
+
     def get_queryset(self):
-        return RoutePoint.objects.filter(route_id=self.kwargs["route_pk"])
+        return RoutePoint.objects.filter(route_id=self.kwargs["route_pk"]).prefetch_related(
+            ready_photos("user_photos")
+        )
+
+
+class RouteStopOrderView(generics.GenericAPIView):
+    """
+    POST /api/routes/<route_pk>/points/optimize/ — короткий порядок обходу точок
+    (routes.ordering). Тіло: start / end — id точки, "first", "last" або null
+    (вільний кінець; за замовчуванням start="first"), save. Без save — лише
+    попередній перегляд; зберегти порядок може тільки staff.
+    """
+    serializer_class = StopOrderSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        options = serializer.validated_data
+        if options["save"] and not request.user.is_staff:
+            self.permission_denied(request, message="Only staff can save the stop order.")
+        route = generics.get_object_or_404(Route.objects.only("pk"), pk=self.kwargs["route_pk"])
+        try:
+            result = optimize_route(route.pk, start=options["start"], end=options["end"], save=options["save"])
+        except StopOrderError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+
+class RouteExportView(generics.GenericAPIView):
+    """
+    GET /api/routes/export/?format=ndjson|geojson (або Accept: application/x-ndjson,
+    application/geo+json) — увесь каталог з точками й фото одним потоком
+    (routes.export). Фільтри RouteFilter і ?updated_since=2026-01-01T00:00:00Z.
+    """
+    queryset = Route.objects.all()
+    permission_classes = (permissions.IsAuthenticated,)
+    renderer_classes = (NDJSONRenderer, GeoJSONRenderer)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = RouteFilter
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        since = request.query_params.get("updated_since")
+        if since:
+            try:
+                queryset = changed_since(queryset, parse_updated_since(since))
+            except ValueError as exc:
+                return Response({"detail": f"updated_since: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            STREAMS[renderer.format](queryset, settings.ROUTE_EXPORT_CHUNK_SIZE),
+            content_type=renderer.media_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="routes.{renderer.format}"'
+        return response
 
 
 # ── User Routes (saved / history) ─────────────────────────────────────────────
 
+def user_route_queryset(user):
+    """Saved routes of ``user`` with the card and the user's own rating, in two queries."""
+    return UserRoute.objects.filter(user=user).select_related("route__card").prefetch_related(
+        Prefetch("route__ratings", queryset=Rating.objects.filter(user=user), to_attr="user_ratings")
+    )
+
+
 class UserRouteListCreateView(generics.ListCreateAPIView):
     """
     GET  /api/user/routes/   — список збережених маршрутів
@@ -60,7 +286,7 @@ class UserRouteListCreateView(generics.ListCreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_queryset(self):
-        qs = UserRoute.objects.filter(user=self.request.user).select_related("route")
+        qs = user_route_queryset(self.request.user)
         status_filter = self.request.query_params.get("status")
         is_favorite = self.request.query_params.get("is_favorite")
         if status_filter:
@@ -83,7 +309,7 @@ class UserRouteDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_queryset(self):
-        return UserRoute.objects.filter(user=self.request.user)
+        return user_route_queryset(self.request.user)
 
 
 # ── Ratings ───────────────────────────────────────────────────────────────────
@@ -134,10 +360,44 @@ class RoutePointPhotoView(generics.CreateAPIView):
     """
     POST /api/routes/points/<point_pk>/photos/
     Завантажити фото до точки маршруту (multipart/form-data, поле: image)
+
+    Файл лише кладеться в локальний спул, відповідь — 202 зі статусом
+    ``processing`` і Location на GET статусу; обробка й вивантаження в
+    storage — у фоновій черзі (routes.uploads). Переповнена черга — 503.
     """
     serializer_class = RoutePointPhotoSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
+    def create(self, request, *args, **kwargs):
+        if get_photo_queue().full():
+            return Response(
+                {"detail": "Photo processing is busy, try again later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "30"},
+            )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        location = reverse("point-photo-detail", args=[serializer.instance.pk], request=request)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED, headers={"Location": location})
+
     def perform_create(self, serializer):
         point = generics.get_object_or_404(RoutePoint, pk=self.kwargs["point_pk"])
-        serializer.save(user=self.request.user, point=point)
+        spool_file = spool_upload(serializer.validated_data.pop("image"))
+        photo = serializer.save(
+            user=self.request.user,
+            point=point,
+            status=RoutePointPhoto.Status.PROCESSING,
+            spool_file=spool_file,
+        )
+        # Якщо черга встигла заповнитись — фото дообробить process_photo_spool
+        transaction.on_commit(partial(get_photo_queue().submit, photo.pk))
+
+
+class RoutePointPhotoDetailView(generics.RetrieveAPIView):
+    """GET /api/routes/points/photos/<id>/ — статус обробки власного фото"""
+    serializer_class = RoutePointPhotoSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return RoutePointPhoto.objects.filter(user=self.request.user).select_related("user")
@@ -0,0 +1,17 @@
+from django.core.checks import Warning, register
+
+from .google_tokens import google_client_id
+
+
+@register()
+def google_client_id_check(app_configs, **kwargs):
+    """Без client id вхід через Google відповідає 503 (users.google_tokens)."""
+    if google_client_id():
+        return []
+    return [
+        Warning(
+            "GOOGLE_CLIENT_ID is not set; POST /api/auth/google/ will answer 503.",
+            hint="Set GOOGLE_CLIENT_ID to the OAuth client id of the frontend.",
+            id="users.W001",
+        )
+    ]
@@ -1,12 +1,18 @@
-import requests
-from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .google_tokens import (
+    GoogleKeysUnavailable,
+    InvalidGoogleToken,
+    google_client_id,
+    verify_google_id_token,
+)
+
 User = get_user_model()
 
 
@@ -26,31 +32,23 @@ class GoogleLoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Verify the ID token with Google
-        r = requests.get(
-            "https://oauth2.googleapis.com/tokeninfo",
-            params={"id_token": credential},
-            timeout=10,
-        )
-        if r.status_code != 200:
+        # Verify the ID token locally against Google's cached public keys
+        try:
+            google_data = verify_google_id_token(credential, audience=google_client_id())
+        except InvalidGoogleToken:
             return Response(
                 {"error": "Invalid Google token"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-        google_data = r.json()
-
-        # Optionally verify audience matches our client_id
-        client_id = (
-            settings.SOCIALACCOUNT_PROVIDERS.get("google", {})
-            .get("APP", {})
-            .get("client_id", "")
-        )
-        token_aud = google_data.get("aud", "")
-        if client_id and token_aud != client_id:
+        except GoogleKeysUnavailable:
             return Response(
-                {"error": "Token audience mismatch"},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"error": "Google sign-in is temporarily unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        except ImproperlyConfigured:
+            return Response(
+                {"error": "Google sign-in is not configured"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
         email = google_data.get("email")
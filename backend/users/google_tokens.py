@@ -0,0 +1,123 @@
+"""
+Локальна перевірка Google ID-токенів.
+
+Підпис перевіряється публічними ключами Google (JWKS), які завантажуються
+один раз і живуть у пам'яті процесу до закінчення Cache-Control: max-age.
+Невідомий kid (ротація ключів) викликає позачергове оновлення, але не
+частіше за MIN_REFRESH_INTERVAL. Якщо Google недоступний, використовуються
+прострочені ключі, поки вони є, а наступна спроба завантаження — не раніше
+ніж через FAILED_FETCH_BACKOFF, щоб логіни не чекали на Google щоразу.
+"""
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from core.http import http_client
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_MAX_AGE = 300
+MIN_REFRESH_INTERVAL = 30
+FAILED_FETCH_BACKOFF = 30
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class InvalidGoogleToken(Exception):
+    pass
+
+
+class GoogleKeysUnavailable(Exception):
+    pass
+
+
+class GoogleKeyCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = float("-inf")
+        self._retry_at = 0.0
+
+    def _fetch(self):
+        response = http_client.get(settings.GOOGLE_JWKS_URL, upstream="google-jwks")
+        response.raise_for_status()
+        keys = {
+            jwk["kid"]: jwt.PyJWK(jwk).key
+            for jwk in response.json()["keys"]
+            if jwk.get("kty") == "RSA" and "kid" in jwk
+        }
+        match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_MAX_AGE
+        return keys, max_age
+
+    def get(self, kid):
+        """Public key for ``kid``, or None if Google does not publish it."""
+        with self._lock:
+            now = time.monotonic()
+            expired = now >= self._expires_at
+            rotated = kid not in self._keys and now - self._fetched_at >= MIN_REFRESH_INTERVAL
+            if (expired or rotated) and now >= self._retry_at:
+                try:
+                    keys, max_age = self._fetch()
+                except (requests.exceptions.RequestException, ValueError, KeyError, jwt.PyJWKError) as exc:
+                    logger.warning("Could not fetch Google signing keys: %s", exc)
+                    self._retry_at = now + FAILED_FETCH_BACKOFF
+                else:
+                    self._keys, self._fetched_at, self._expires_at = keys, now, now + max_age
+                    self._retry_at = 0.0
+            if not self._keys:
+                raise GoogleKeysUnavailable
+            return self._keys.get(kid)
+
+
+google_keys = GoogleKeyCache()
+
+
+def google_client_id():
+    """OAuth client id the ID tokens must be issued for; empty when not configured."""
+    return settings.SOCIALACCOUNT_PROVIDERS.get("google", {}).get("APP", {}).get("client_id", "")
+
+
+def verify_google_id_token(token, audience):
+    """
+    Claims of a Google ID token signed by Google for ``audience``, with a valid
+    issuer and expiry. Raises InvalidGoogleToken, or ImproperlyConfigured when
+    no client id is set: without ``aud`` a token of any Google client would pass.
+    """
+    if not audience:
+        raise ImproperlyConfigured("GOOGLE_CLIENT_ID is not set")
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as exc:
+        raise InvalidGoogleToken("Malformed token") from exc
+    if header.get("alg") != "RS256":
+        raise InvalidGoogleToken("Unexpected signing algorithm")
+    key = google_keys.get(header.get("kid"))
+    if key is None:
+        raise InvalidGoogleToken("Unknown signing key")
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=audience,
+            issuer=GOOGLE_ISSUERS,
+            leeway=settings.GOOGLE_TOKEN_LEEWAY,
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+    except jwt.InvalidTokenError as exc:
+        raise InvalidGoogleToken(str(exc)) from exc
+    # Користувача шукаємо за email — приймаємо лише підтверджені Google адреси
+    if claims.get("email") and claims.get("email_verified") not in (True, "true"):
+        raise InvalidGoogleToken("Email is not verified")
+    return claims
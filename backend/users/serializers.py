@@ -1,5 +1,8 @@
 from dj_rest_auth.registration.serializers import RegisterSerializer as BaseRegisterSerializer
 from rest_framework import serializers
+
+from core.timing import TimedSerializerMixin
+
 from .models import User
 
 
@@ -38,14 +41,14 @@ class RegisterSerializer(BaseRegisterSerializer):
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("id", "email", "username", "first_name", "last_name", "avatar", "bio")
         read_only_fields = ("id", "email")
 
 
-class UserStatsSerializer(serializers.Serializer):
+class UserStatsSerializer(TimedSerializerMixin, serializers.Serializer):
     total_routes = serializers.IntegerField()
     completed_routes = serializers.IntegerField()
     total_time_minutes = serializers.IntegerField()
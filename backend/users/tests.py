@@ -1,3 +1,137 @@
-from django.test import TestCase
+import json
+import time
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.testing import StubHTTPServer
+
+from .checks import google_client_id_check
+from .google_tokens import google_keys, verify_google_id_token
+
+User = get_user_model()
+
+CLIENT_ID = "search4u-test.apps.googleusercontent.com"
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return private_key, {**jwk, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+class GoogleLoginTests(APITestCase):
+    """Ключі Google підміняє локальна пара RSA, роздана через StubHTTPServer."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.private_key, cls.jwk = make_key("key-1")
+
+    def setUp(self):
+        google_keys.clear()
+        self.addCleanup(google_keys.clear)
+        self.published = [self.jwk]
+        self.max_age = 3600
+        self.status = 200
+        self.stub = StubHTTPServer(
+            lambda handler: (self.status, {"keys": self.published}, {"Cache-Control": f"public, max-age={self.max_age}"})
+        )
+        self.addCleanup(self.stub.close)
+        settings = override_settings(
+            GOOGLE_JWKS_URL=self.stub.url("/oauth2/v3/certs"),
+            SOCIALACCOUNT_PROVIDERS={"google": {"APP": {"client_id": CLIENT_ID}}},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def token(self, private_key=None, kid="key-1", **overrides):
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com",
+            "aud": CLIENT_ID,
+            "sub": "1234567890",
+            "iat": now,
+            "exp": now + 3600,
+            "email": "walker@gmail.com",
+            "email_verified": True,
+            "given_name": "Walker",
+            "family_name": "Lviv",
+            **overrides,
+        }
+        return jwt.encode(claims, private_key or self.private_key, algorithm="RS256", headers={"kid": kid})
+
+    def login(self, credential):
+        return self.client.post(reverse("google-login"), {"credential": credential}, format="json")
+
+    def test_valid_token_logs_in_with_cached_keys(self):
+        response = self.login(self.token())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+        self.assertEqual(User.objects.get(email="walker@gmail.com").first_name, "Walker")
+
+        self.assertEqual(self.login(self.token()).status_code, 200)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_rejects_bad_claims_and_signatures(self):
+        other_key, _ = make_key("key-1")
+        cases = {
+            "audience": self.token(aud="someone-else"),
+            "issuer": self.token(iss="https://evil.example.com"),
+            "expired": self.token(iat=int(time.time()) - 7200, exp=int(time.time()) - 3600),
+            "signature": self.token(private_key=other_key),
+            "unverified email": self.token(email_verified=False),
+            "garbage": "not-a-jwt",
+        }
+        for name, credential in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.login(credential).status_code, 400)
+        self.assertFalse(User.objects.exists())
+
+    def test_refetches_on_expiry_and_key_rotation(self):
+        self.max_age = 0
+        self.login(self.token())
+        self.login(self.token())
+        self.assertEqual(len(self.stub.requests), 2)
+
+        self.max_age = 3600
+        rotated_key, rotated_jwk = make_key("key-2")
+        self.published = [self.jwk, rotated_jwk]
+        self.assertEqual(self.login(self.token(rotated_key, kid="key-2")).status_code, 200)
+        self.assertEqual(self.login(self.token(kid="unknown")).status_code, 400)
+        self.assertEqual(len(self.stub.requests), 3)  # невідомий kid не смикає Google щоразу
+
+    def test_keys_unavailable(self):
+        self.stub.close()
+        with self.assertLogs(level="WARNING"), override_settings(OUTBOUND_HTTP_RETRIES=0):
+            self.assertEqual(self.login(self.token()).status_code, 503)
+
+    def test_failed_fetch_backs_off_and_keeps_stale_keys(self):
+        self.max_age = 0
+        self.assertEqual(self.login(self.token()).status_code, 200)
+
+        self.status = 404
+        with self.assertLogs("users.google_tokens", level="WARNING"):
+            for _ in range(3):
+                self.assertEqual(self.login(self.token()).status_code, 200)
+        self.assertEqual(len(self.stub.requests), 2)  # одна невдала спроба, далі — прострочені ключі
+
+    def test_requires_client_id(self):
+        with self.assertRaises(ImproperlyConfigured):
+            verify_google_id_token(self.token(), audience="")
+        self.assertEqual(self.stub.requests, [])
+
+    def test_login_without_client_id_is_unavailable(self):
+        with override_settings(SOCIALACCOUNT_PROVIDERS={"google": {"APP": {"client_id": ""}}}):
+            response = self.login(self.token())
+            warnings = google_client_id_check(None)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data, {"error": "Google sign-in is not configured"})
+        self.assertEqual([w.id for w in warnings], ["users.W001"])
+        self.assertEqual(google_client_id_check(None), [])
+        self.assertFalse(User.objects.exists())
@@ -0,0 +1,266 @@
+"""
+Кеш погоди по місту з stale-while-revalidate і single-flight.
+
+Запис живе в кеші Django (спільний для воркерів, якщо CACHE_URL —
+Redis): свіжий WEATHER_CACHE_TTL секунд, далі ще WEATHER_CACHE_STALE секунд
+віддається одразу, а оновлення йде у спільному пулі потоків. 404 кешується на
+WEATHER_NOT_FOUND_TTL; помилки сервісу не кешуються.
+
+Одночасні промахи для одного міста в межах процесу чекають на один
+запит до OpenWeatherMap (SingleFlight). Пакетний запит кількох міст
+віддає кешовані одразу, а промахи тягне паралельно у спільному пулі потоків
+з одним дедлайном (get_weather_many).
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.prometheus import observe_cache
+
+from .client import WeatherServiceError, afetch_weather, fetch_weather
+
+logger = logging.getLogger(__name__)
+
+HIT, STALE, MISS = "hit", "stale", "miss"
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if leader:
+            try:
+                call.result = func()
+            except Exception as exc:
+                call.error = exc
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: one task per key and event loop."""
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+
+    def in_flight(self, key):
+        return key in self._calls.get(asyncio.get_running_loop(), {})
+
+    async def do(self, key, func):
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        # shield: скасування одного з очікувачів не скасовує спільний запит
+        return await asyncio.shield(task)
+
+
+_flight = SingleFlight()
+_aflight = AsyncSingleFlight()
+_background = set()
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def normalize_city(city):
+    return " ".join(city.split()).casefold()
+
+
+def _cache_key(city):
+    return "weather:" + hashlib.md5(normalize_city(city).encode()).hexdigest()
+
+
+def _make_entry(status_code, data):
+    """(entry, cache timeout) for an upstream answer."""
+    if status_code == 200:
+        fresh_for, timeout = settings.WEATHER_CACHE_TTL, settings.WEATHER_CACHE_TTL + settings.WEATHER_CACHE_STALE
+    else:
+        fresh_for = timeout = settings.WEATHER_NOT_FOUND_TTL
+    return {"status": status_code, "data": data, "fresh_until": time.time() + fresh_for}, timeout
+
+
+def _fetch_and_store(key, city):
+    entry, timeout = _make_entry(*fetch_weather(city))
+    cache.set(key, entry, timeout)
+    return entry
+
+
+async def _afetch_and_store(key, city):
+    entry, timeout = _make_entry(*await afetch_weather(city))
+    await cache.aset(key, entry, timeout)
+    return entry
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Спільний пул на процес обмежує кількість одночасних запитів до upstream
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.WEATHER_BATCH_WORKERS, thread_name_prefix="weather"
+            )
+        return _executor
+
+
+def _revalidate(key, city):
+    try:
+        _flight.do(key, lambda: _fetch_and_store(key, city))
+    except WeatherServiceError as exc:
+        logger.warning("Weather refresh for %r failed: %s", city, exc)
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(key)
+
+
+def _schedule_revalidation(key, city):
+    """Queue one refresh of ``key`` on the shared pool, however many stale hits ask for it."""
+    with _revalidating_lock:
+        if key in _revalidating or _flight.in_flight(key):
+            return
+        _revalidating.add(key)
+    _get_executor().submit(_revalidate, key, city)
+
+
+async def _arevalidate(key, city):
+    try:
+        await _aflight.do(key, lambda: _afetch_and_store(key, city))
+    except WeatherServiceError as exc:
+        logger.warning("Weather refresh for %r failed: %s", city, exc)
+
+
+def peek_weather(city):
+    """Cached (status, data, HIT | STALE) for ``city`` or None; stale entries get revalidated."""
+    key = _cache_key(city)
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if entry["fresh_until"] > time.time():
+        observe_cache("weather", HIT)
+        return entry["status"], entry["data"], HIT
+    _schedule_revalidation(key, city)
+    observe_cache("weather", STALE)
+    return entry["status"], entry["data"], STALE
+
+
+def get_weather(city):
+    """
+    (status, data, cache_state) for ``city``: status is 200 or 404, cache_state
+    one of HIT / STALE / MISS. Raises WeatherServiceError on upstream failure.
+    """
+    cached = peek_weather(city)
+    if cached is not None:
+        return cached
+    key = _cache_key(city)
+    observe_cache("weather", MISS)
+    entry = _flight.do(key, lambda: _fetch_and_store(key, city))
+    return entry["status"], entry["data"], MISS
+
+
+async def aget_weather(city):
+    """Async get_weather(): httpx upstream, revalidation in an event-loop task."""
+    key = _cache_key(city)
+    entry = await cache.aget(key)
+    if entry is not None:
+        if entry["fresh_until"] > time.time():
+            observe_cache("weather", HIT)
+            return entry["status"], entry["data"], HIT
+        observe_cache("weather", STALE)
+        if not _aflight.in_flight(key):
+            task = asyncio.create_task(_arevalidate(key, city))
+            _background.add(task)  # без посилання задачу може прибрати GC
+            task.add_done_callback(_background.discard)
+        return entry["status"], entry["data"], STALE
+    observe_cache("weather", MISS)
+    entry = await _aflight.do(key, lambda: _afetch_and_store(key, city))
+    return entry["status"], entry["data"], MISS
+
+
+def _batch_outcome(city, exc):
+    """``exc`` as a per-city result: any unexpected error becomes a 502 for that city only."""
+    if exc is None or isinstance(exc, WeatherServiceError):
+        return exc
+    logger.error("Weather lookup for %r failed", city, exc_info=exc)
+    return WeatherServiceError("Weather service error.")
+
+
+def get_weather_many(cities, timeout):
+    """
+    ``{city: result}`` for distinct ``cities``: result is get_weather()'s tuple,
+    a WeatherServiceError, or TimeoutError if the miss was not fetched within
+    ``timeout`` seconds. Cached cities are answered without waiting; a timed-out
+    fetch keeps running and fills the cache for the next request.
+    """
+    results = {}
+    misses = []
+    for city in cities:
+        cached = peek_weather(city)
+        if cached is None:
+            misses.append(city)
+        else:
+            results[city] = cached
+    if not misses:
+        return results
+
+    executor = _get_executor()
+    futures = {executor.submit(get_weather, city): city for city in misses}
+    done, _ = wait(futures, timeout=timeout)
+    for future, city in futures.items():
+        if future not in done:
+            results[city] = TimeoutError(f"No answer within {timeout}s.")
+        else:
+            results[city] = _batch_outcome(city, future.exception()) or future.result()
+    return results
+
+
+async def aget_weather_many(cities, timeout):
+    """Async get_weather_many(): one task per city, results shaped the same way."""
+    tasks = {city: asyncio.ensure_future(aget_weather(city)) for city in cities}
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in pending:
+        _background.add(task)  # дотягнуть відповідь у кеш для наступного запиту
+        task.add_done_callback(_background.discard)
+    results = {}
+    for city, task in tasks.items():
+        if task in pending:
+            results[city] = TimeoutError(f"No answer within {timeout}s.")
+        else:
+            results[city] = _batch_outcome(city, task.exception()) or task.result()
+    return results
@@ -0,0 +1,60 @@
+"""Запит до OpenWeatherMap і приведення відповіді до формату API."""
+import httpx
+import requests
+from django.conf import settings
+
+from core.http import http_client
+from core.http_async import aget
+
+
+class WeatherServiceError(Exception):
+    """Upstream failure that must not be cached; ``str(exc)`` is the API detail."""
+
+
+def normalize(data):
+    return {
+        "city": data["name"],
+        "country": data["sys"]["country"],
+        "temp": data["main"]["temp"],
+        "feels_like": data["main"]["feels_like"],
+        "humidity": data["main"]["humidity"],
+        "description": data["weather"][0]["description"],
+        "icon": data["weather"][0]["icon"],
+        "wind_speed": data["wind"]["speed"],
+    }
+
+
+def _params(city):
+    return {"q": city, "appid": settings.OPENWEATHER_API_KEY, "units": "metric", "lang": "en"}
+
+
+def _parse(response):
+    if response.status_code == 404:
+        return 404, None
+    if response.status_code != 200:
+        raise WeatherServiceError("Weather service error.")
+    try:
+        return 200, normalize(response.json())
+    except (ValueError, KeyError, IndexError) as exc:
+        raise WeatherServiceError("Weather service error.") from exc
+
+
+def fetch_weather(city):
+    """
+    (200, weather) or (404, None) from OpenWeatherMap; every other outcome
+    raises WeatherServiceError.
+    """
+    try:
+        response = http_client.get(settings.OPENWEATHER_URL, upstream="openweather", params=_params(city))
+    except requests.exceptions.RequestException as exc:
+        raise WeatherServiceError("Could not reach weather service.") from exc
+    return _parse(response)
+
+
+async def afetch_weather(city):
+    """Async fetch_weather() over httpx (core.http_async)."""
+    try:
+        response = await aget(settings.OPENWEATHER_URL, upstream="openweather", params=_params(city))
+    except httpx.HTTPError as exc:
+        raise WeatherServiceError("Could not reach weather service.") from exc
+    return _parse(response)
@@ -1,3 +1,191 @@
-from django.test import TestCase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.testing import StubHTTPServer
+
+from . import cache as weather_cache
+from .cache import get_weather
+from .client import fetch_weather
+
+
+def weather_payload(city):
+    return {
+        "name": city,
+        "sys": {"country": "UA"},
+        "main": {"temp": 21.5, "feels_like": 20.9, "humidity": 40},
+        "weather": [{"description": "clear sky", "icon": "01d"}],
+        "wind": {"speed": 3.1},
+    }
+
+
+class StubOpenWeather(StubHTTPServer):
+    """OpenWeatherMap stand-in: ``calls`` lists requested cities; optional delay and failures."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.fail = False
+        super().__init__(self._respond)
+
+    def _respond(self, handler):
+        city = parse_qs(urlparse(handler.path).query)["q"][0]
+        self.calls.append(city)
+        time.sleep(self.delay)
+        if self.fail:
+            return 500, {"message": "boom"}, None
+        if city.lower() == "atlantis":
+            return 404, {"cod": "404", "message": "city not found"}, None
+        return 200, weather_payload(city), None
+
+
+class StubWeatherTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = StubOpenWeather()
+        self.addCleanup(self.stub.close)
+        settings = override_settings(
+            OPENWEATHER_URL=self.stub.url("/data/2.5/weather"),
+            OPENWEATHER_API_KEY="test-key",
+            WEATHER_CACHE_TTL=600,
+            WEATHER_CACHE_STALE=600,
+            WEATHER_NOT_FOUND_TTL=60,
+            OUTBOUND_HTTP_RETRIES=0,  # повтори перевіряє core
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class WeatherCacheTests(StubWeatherTestCase):
+    def test_repeated_requests_hit_cache(self):
+        first = self.client.get(reverse("weather"), {"city": "Kyiv"})
+        second = self.client.get(reverse("weather"), {"city": " kyiv "})
+        self.assertEqual(first.json()["temp"], 21.5)
+        self.assertEqual((first["X-Cache"], second["X-Cache"]), ("miss", "hit"))
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.stub.calls, ["Kyiv"])
+
+    def test_concurrent_misses_are_coalesced(self):
+        self.stub.delay = 0.2
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(get_weather, ["Lviv"] * 8))
+        self.assertTrue(all(status == 200 for status, _, _ in results))
+        self.assertEqual(len(self.stub.calls), 1)
+
+    def test_not_found_is_cached_errors_are_not(self):
+        for _ in range(2):
+            response = self.client.get(reverse("weather"), {"city": "Atlantis"})
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.stub.calls), 1)
+
+        self.stub.fail = True
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse("weather"), {"city": "Odesa"}).status_code, 502)
+        self.assertEqual(len(self.stub.calls), 3)
+
+    def test_stale_entry_is_served_while_revalidating(self):
+        with override_settings(WEATHER_CACHE_TTL=0):
+            get_weather("Dnipro")
+            self.stub.delay = 0.2
+            started = time.perf_counter()
+            status_code, data, state = get_weather("Dnipro")
+            self.assertLess(time.perf_counter() - started, 0.1)  # не чекає на upstream
+        self.assertEqual((status_code, state), (200, "stale"))
+        deadline = time.monotonic() + 5
+        while get_weather("Dnipro")[2] != "hit" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(get_weather("Dnipro")[2], "hit")
+        self.assertEqual(len(self.stub.calls), 2)
+
+    def test_stale_burst_schedules_one_refresh(self):
+        with override_settings(WEATHER_CACHE_TTL=0):
+            get_weather("Kharkiv")
+            self.stub.delay = 0.3
+            with mock.patch.object(weather_cache, "_revalidate", wraps=weather_cache._revalidate) as revalidate:
+                with ThreadPoolExecutor(max_workers=8) as pool:
+                    states = list(pool.map(lambda city: get_weather(city)[2], ["Kharkiv"] * 20))
+                self.assertEqual(set(states), {"stale"})
+                deadline = time.monotonic() + 5
+                while weather_cache._revalidating and time.monotonic() < deadline:
+                    time.sleep(0.05)
+        self.assertEqual(revalidate.call_count, 1)
+        self.assertEqual(len(self.stub.calls), 2)
+
+
+@override_settings(WEATHER_BATCH_TIMEOUT=1)
+class WeatherBatchTests(StubWeatherTestCase):
+    def test_dedupes_and_reports_per_city(self):
+        self.client.get(reverse("weather"), {"city": "Kyiv"})
+        self.stub.calls.clear()
+        response = self.client.get(
+            reverse("weather"), {"city": ["Kyiv", "Lviv", " lviv", "Atlantis", "Odesa"]}
+        )
+        results = {item["query"]: item for item in response.json()["results"]}
+        self.assertEqual(list(results), ["Kyiv", "Lviv", "Atlantis", "Odesa"])
+        self.assertEqual((results["Kyiv"]["status"], results["Kyiv"]["cache"]), (200, "hit"))
+        self.assertEqual(results["Lviv"]["weather"]["city"], "Lviv")
+        self.assertEqual(results["Atlantis"]["status"], 404)
+        self.assertEqual(sorted(self.stub.calls), ["Atlantis", "Lviv", "Odesa"])
+
+    def test_misses_are_fetched_concurrently_within_deadline(self):
+        self.stub.delay = 0.3
+        started = time.perf_counter()
+        response = self.client.get(reverse("weather"), {"city": ["Kyiv", "Lviv", "Odesa", "Dnipro"]})
+        self.assertLess(time.perf_counter() - started, 0.9)
+        self.assertEqual({item["status"] for item in response.json()["results"]}, {200})
+
+        self.stub.delay = 2
+        started = time.perf_counter()
+        response = self.client.get(reverse("weather"), {"city": ["Kyiv", "Kharkiv"]})
+        self.assertLess(time.perf_counter() - started, 1.5)
+        statuses = {item["query"]: item["status"] for item in response.json()["results"]}
+        self.assertEqual(statuses, {"Kyiv": 200, "Kharkiv": 504})
+
+    def test_unexpected_error_fails_only_its_city(self):
+        def fetch(city):
+            if city == "Lviv":
+                raise RuntimeError("cache backend down")
+            return fetch_weather(city)
+
+        with mock.patch("weather.cache.fetch_weather", side_effect=fetch), self.assertLogs("weather.cache", "ERROR"):
+            response = self.client.get(reverse("weather"), {"city": ["Kyiv", "Lviv"]})
+        self.assertEqual(response.status_code, 200)
+        statuses = {item["query"]: item["status"] for item in response.json()["results"]}
+        self.assertEqual(statuses, {"Kyiv": 200, "Lviv": 502})
+
+    def test_rejects_too_many_cities(self):
+        with override_settings(WEATHER_BATCH_MAX_CITIES=2):
+            response = self.client.get(reverse("weather"), {"city": ["A", "B", "C"]})
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncWeatherTests(StubWeatherTestCase):
+    async def test_matches_sync_view_and_shares_cache(self):
+        expected = await sync_to_async(self.client.get)(reverse("weather"), {"city": "Kyiv"})
+        await sync_to_async(cache.clear)()
+        first = await self.async_client.get(reverse("async-weather"), {"city": "Kyiv"})
+        second = await self.async_client.get(reverse("async-weather"), {"city": "kyiv"})
+        self.assertEqual(first.content, expected.content)
+        self.assertEqual((first["X-Cache"], second["X-Cache"]), ("miss", "hit"))
+        self.assertEqual(self.stub.calls, ["Kyiv", "Kyiv"])
+
+        response = await self.async_client.get(reverse("async-weather"), {"city": "Atlantis"})
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse("async-weather"))
+        self.assertEqual(response.status_code, 400)
+
+    async def test_batch_misses_are_fetched_concurrently(self):
+        self.stub.delay = 0.3
+        started = time.perf_counter()
+        response = await self.async_client.get(
+            reverse("async-weather"), {"city": ["Kyiv", "Lviv", "Odesa", "Dnipro"]}
+        )
+        self.assertLess(time.perf_counter() - started, 0.9)
+        self.assertEqual({item["status"] for item in response.json()["results"]}, {200})
+        self.assertEqual(len(self.stub.calls), 4)
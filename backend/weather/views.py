@@ -1,66 +1,125 @@
-import requests
 from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+from core.renderers import FastJSONRenderer
+
+from .cache import aget_weather, aget_weather_many, get_weather, get_weather_many, normalize_city
+from .client import WeatherServiceError
+
+
+def _not_found(city):
+    return f"City '{city}' not found."
+
+
+def _parse_cities(params):
+    """(cities, None) or (None, (error detail, status)) for ?city= params."""
+    cities = [city.strip() for city in params.getlist("city")]
+    cities = [city for city in cities if city]
+    if not cities:
+        return None, ("Query param 'city' is required.", status.HTTP_400_BAD_REQUEST)
+    if not settings.OPENWEATHER_API_KEY:
+        return None, ("Weather service is not configured.", status.HTTP_503_SERVICE_UNAVAILABLE)
+    # Дублікати ("Lviv", " lviv") — одне місто; порядок першої появи
+    by_key = {}
+    for city in cities:
+        by_key.setdefault(normalize_city(city), city)
+    cities = list(by_key.values())
+    if len(cities) > settings.WEATHER_BATCH_MAX_CITIES:
+        return None, (
+            f"At most {settings.WEATHER_BATCH_MAX_CITIES} cities per request.",
+            status.HTTP_400_BAD_REQUEST,
+        )
+    return cities, None
+
+
+def _single(city, outcome):
+    """(body, status, cache state) for get_weather()'s result or WeatherServiceError."""
+    if isinstance(outcome, WeatherServiceError):
+        return {"detail": str(outcome)}, status.HTTP_502_BAD_GATEWAY, None
+    status_code, data, cache_state = outcome
+    if status_code == 404:
+        return {"detail": _not_found(city)}, status.HTTP_404_NOT_FOUND, cache_state
+    return data, status.HTTP_200_OK, cache_state
+
+
+def _batch(cities, outcomes):
+    results = []
+    for city in cities:
+        outcome = outcomes[city]
+        if isinstance(outcome, WeatherServiceError):
+            item = {"status": status.HTTP_502_BAD_GATEWAY, "detail": str(outcome)}
+        elif isinstance(outcome, TimeoutError):
+            item = {"status": status.HTTP_504_GATEWAY_TIMEOUT, "detail": "Weather service timed out."}
+        elif outcome[0] == 404:
+            item = {"status": status.HTTP_404_NOT_FOUND, "detail": _not_found(city), "cache": outcome[2]}
+        else:
+            item = {"status": status.HTTP_200_OK, "weather": outcome[1], "cache": outcome[2]}
+        results.append({"query": city, **item})
+    return {"results": results}
 
 
 class WeatherView(APIView):
     """
     GET /api/weather/?city=Kyiv
-    Проксі до OpenWeatherMap API.
+    Проксі до OpenWeatherMap API з кешем по місту (weather.cache);
+    заголовок X-Cache: hit / stale / miss.
+
+    GET /api/weather/?city=Kyiv&city=Lviv — пакетний режим: до
+    WEATHER_BATCH_MAX_CITIES міст, {"results": [...]} зі статусом для кожного
+    міста (200 / 404 / 502 / 504), загалом не довше WEATHER_BATCH_TIMEOUT.
     """
 
     def get(self, request):
-        city = request.query_params.get("city", "").strip()
-        if not city:
-            return Response(
-                {"detail": "Query param 'city' is required."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        api_key = settings.OPENWEATHER_API_KEY
-        if not api_key:
-            return Response(
-                {"detail": "Weather service is not configured."},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+        cities, error = _parse_cities(request.query_params)
+        if error:
+            return Response({"detail": error[0]}, status=error[1])
+
+        if len(cities) > 1:
+            outcomes = get_weather_many(cities, timeout=settings.WEATHER_BATCH_TIMEOUT)
+            return Response(_batch(cities, outcomes))
 
         try:
-            response = requests.get(
-                OPENWEATHER_URL,
-                params={"q": city, "appid": api_key, "units": "metric", "lang": "en"},
-                timeout=5,
-            )
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as exc:
-            if exc.response.status_code == 404:
-                return Response(
-                    {"detail": f"City '{city}' not found."},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-            return Response(
-                {"detail": "Weather service error."},
-                status=status.HTTP_502_BAD_GATEWAY,
-            )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"detail": "Could not reach weather service."},
-                status=status.HTTP_502_BAD_GATEWAY,
-            )
-
-        data = response.json()
-        return Response(
-            {
-                "city": data["name"],
-                "country": data["sys"]["country"],
-                "temp": data["main"]["temp"],
-                "feels_like": data["main"]["feels_like"],
-                "humidity": data["main"]["humidity"],
-                "description": data["weather"][0]["description"],
-                "icon": data["weather"][0]["icon"],
-                "wind_speed": data["wind"]["speed"],
-            }
+            outcome = get_weather(cities[0])
+        except WeatherServiceError as exc:
+            outcome = exc
+        body, status_code, cache_state = _single(cities[0], outcome)
+        response = Response(body, status=status_code)
+        if cache_state:
+            response["X-Cache"] = cache_state
+        return response
+
+
+class AsyncWeatherView(View):
+    """
+    GET /api/async/weather/?city=Kyiv — те саме, що WeatherView, але async:
+    запит до OpenWeatherMap через httpx не тримає потік воркера.
+    """
+
+    @staticmethod
+    def render(body, status_code=200):
+        return HttpResponse(
+            FastJSONRenderer().render(body), status=status_code, content_type="application/json"
         )
+
+    async def get(self, request):
+        cities, error = _parse_cities(request.GET)
+        if error:
+            return self.render({"detail": error[0]}, error[1])
+
+        if len(cities) > 1:
+            outcomes = await aget_weather_many(cities, timeout=settings.WEATHER_BATCH_TIMEOUT)
+            return self.render(_batch(cities, outcomes))
+
+        try:
+            outcome = await aget_weather(cities[0])
+        except WeatherServiceError as exc:
+            outcome = exc
+        body, status_code, cache_state = _single(cities[0], outcome)
+        response = self.render(body, status_code)
+        if cache_state:
+            response["X-Cache"] = cache_state
+        return response